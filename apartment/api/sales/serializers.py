@@ -1,5 +1,3 @@
-from uuid import UUID
-
 from rest_framework import serializers
 
 from apartment.utils import get_apartment_state_from_reserved_reservations
@@ -18,33 +16,26 @@ class ApartmentSerializer(serializers.Serializer):
     reservation_count = serializers.SerializerMethodField()
     winning_reservation = serializers.SerializerMethodField()
 
+    def _get_summary(self, obj):
+        return self.context["apartment_state_summaries"].get(
+            obj.uuid,
+            {
+                "reservation_count": 0,
+                "winning_reservation": None,
+                "reserved_reservations": [],
+            },
+        )
+
     def get_state(self, obj):
-        reserved_reservations = [
-            reservation
-            for reservation in self.context["reserved_reservations"]
-            if reservation.apartment_uuid == UUID(obj.uuid)
-        ]
-        return get_apartment_state_from_reserved_reservations(reserved_reservations)
+        return get_apartment_state_from_reserved_reservations(
+            self._get_summary(obj)["reserved_reservations"]
+        )
 
     def get_reservation_count(self, obj):
-        return next(
-            (
-                apartment["reservation_count"]
-                for apartment in self.context["reservation_counts"]
-                if apartment["apartment_uuid"] == UUID(obj.uuid)
-            ),
-            0,
-        )
+        return self._get_summary(obj)["reservation_count"]
 
     def get_winning_reservation(self, obj):
-        winning_reservation = next(
-            (
-                reservation
-                for reservation in self.context["winning_reservations"]
-                if reservation.apartment_uuid == UUID(obj.uuid)
-            ),
-            None,
-        )
+        winning_reservation = self._get_summary(obj)["winning_reservation"]
 
         return (
             SalesWinningApartmentReservationSerializer(
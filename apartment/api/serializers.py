@@ -169,11 +169,37 @@ class ProjectDocumentDetailSerializer(ProjectDocumentSerializerBase):
         ).data
 
     def get_apartments(self, obj):
+        return ApartmentSerializer(
+            self.apartment_objs,
+            many=True,
+            context={
+                "project_uuid": obj.project_uuid,
+                "apartment_state_summaries": self._get_apartment_state_summaries(),
+            },
+        ).data
+
+    def _get_apartment_state_summaries(self):
+        """Reservation data of the project's apartments keyed by apartment UUID."""
+        summaries = {
+            str(apartment_uuid): {
+                "reservation_count": 0,
+                "winning_reservation": None,
+                "reserved_reservations": [],
+            }
+            for apartment_uuid in self.apartment_uuids
+        }
+
         reservation_counts = (
-            ApartmentReservation.objects.active()
+            ApartmentReservation.objects.filter(apartment_uuid__in=self.apartment_uuids)
+            .active()
             .values("apartment_uuid")
             .annotate(reservation_count=Count("apartment_uuid"))
+            .order_by()
         )
+        for row in reservation_counts:
+            summaries[str(row["apartment_uuid"])]["reservation_count"] = row[
+                "reservation_count"
+            ]
 
         customer_other_winning_apartments = (
             ApartmentReservation.objects.reserved()
@@ -198,19 +224,20 @@ class ProjectDocumentDetailSerializer(ProjectDocumentSerializerBase):
             # apartment. That should not normally happen.
             .order_by("list_position")
         )
+        for reservation in winning_reservations:
+            summary = summaries[str(reservation.apartment_uuid)]
+            if summary["winning_reservation"] is None:
+                summary["winning_reservation"] = reservation
 
-        return ApartmentSerializer(
-            self.apartment_objs,
-            many=True,
-            context={
-                "project_uuid": obj.project_uuid,
-                "reservation_counts": reservation_counts,
-                "winning_reservations": winning_reservations,
-                "reserved_reservations": ApartmentReservation.objects.filter(
-                    apartment_uuid__in=self.apartment_uuids
-                ).reserved(),
-            },
-        ).data
+        reserved_reservations = ApartmentReservation.objects.filter(
+            apartment_uuid__in=self.apartment_uuids
+        ).reserved()
+        for reservation in reserved_reservations:
+            summaries[str(reservation.apartment_uuid)]["reserved_reservations"].append(
+                reservation
+            )
+
+        return summaries
 
     def get_extra_data(self, obj):
         try:
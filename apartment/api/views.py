@@ -1,6 +1,6 @@
 from dateutil import parser
 from django.core.exceptions import ObjectDoesNotExist
-from django.http import Http404, HttpResponse
+from django.http import Http404, StreamingHttpResponse
 from django.utils import timezone
 from django.utils.text import format_lazy
 from django.utils.translation import gettext_lazy as _
@@ -22,7 +22,9 @@ from apartment.elastic.queries import (
 )
 from apartment.models import ProjectExtraData
 from application_form.api.sales.serializers import (
+    ApartmentReservationsQuerySerializer,
     ProjectExtraDataSerializer,
+    SalesApartmentReservationCompactSerializer,
     SalesApartmentReservationSerializer,
 )
 from application_form.enums import ApartmentReservationState
@@ -49,16 +51,49 @@ class ApartmentAPIView(APIView):
 
 
 class ApartmentReservationsAPIView(APIView):
+    """
+    Returns the reservations of the apartment in the order of their list positions.
+
+    The reservations can be filtered with `state` being either `active` or
+    `canceled`, and `compact=true` returns only the basic fields of them.
+
+    By default all the reservations are returned. If `limit` is given, at most
+    that many reservations after the list position `after_list_position` are
+    returned, and the list position of the last one is given in the
+    X-Last-List-Position header, to be used as the next `after_list_position`.
+    """
+
     http_method_names = ["get"]
 
     def get(self, request, apartment_uuid):
-        serializer = SalesApartmentReservationSerializer(
-            ApartmentReservation.objects.related_fields()
-            .filter(apartment_uuid=apartment_uuid)
-            .order_by("list_position"),
-            many=True,
-        )
-        return Response(serializer.data)
+        query = ApartmentReservationsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        reservations = ApartmentReservation.objects.filter(
+            apartment_uuid=apartment_uuid
+        ).order_by("list_position")
+        if params.get("state") == ApartmentReservationsQuerySerializer.STATE_ACTIVE:
+            reservations = reservations.active()
+        elif params.get("state") == ApartmentReservationsQuerySerializer.STATE_CANCELED:
+            reservations = reservations.filter(state=ApartmentReservationState.CANCELED)
+        if "after_list_position" in params:
+            reservations = reservations.filter(
+                list_position__gt=params["after_list_position"]
+            )
+        if params["compact"]:
+            serializer_class = SalesApartmentReservationCompactSerializer
+        else:
+            serializer_class = SalesApartmentReservationSerializer
+            reservations = reservations.related_fields().with_cancellation_info()
+        if "limit" in params:
+            reservations = reservations[: params["limit"]]
+        reservations = list(reservations)
+
+        response = Response(serializer_class(reservations, many=True).data)
+        if "limit" in params and reservations:
+            response["X-Last-List-Position"] = str(reservations[-1].list_position)
+        return response
 
 
 class ProjectAPIView(APIView):
@@ -93,12 +128,13 @@ class ProjectExportApplicantsAPIView(APIView):
             apartment_uuid__in=apartment_uuids
         )
         export_services = ApplicantExportService(reservations)
-        csv_file = export_services.get_csv_string()
         file_name = format_lazy(
             _("[Project {title}] Applicants information"),
             title=project.project_street_address,
         ).replace(" ", "_")
-        response = HttpResponse(csv_file, content_type="text/csv; charset=utf-8-sig")
+        response = StreamingHttpResponse(
+            export_services.iter_csv_bytes(), content_type="text/csv; charset=utf-8-sig"
+        )
         response["Content-Disposition"] = "attachment; filename={file_name}.csv".format(
             file_name=file_name
         )
@@ -117,12 +153,13 @@ class ProjectExportLotteryResultsAPIView(APIView):
         if LotteryEvent.objects.filter(apartment_uuid__in=apartment_uuids).count() == 0:
             raise ValidationError("Project lottery has not happened yet")
         export_services = ProjectLotteryResultExportService(project)
-        csv_file = export_services.get_csv_string()
         file_name = format_lazy(
             _("[Project {title}] Lottery result"),
             title=project.project_street_address,
         ).replace(" ", "_")
-        response = HttpResponse(csv_file, content_type="text/csv; charset=utf-8-sig")
+        response = StreamingHttpResponse(
+            export_services.iter_csv_bytes(), content_type="text/csv; charset=utf-8-sig"
+        )
         response["Content-Disposition"] = "attachment; filename={file_name}.csv".format(
             file_name=file_name
         )
@@ -157,13 +194,14 @@ class SaleReportAPIView(APIView):
             state=ApartmentReservationState.SOLD,
         )
         export_services = SaleReportExportService(state_events)
-        csv_file = export_services.get_csv_string()
         file_name = format_lazy(
             _("Sale report {start_date} - {end_date}"),
             start_date=start_date,
             end_date=end_date,
         ).replace(" ", "_")
-        response = HttpResponse(csv_file, content_type="text/csv; charset=utf-8-sig")
+        response = StreamingHttpResponse(
+            export_services.iter_csv_bytes(), content_type="text/csv; charset=utf-8-sig"
+        )
         response["Content-Disposition"] = "attachment; filename={file_name}.csv".format(
             file_name=file_name
         )
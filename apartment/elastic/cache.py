@@ -0,0 +1,157 @@
+"""
+Caching of the apartment and project lookups made to Elasticsearch.
+
+The same apartments and projects are often looked up many times while handling
+a single request. The lookups are cached on two levels:
+
+- a request scoped cache, which dedupes the lookups within one request and is
+  discarded when the request ends
+- the Django cache, where the results are kept for ELASTICSEARCH_CACHE_TIMEOUT
+  seconds and shared between requests and processes
+
+The apartment data is written to Elasticsearch by Drupal, outside this service, so
+nothing here can invalidate the cache when the data changes. A lookup result can
+therefore be stale for up to ELASTICSEARCH_CACHE_TIMEOUT seconds after an update,
+which is why the default timeout is kept short. The invalidate_* helpers are for
+code that writes to the index itself, such as the test factories.
+"""
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from inspect import signature
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = "elasticsearch"
+
+_request_cache: ContextVar[Optional[dict]] = ContextVar(
+    "elasticsearch_request_cache", default=None
+)
+_stats: Counter = Counter()
+
+
+def _get_cache_key(lookup_name: str, *args) -> str:
+    return ":".join([CACHE_KEY_PREFIX, lookup_name, *(str(arg) for arg in args)])
+
+
+def cached_lookup(lookup_name: str):
+    """Cache the results of the decorated Elasticsearch lookup.
+
+    The cache key is formed from `lookup_name` and the values of all the arguments
+    of the lookup, including the default ones. Failed lookups are not cached.
+    """
+
+    def decorator(func):
+        func_signature = signature(func)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            bound_arguments = func_signature.bind(*args, **kwargs)
+            bound_arguments.apply_defaults()
+            key = _get_cache_key(lookup_name, *bound_arguments.arguments.values())
+
+            request_cache = _request_cache.get()
+            if request_cache is not None and key in request_cache:
+                _stats[(lookup_name, "request_hits")] += 1
+                return request_cache[key]
+
+            timeout = settings.ELASTICSEARCH_CACHE_TIMEOUT
+            result = cache.get(key) if timeout > 0 else None
+            if result is not None:
+                _stats[(lookup_name, "cache_hits")] += 1
+            else:
+                _stats[(lookup_name, "misses")] += 1
+                result = func(*args, **kwargs)
+                if timeout > 0:
+                    cache.set(key, result, timeout)
+
+            if request_cache is not None:
+                request_cache[key] = result
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def _delete(*keys: str) -> None:
+    request_cache = _request_cache.get()
+    if request_cache is not None:
+        for key in keys:
+            request_cache.pop(key, None)
+    cache.delete_many(keys)
+
+
+def invalidate_apartment(apartment_uuid, project_uuid=None) -> None:
+    """Drop the cached data of the given apartment.
+
+    The data of its project is dropped as well if `project_uuid` is given, as the
+    project data and the apartment list of the project are read from the apartments.
+    """
+    _delete(
+        _get_cache_key("apartment", apartment_uuid, False),
+        _get_cache_key("apartment", apartment_uuid, True),
+    )
+    if project_uuid:
+        invalidate_project(project_uuid)
+
+
+def invalidate_project(project_uuid) -> None:
+    """Drop the cached data and the cached apartment list of the given project."""
+    _delete(
+        _get_cache_key("project", project_uuid),
+        _get_cache_key("apartment_uuids", project_uuid),
+    )
+
+
+@contextmanager
+def request_cache():
+    """Dedupe the cached lookups made within the block.
+
+    Nested blocks share the cache of the outermost block.
+    """
+    if _request_cache.get() is not None:
+        yield
+        return
+    token = _request_cache.set({})
+    try:
+        yield
+    finally:
+        _request_cache.reset(token)
+
+
+def get_cache_stats() -> Dict[str, Dict[str, int]]:
+    """Return the hit and miss counts of the cached lookups of this process."""
+    stats: Dict[str, Dict[str, int]] = {}
+    for (lookup_name, counter), value in _stats.items():
+        stats.setdefault(
+            lookup_name, {"request_hits": 0, "cache_hits": 0, "misses": 0}
+        )[counter] = value
+    return stats
+
+
+def reset_cache_stats() -> None:
+    _stats.clear()
+
+
+class ElasticsearchRequestCacheMiddleware:
+    """Use a request scoped cache for the Elasticsearch lookups of each request.
+
+    The cumulative cache stats of the process are logged at debug level after each
+    request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with request_cache():
+            response = self.get_response(request)
+        logger.debug("Elasticsearch cache stats: %s", get_cache_stats())
+        return response
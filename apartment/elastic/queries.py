@@ -1,8 +1,15 @@
+from typing import Dict, Iterable, List, Optional
+
 from django.core.exceptions import ObjectDoesNotExist
 
+from apartment.elastic.cache import cached_lookup
 from apartment.elastic.documents import ApartmentDocument
 
+# Maximum number of apartments fetched with a single search
+APARTMENT_BATCH_SIZE = 1000
+
 
+@cached_lookup("apartment")
 def get_apartment(apartment_uuid, include_project_fields=False):
     search = ApartmentDocument.search()
 
@@ -21,6 +28,64 @@ def get_apartment(apartment_uuid, include_project_fields=False):
     return apartment
 
 
+def get_apartments_by_uuids(
+    apartment_uuids: Iterable,
+    include_project_fields: bool = False,
+    fields: Optional[List[str]] = None,
+) -> Dict[str, ApartmentDocument]:
+    """Get many apartments at once, keyed by the string form of their UUID.
+
+    If `fields` is given, only those fields are retrieved. Apartments that don't
+    exist in ElasticSearch are left out of the result.
+    """
+    apartment_uuids = list(dict.fromkeys(str(uuid) for uuid in apartment_uuids))
+    apartments = {}
+    for batch_start in range(0, len(apartment_uuids), APARTMENT_BATCH_SIZE):
+        batch_end = batch_start + APARTMENT_BATCH_SIZE
+        batch = apartment_uuids[batch_start:batch_end]
+        search = ApartmentDocument.search()
+
+        # Filters
+        search = search.filter("terms", uuid__keyword=batch)
+
+        if fields is not None:
+            search = search.source(includes=list(dict.fromkeys(["uuid", *fields])))
+        elif not include_project_fields:
+            search = search.source(excludes=["project_*"])
+
+        # Get all items of the batch
+        search = search.extra(size=len(batch))
+        for apartment in search.execute():
+            apartments[apartment.uuid] = apartment
+
+    return apartments
+
+
+def get_apartments_by_project_uuids(
+    project_uuids: Iterable, fields: Optional[List[str]] = None
+) -> List[ApartmentDocument]:
+    """Get all apartments of the given projects.
+
+    If `fields` is given, only those fields are retrieved.
+    """
+    project_uuids = list(dict.fromkeys(str(uuid) for uuid in project_uuids))
+    if not project_uuids:
+        return []
+
+    search = ApartmentDocument.search()
+
+    # Filters
+    search = search.filter("terms", project_uuid__keyword=project_uuids)
+
+    if fields is not None:
+        search = search.source(
+            includes=list(dict.fromkeys(["uuid", "project_uuid", *fields]))
+        )
+
+    # Get all items
+    return list(search.scan())
+
+
 def get_apartment_project_uuid(apartment_uuid):
     search = ApartmentDocument.search()
 
@@ -54,6 +119,7 @@ def get_apartments(project_uuid=None):
     return response
 
 
+@cached_lookup("apartment_uuids")
 def get_apartment_uuids(project_uuid):
     search = ApartmentDocument.search()
 
@@ -69,6 +135,7 @@ def get_apartment_uuids(project_uuid):
     return result
 
 
+@cached_lookup("project")
 def get_project(project_uuid):
     search = ApartmentDocument.search()
 
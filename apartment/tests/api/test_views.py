@@ -2,6 +2,8 @@ import uuid
 from urllib.parse import urlencode
 
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from apartment.elastic.queries import get_project
@@ -346,6 +348,45 @@ def test_project_detail_apartment_reservations_multiple_winning(
             )
 
 
+@pytest.mark.django_db
+def test_project_detail_apartments_query_count_does_not_depend_on_reservations(
+    sales_ui_salesperson_api_client, elastic_project_with_5_apartments
+):
+    project_uuid, apartments = elastic_project_with_5_apartments
+    url = reverse("apartment:project-detail", kwargs={"project_uuid": project_uuid})
+    for apartment in apartments:
+        ApartmentReservationFactory(
+            apartment_uuid=apartment.uuid,
+            list_position=1,
+            queue_position=1,
+            state=ApartmentReservationState.RESERVED,
+        )
+    # Reservations of other projects are not counted
+    ApartmentReservationFactory(list_position=1, queue_position=1)
+
+    with CaptureQueriesContext(connection) as context:
+        sales_ui_salesperson_api_client.get(url, format="json")
+    query_count = len(context.captured_queries)
+
+    for apartment in apartments:
+        for position in range(2, 5):
+            ApartmentReservationFactory(
+                apartment_uuid=apartment.uuid,
+                list_position=position,
+                queue_position=position,
+                state=ApartmentReservationState.SUBMITTED,
+            )
+
+    with CaptureQueriesContext(connection) as context:
+        response = sales_ui_salesperson_api_client.get(url, format="json")
+
+    assert len(context.captured_queries) == query_count
+    for apartment_data in response.data["apartments"]:
+        assert apartment_data["reservation_count"] == 4
+        assert apartment_data["state"] == "reserved"
+        assert apartment_data["winning_reservation"]["queue_position"] == 1
+
+
 @pytest.mark.django_db
 def test_apartment_detail_reservations(
     sales_ui_salesperson_api_client, elastic_project_with_5_apartments
@@ -407,6 +448,140 @@ def test_apartment_detail_reservations(
     _assert_apartment_reservations_data(reservation_data)
 
 
+@pytest.mark.django_db
+def test_apartment_detail_reservations_query_count_does_not_depend_on_cancellations(
+    sales_ui_salesperson_api_client, elastic_project_with_5_apartments
+):
+    project_uuid, apartments = elastic_project_with_5_apartments
+    apartment = apartments[0]
+    url = reverse(
+        "apartment:apartment-detail-reservations-list",
+        kwargs={"apartment_uuid": apartment.uuid},
+    )
+
+    def create_canceled_reservation(list_position):
+        reservation = ApartmentReservationFactory(
+            apartment_uuid=apartment.uuid,
+            list_position=list_position,
+            state=ApartmentReservationState.SUBMITTED,
+        )
+        reservation.set_state(
+            ApartmentReservationState.CANCELED,
+            cancellation_reason=ApartmentReservationCancellationReason.CANCELED,
+        )
+        return reservation
+
+    create_canceled_reservation(1)
+    with CaptureQueriesContext(connection) as context:
+        sales_ui_salesperson_api_client.get(url, format="json")
+    query_count = len(context.captured_queries)
+
+    for list_position in range(2, 6):
+        create_canceled_reservation(list_position)
+    with CaptureQueriesContext(connection) as context:
+        response = sales_ui_salesperson_api_client.get(url, format="json")
+
+    assert len(context.captured_queries) == query_count
+    assert len(response.data) == 5
+    for reservation_data in response.data:
+        assert (
+            reservation_data["cancellation_reason"]
+            == ApartmentReservationCancellationReason.CANCELED.value
+        )
+        assert reservation_data["cancellation_timestamp"] is not None
+
+
+@pytest.mark.django_db
+def test_apartment_detail_reservations_keyset_pagination(
+    sales_ui_salesperson_api_client, elastic_project_with_5_apartments
+):
+    project_uuid, apartments = elastic_project_with_5_apartments
+    apartment = apartments[0]
+    reservations = [
+        ApartmentReservationFactory(
+            apartment_uuid=apartment.uuid,
+            list_position=list_position,
+            queue_position=list_position,
+            state=ApartmentReservationState.SUBMITTED,
+        )
+        for list_position in range(1, 6)
+    ]
+    url = reverse(
+        "apartment:apartment-detail-reservations-list",
+        kwargs={"apartment_uuid": apartment.uuid},
+    )
+
+    response = sales_ui_salesperson_api_client.get(
+        url, {"limit": 2, "compact": "true"}, format="json"
+    )
+    assert response.status_code == 200
+    assert [r["id"] for r in response.data] == [r.id for r in reservations[:2]]
+    assert set(response.data[0].keys()) == {
+        "id",
+        "apartment_uuid",
+        "list_position",
+        "queue_position",
+        "state",
+        "customer",
+    }
+    assert response["X-Last-List-Position"] == "2"
+
+    response = sales_ui_salesperson_api_client.get(
+        url, {"limit": 2, "after_list_position": 4}, format="json"
+    )
+    assert [r["id"] for r in response.data] == [reservations[4].id]
+    assert "cancellation_reason" in response.data[0]
+    assert response["X-Last-List-Position"] == "5"
+
+    response = sales_ui_salesperson_api_client.get(
+        url, {"limit": 2, "after_list_position": 5}, format="json"
+    )
+    assert response.data == []
+    assert "X-Last-List-Position" not in response
+
+
+@pytest.mark.django_db
+def test_apartment_detail_reservations_filter_by_state(
+    sales_ui_salesperson_api_client, elastic_project_with_5_apartments
+):
+    project_uuid, apartments = elastic_project_with_5_apartments
+    apartment = apartments[0]
+    active_reservation = ApartmentReservationFactory(
+        apartment_uuid=apartment.uuid,
+        list_position=1,
+        queue_position=1,
+        state=ApartmentReservationState.RESERVED,
+    )
+    canceled_reservation = ApartmentReservationFactory(
+        apartment_uuid=apartment.uuid,
+        list_position=2,
+        state=ApartmentReservationState.CANCELED,
+    )
+    url = reverse(
+        "apartment:apartment-detail-reservations-list",
+        kwargs={"apartment_uuid": apartment.uuid},
+    )
+
+    response = sales_ui_salesperson_api_client.get(url, format="json")
+    assert len(response.data) == 2
+    assert "X-Last-List-Position" not in response
+
+    response = sales_ui_salesperson_api_client.get(
+        url, {"state": "active"}, format="json"
+    )
+    assert [r["id"] for r in response.data] == [active_reservation.id]
+
+    response = sales_ui_salesperson_api_client.get(
+        url, {"state": "canceled"}, format="json"
+    )
+    assert [r["id"] for r in response.data] == [canceled_reservation.id]
+
+    response = sales_ui_salesperson_api_client.get(
+        url, {"state": "sold"}, format="json"
+    )
+    assert response.status_code == 400
+
+
 @pytest.mark.django_db
 def test_export_applicants_csv_per_project_unauthorized(
     user_api_client, elastic_project_with_5_apartments
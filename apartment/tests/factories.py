@@ -7,6 +7,7 @@ from django.utils import timezone
 from elasticsearch_dsl import Document
 from factory import Faker, fuzzy
 
+from apartment.elastic.cache import invalidate_apartment
 from apartment.elastic.documents import ApartmentDocument
 
 datetime_string_format = "%Y-%m-%dT%H:%M:%S%z"
@@ -14,12 +15,15 @@ datetime_string_format = "%Y-%m-%dT%H:%M:%S%z"
 
 class ApartmentDocumentTest(ApartmentDocument):
     def save(self, **kwargs):
+        invalidate_apartment(self.uuid, self.project_uuid)
         return Document.save(self, **kwargs)
 
     def update(self, **fields):
+        invalidate_apartment(self.uuid, self.project_uuid)
         return Document.update(self, **fields)
 
     def delete(self, **kwargs):
+        invalidate_apartment(self.uuid, self.project_uuid)
         return Document.delete(self, **kwargs)
 
     class Index:
@@ -0,0 +1,101 @@
+import logging
+import uuid
+
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.test import override_settings
+from pytest import fixture, mark, raises
+
+from apartment.elastic.cache import (
+    ElasticsearchRequestCacheMiddleware,
+    get_cache_stats,
+    invalidate_apartment,
+    request_cache,
+    reset_cache_stats,
+)
+from apartment.elastic.queries import get_apartment, get_apartment_uuids, get_project
+
+
+@fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    reset_cache_stats()
+
+
+@mark.django_db
+@override_settings(ELASTICSEARCH_CACHE_TIMEOUT=0)
+def test_request_cache_dedupes_lookups(elastic_project_with_5_apartments):
+    project_uuid, apartments = elastic_project_with_5_apartments
+
+    with request_cache():
+        first = get_apartment(apartments[0].uuid)
+        second = get_apartment(str(apartments[0].uuid), include_project_fields=False)
+        get_project(project_uuid)
+        get_project(project_uuid)
+    get_apartment(apartments[0].uuid)
+
+    assert first is second
+    assert get_cache_stats() == {
+        "apartment": {"request_hits": 1, "cache_hits": 0, "misses": 2},
+        "project": {"request_hits": 1, "cache_hits": 0, "misses": 1},
+    }
+
+
+@mark.django_db
+def test_lookups_are_cached_between_requests(elastic_project_with_5_apartments):
+    project_uuid, apartments = elastic_project_with_5_apartments
+
+    apartment_uuids = get_apartment_uuids(project_uuid)
+    assert get_apartment_uuids(project_uuid) == apartment_uuids
+    assert get_apartment(apartments[0].uuid).uuid == apartments[0].uuid
+    assert get_apartment(apartments[0].uuid).uuid == apartments[0].uuid
+    get_apartment(apartments[0].uuid, include_project_fields=True)
+
+    assert get_cache_stats() == {
+        "apartment_uuids": {"request_hits": 0, "cache_hits": 1, "misses": 1},
+        "apartment": {"request_hits": 0, "cache_hits": 1, "misses": 2},
+    }
+
+
+@mark.django_db
+def test_invalidate_apartment(elastic_project_with_5_apartments):
+    project_uuid, apartments = elastic_project_with_5_apartments
+    apartment = apartments[0]
+
+    with request_cache():
+        get_apartment(apartment.uuid)
+        get_project(project_uuid)
+        apartment.update(apartment_number="X 123", refresh=True)
+        assert get_apartment(apartment.uuid).apartment_number == "X 123"
+        get_project(project_uuid)
+
+    assert get_cache_stats() == {
+        "apartment": {"request_hits": 0, "cache_hits": 0, "misses": 2},
+        "project": {"request_hits": 0, "cache_hits": 0, "misses": 2},
+    }
+
+    invalidate_apartment(apartment.uuid)
+    get_apartment(apartment.uuid)
+    assert get_cache_stats()["apartment"]["misses"] == 3
+
+
+@mark.django_db
+def test_failed_lookups_are_not_cached(elasticsearch):
+    apartment_uuid = uuid.uuid4()
+
+    for _ in range(2):
+        with raises(ObjectDoesNotExist):
+            get_apartment(apartment_uuid)
+
+    assert get_cache_stats() == {
+        "apartment": {"request_hits": 0, "cache_hits": 0, "misses": 2}
+    }
+
+
+def test_middleware_logs_cache_stats(caplog):
+    middleware = ElasticsearchRequestCacheMiddleware(lambda request: "response")
+
+    with caplog.at_level(logging.DEBUG, logger="apartment.elastic.cache"):
+        assert middleware(None) == "response"
+
+    assert "Elasticsearch cache stats: {}" in caplog.messages
@@ -0,0 +1,41 @@
+import uuid
+
+from pytest import mark
+
+from apartment.elastic.queries import get_apartments_by_uuids
+
+
+@mark.django_db
+def test_get_apartments_by_uuids(elastic_project_with_5_apartments):
+    project_uuid, apartments = elastic_project_with_5_apartments
+    missing_uuid = uuid.uuid4()
+
+    result = get_apartments_by_uuids(
+        [apartments[0].uuid, apartments[1].uuid, apartments[0].uuid, missing_uuid]
+    )
+
+    assert set(result) == {str(apartments[0].uuid), str(apartments[1].uuid)}
+    assert result[str(apartments[1].uuid)].apartment_number == (
+        apartments[1].apartment_number
+    )
+    assert "project_uuid" not in result[str(apartments[1].uuid)]
+
+
+@mark.django_db
+def test_get_apartments_by_uuids_with_fields(elastic_project_with_5_apartments):
+    project_uuid, apartments = elastic_project_with_5_apartments
+
+    result = get_apartments_by_uuids(
+        [apartment.uuid for apartment in apartments], fields=["project_uuid"]
+    )
+
+    assert len(result) == 5
+    for apartment in result.values():
+        assert apartment.to_dict() == {
+            "uuid": apartment.uuid,
+            "project_uuid": str(project_uuid),
+        }
+
+
+def test_get_apartments_by_uuids_without_uuids():
+    assert get_apartments_by_uuids([]) == {}
@@ -10,7 +10,10 @@ from apartment.api.views import (
     ProjectExtraDataAPIView,
     SaleReportAPIView,
 )
-from invoicing.api.views import ProjectInstallmentTemplateAPIView
+from invoicing.api.views import (
+    ProjectInstallmentTemplateAPIView,
+    ProjectReceivablesAPIView,
+)
 
 router = DefaultRouter()
 
@@ -37,6 +40,11 @@ urlpatterns = [
         ProjectInstallmentTemplateAPIView.as_view(),
         name="project-installment-template-list",
     ),
+    path(
+        "sales/projects/<uuid:project_uuid>/receivables/",
+        ProjectReceivablesAPIView.as_view(),
+        name="project-receivables",
+    ),
     path(
         "sales/projects/<uuid:project_uuid>/export_applicants/",
         ProjectExportApplicantsAPIView.as_view(),
@@ -1,7 +1,15 @@
-from apartment.elastic.queries import get_apartment
+from typing import Dict, Iterable
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Count, Q
+
+from apartment.elastic.queries import get_apartment, get_apartments_by_uuids
 from apartment.enums import ApartmentState, OwnershipType
 from application_form.enums import ApartmentReservationState
-from application_form.models import ApartmentReservation
+from application_form.models import (
+    ApartmentReservation,
+    ApartmentReservationStateChangeEvent,
+)
 from connections.enums import ApartmentStateOfSale
 
 
@@ -64,6 +72,59 @@ def get_apartment_state_of_sale_from_event(event):
         return ApartmentStateOfSale.RESERVED
 
 
+def get_apartment_states_of_sale_from_events(
+    events: Iterable[ApartmentReservationStateChangeEvent],
+) -> Dict[str, ApartmentStateOfSale]:
+    """
+    Same as `get_apartment_state_of_sale_from_event`, but for the latest events of
+    many apartments at once. Returns the states of sale keyed by apartment UUID string.
+    """
+    events = {str(event.reservation.apartment_uuid): event for event in events}
+
+    canceled_apartment_uuids = [
+        apartment_uuid
+        for apartment_uuid, event in events.items()
+        if event.state == ApartmentReservationState.CANCELED
+    ]
+    active_counts = {
+        str(row["apartment_uuid"]): row
+        for row in ApartmentReservation.objects.active()
+        .filter(apartment_uuid__in=canceled_apartment_uuids)
+        .values("apartment_uuid")
+        .annotate(
+            active_count=Count("id"),
+            sold_count=Count("id", filter=Q(state=ApartmentReservationState.SOLD)),
+        )
+        .order_by()
+    }
+
+    states = {}
+    for apartment_uuid, event in events.items():
+        if event.state == ApartmentReservationState.SOLD:
+            states[apartment_uuid] = ApartmentStateOfSale.SOLD
+        elif event.state == ApartmentReservationState.CANCELED:
+            counts = active_counts.get(apartment_uuid)
+            if counts is None:
+                states[apartment_uuid] = ApartmentStateOfSale.FREE_FOR_RESERVATIONS
+            elif counts["sold_count"]:
+                states[apartment_uuid] = ApartmentStateOfSale.SOLD
+
+    apartments = get_apartments_by_uuids(
+        [uuid for uuid in events if uuid not in states],
+        fields=["project_ownership_type"],
+    )
+    for apartment_uuid in events.keys() - states.keys():
+        if apartment_uuid not in apartments:
+            raise ObjectDoesNotExist("Apartment does not exist in ElasticSearch.")
+        apartment_type = apartments[apartment_uuid].project_ownership_type
+        if apartment_type.lower() == OwnershipType.HASO.value:
+            states[apartment_uuid] = ApartmentStateOfSale.RESERVED_HASO
+        else:
+            states[apartment_uuid] = ApartmentStateOfSale.RESERVED
+
+    return {apartment_uuid: states[apartment_uuid] for apartment_uuid in events}
+
+
 def get_apartment_state_from_reserved_reservations(reserved_reservations):
     reservation_list = list(reserved_reservations)
     if len(reservation_list) == 0:
@@ -1,11 +1,17 @@
 from typing import Optional
 
 from django.db import models
+from django.db.models import Case, F, Value, When
+from django.db.models.expressions import Expression
 from django.utils.translation import gettext_lazy as _
 from pgcrypto.fields import IntegerPGPPublicKeyField
 
 from apartment_application_service.fields import BooleanPGPPublicKeyField
 
+# Added to the right of residence numbers of the new batch, so that the old batch is
+# ordered before them
+NEW_BATCH_RIGHT_OF_RESIDENCE_ORDERING_OFFSET = 100000000
+
 
 class TimestampedModel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
@@ -53,15 +59,42 @@ class CommonApplicationData(models.Model):
         if self.right_of_residence_is_old_batch:
             return self.right_of_residence
         else:
-            return self.right_of_residence + 100000000
+            return (
+                self.right_of_residence + NEW_BATCH_RIGHT_OF_RESIDENCE_ORDERING_OFFSET
+            )
 
-    def save(self, *args, **kwargs):
+    def normalize_right_of_residence_fields(self):
+        """Set right_of_residence_is_old_batch to match right_of_residence.
+
+        Called on save, and needs to be called explicitly when saving with bulk_create.
+        """
         if self.right_of_residence is None:
             self.right_of_residence_is_old_batch = None
         elif self.right_of_residence_is_old_batch is None:
             # right_of_residence_is_old_batch default value is False
             self.right_of_residence_is_old_batch = False
+
+    def save(self, *args, **kwargs):
+        self.normalize_right_of_residence_fields()
         super().save(*args, **kwargs)
 
     class Meta:
         abstract = True
+
+
+def get_right_of_residence_ordering_number_expression(prefix: str = "") -> Expression:
+    """Database expression of `right_of_residence_ordering_number`.
+
+    `prefix` is the lookup path to the model inheriting `CommonApplicationData`, e.g.
+    "application_apartment__application__". The encrypted fields are decrypted in the
+    database, so the expression can be used for ordering and filtering in SQL.
+    """
+    return Case(
+        When(
+            **{f"{prefix}right_of_residence_is_old_batch": True},
+            then=F(f"{prefix}right_of_residence"),
+        ),
+        default=F(f"{prefix}right_of_residence")
+        + Value(NEW_BATCH_RIGHT_OF_RESIDENCE_ORDERING_OFFSET),
+        output_field=models.IntegerField(),
+    )
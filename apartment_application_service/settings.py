@@ -4,6 +4,7 @@ from datetime import timedelta
 
 import environ
 import sentry_sdk
+from django.core.exceptions import ImproperlyConfigured
 from django.utils.translation import gettext_lazy as _
 from sentry_sdk.integrations.django import DjangoIntegration
 
@@ -57,6 +58,7 @@ env = environ.Env(
     ELASTICSEARCH_USERNAME=(str, ""),
     ELASTICSEARCH_PASSWORD=(str, ""),
     APARTMENT_INDEX_NAME=(str, "asuntotuotanto-apartments"),
+    ELASTICSEARCH_CACHE_TIMEOUT=(int, 10),
     ETUOVI_SUPPLIER_SOURCE_ITEMCODE=(str, ""),
     ETUOVI_COMPANY_NAME=(str, ""),
     ETUOVI_TRANSFER_ID=(str, ""),
@@ -72,6 +74,7 @@ env = environ.Env(
     OIKOTIE_PASSWORD=(str, ""),
     APARTMENT_DATA_TRANSFER_PATH=(str, "transfer_files"),
     HASHIDS_SALT=(str, ""),
+    PROFILE_SEARCH_INDEX_KEY=(str, ""),
     PUBLIC_PGP_KEY=(str, ""),
     PRIVATE_PGP_KEY=(str, ""),
     SAP_SFTP_USERNAME=(str, ""),
@@ -89,6 +92,7 @@ env = environ.Env(
     SAP_SFTP_FETCH_PASSWORD=(str, ""),
     SAP_SFTP_FETCH_HOST=(str, ""),
     SAP_SFTP_FETCH_PORT=(int, 22),
+    SAP_SFTP_FETCH_CONCURRENCY=(int, 4),
     METADATA_HANDLER_INFORMATION=(
         str,
         "0201256-6 / Kaupunkiympäristön toimiala / Asuntotuotanto / Asuntomyynti",
@@ -209,6 +213,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "simple_history.middleware.HistoryRequestMiddleware",
+    "apartment.elastic.cache.ElasticsearchRequestCacheMiddleware",
 ]
 
 TEMPLATES = [
@@ -372,7 +377,9 @@ SAP_DAYS_UNTIL_INSTALLMENT_DUE_DATE = env("SAP_DAYS_UNTIL_INSTALLMENT_DUE_DATE")
 SAP_SFTP_FETCH_USERNAME = env("SAP_SFTP_FETCH_USERNAME", default=SAP_SFTP_USERNAME)
 SAP_SFTP_FETCH_PASSWORD = env("SAP_SFTP_FETCH_PASSWORD", default=SAP_SFTP_PASSWORD)
 SAP_SFTP_FETCH_HOST = env("SAP_SFTP_FETCH_HOST", default=SAP_SFTP_HOST)
-SAP_SFTP_FETCH_PORT = env("SAP_SFTP_FETCH_PORT", default=SAP_SFTP_PORT)
+SAP_SFTP_FETCH_PORT = env("SAP_SFTP_FETCH_PORT")
+# Number of payment files downloaded concurrently ahead of the processing
+SAP_SFTP_FETCH_CONCURRENCY = env("SAP_SFTP_FETCH_CONCURRENCY")
 
 # Elasticsearch
 ELASTICSEARCH_URL = env("ELASTICSEARCH_URL")
@@ -380,6 +387,10 @@ ELASTICSEARCH_PORT = env("ELASTICSEARCH_PORT")
 ELASTICSEARCH_USERNAME = env("ELASTICSEARCH_USERNAME")
 ELASTICSEARCH_PASSWORD = env("ELASTICSEARCH_PASSWORD")
 APARTMENT_INDEX_NAME = env("APARTMENT_INDEX_NAME")
+# Seconds to keep apartment and project lookups in the cache, 0 disables the cache.
+# The cache is not invalidated when Drupal updates the index, so this is also the
+# maximum time the API may serve stale apartment and project data.
+ELASTICSEARCH_CACHE_TIMEOUT = env("ELASTICSEARCH_CACHE_TIMEOUT")
 
 # Etuovi settings
 ETUOVI_SUPPLIER_SOURCE_ITEMCODE = env("ETUOVI_SUPPLIER_SOURCE_ITEMCODE")
@@ -400,6 +411,13 @@ OIKOTIE_PASSWORD = env("OIKOTIE_PASSWORD")
 APARTMENT_DATA_TRANSFER_PATH = env("APARTMENT_DATA_TRANSFER_PATH")
 
 HASHIDS_SALT = env("HASHIDS_SALT")
+# Key of the blind index used for searching profiles, see users.search. The index
+# has to be rebuilt with the rebuild_profile_search_index command when it changes.
+PROFILE_SEARCH_INDEX_KEY = env.str("PROFILE_SEARCH_INDEX_KEY")
+if DEBUG and not PROFILE_SEARCH_INDEX_KEY:
+    PROFILE_SEARCH_INDEX_KEY = "xxx"
+if not PROFILE_SEARCH_INDEX_KEY:
+    raise ImproperlyConfigured("PROFILE_SEARCH_INDEX_KEY must be set")
 SIMPLE_JWT = {"ACCESS_TOKEN_LIFETIME": timedelta(minutes=30)}
 
 # For pgcrypto
@@ -23,3 +23,5 @@ ELASTICSEARCH_URL = test_env("TEST_ELASTICSEARCH_URL")
 ELASTICSEARCH_PORT = test_env("TEST_ELASTICSEARCH_PORT")
 ELASTICSEARCH_USERNAME = test_env("TEST_ELASTICSEARCH_USERNAME")
 ELASTICSEARCH_PASSWORD = test_env("TEST_ELASTICSEARCH_PASSWORD")
+
+PROFILE_SEARCH_INDEX_KEY = "test-profile-search-index-key"
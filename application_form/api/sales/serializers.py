@@ -5,7 +5,7 @@ from uuid import UUID
 
 from django.core.exceptions import ObjectDoesNotExist
 from drf_spectacular.utils import extend_schema_field
-from enumfields.drf import EnumSupportSerializerMixin
+from enumfields.drf import EnumField, EnumSupportSerializerMixin
 from rest_framework import serializers
 from rest_framework.fields import UUIDField
 
@@ -124,6 +124,11 @@ class SalesApartmentReservationSerializer(ApartmentReservationSerializerBase):
 
     def get_cancellation_reason(self, obj):
         if obj.state == ApartmentReservationState.CANCELED:
+            # The cancellation info can be annotated beforehand with
+            # ApartmentReservationQuerySet.with_cancellation_info()
+            if hasattr(obj, "cancellation_reason"):
+                reason = obj.cancellation_reason
+                return getattr(reason, "value", reason)
             try:
                 latest_canceled_event = obj.state_change_events.filter(
                     state=ApartmentReservationState.CANCELED
@@ -139,6 +144,8 @@ class SalesApartmentReservationSerializer(ApartmentReservationSerializerBase):
 
     def get_cancellation_timestamp(self, obj):
         if obj.state == ApartmentReservationState.CANCELED:
+            if hasattr(obj, "cancellation_timestamp"):
+                return obj.cancellation_timestamp
             try:
                 return (
                     obj.state_change_events.filter(
@@ -163,6 +170,35 @@ class SalesWinningApartmentReservationSerializer(SalesApartmentReservationSerial
         )
 
 
+class SalesApartmentReservationCompactSerializer(serializers.ModelSerializer):
+    state = EnumField(ApartmentReservationState, read_only=True)
+
+    class Meta:
+        model = ApartmentReservation
+        fields = (
+            "id",
+            "apartment_uuid",
+            "list_position",
+            "queue_position",
+            "state",
+            "customer",
+        )
+        read_only_fields = fields
+
+
+class ApartmentReservationsQuerySerializer(serializers.Serializer):
+    STATE_ACTIVE = "active"
+    STATE_CANCELED = "canceled"
+    MAX_LIMIT = 1000
+
+    state = serializers.ChoiceField(
+        choices=[STATE_ACTIVE, STATE_CANCELED], required=False
+    )
+    compact = serializers.BooleanField(default=False)
+    after_list_position = serializers.IntegerField(required=False)
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=MAX_LIMIT)
+
+
 class RootApartmentReservationSerializer(ApartmentReservationSerializerBase):
     installments = ApartmentInstallmentSerializer(
         source="apartment_installments", many=True, read_only=True
@@ -3,6 +3,7 @@ from datetime import timedelta
 from dateutil import parser
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Max
 from django.http import HttpResponse
 from django.utils import timezone
 from django.views.decorators.http import require_http_methods
@@ -20,7 +21,7 @@ from rest_framework.response import Response
 
 from apartment.elastic.queries import get_apartment, get_project
 from apartment.models import ProjectExtraData
-from apartment.utils import get_apartment_state_of_sale_from_event
+from apartment.utils import get_apartment_states_of_sale_from_events
 from application_form.api.sales.serializers import (
     OfferMessageSerializer,
     OfferSerializer,
@@ -63,6 +64,9 @@ from application_form.services.reservation import (
 from audit_log.viewsets import AuditLoggingModelViewSet
 from users.permissions import IsDjangoSalesperson, IsDrupalSalesperson
 
+# The longest time expected between creating a state event and committing it
+STATE_EVENT_COMMIT_MARGIN = timedelta(minutes=5)
+
 
 @api_view(http_method_names=["POST"])
 @permission_classes([IsDjangoSalesperson])
@@ -102,6 +106,18 @@ def apartment_states(request):
     By default
         start_time: timezone.now() - timedelta(hours=1)
         end_time = timezone.now()
+
+    If after_event_id is given, only the apartments that have state events newer than
+    that event are returned, regardless of start_time. The X-Last-Event-Id header
+    gives the after_event_id to be used in the next request.
+
+    The event ids are allocated when the events are created, not when they are
+    committed, so an event can become visible after events with greater ids. To not
+    skip such events, X-Last-Event-Id is the id of the latest event created more
+    than STATE_EVENT_COMMIT_MARGIN ago, and the newer events are returned again in
+    the next request. No state change is missed as long as its transaction commits
+    within STATE_EVENT_COMMIT_MARGIN of creating the event, but the same state can
+    be returned more than once.
     """
     end_time_obj = timezone.now()
     start_time_obj = end_time_obj - timedelta(
@@ -126,24 +142,41 @@ def apartment_states(request):
         )
 
     # Select the latest state event of apartments that have been distributed
-    state_events = (
-        ApartmentReservationStateChangeEvent.objects.filter(
-            timestamp__range=[start_time_obj, end_time_obj],
-            reservation__apartment_uuid__in=LotteryEvent.objects.values(
-                "apartment_uuid"
-            ),
+    state_events = ApartmentReservationStateChangeEvent.objects.filter(
+        reservation__apartment_uuid__in=LotteryEvent.objects.values("apartment_uuid"),
+    )
+    if after_event_id := request.query_params.get("after_event_id"):
+        try:
+            after_event_id = int(after_event_id)
+        except ValueError:
+            raise ValidationError("after_event_id must be an integer")
+        state_events = state_events.filter(
+            id__gt=after_event_id, timestamp__lte=end_time_obj
+        )
+    else:
+        state_events = state_events.filter(
+            timestamp__range=[start_time_obj, end_time_obj]
         )
-        .select_related("reservation")
+    state_events_query = state_events
+    state_events = list(
+        state_events.select_related("reservation")
         .order_by("reservation__apartment_uuid", "-timestamp")
         .distinct("reservation__apartment_uuid")
     )
 
-    results = {
-        str(e.reservation.apartment_uuid): get_apartment_state_of_sale_from_event(e)
-        for e in state_events
-    }
+    results = get_apartment_states_of_sale_from_events(state_events)
 
-    return Response(results, status=status.HTTP_200_OK)
+    response = Response(results, status=status.HTTP_200_OK)
+    last_event_id = (
+        state_events_query.filter(
+            timestamp__lt=timezone.now() - STATE_EVENT_COMMIT_MARGIN
+        ).aggregate(Max("id"))["id__max"]
+        or after_event_id
+        or None
+    )
+    if last_event_id is not None:
+        response["X-Last-Event-Id"] = str(last_event_id)
+    return response
 
 
 class SalesApplicationViewSet(ApplicationViewSet):
@@ -4,7 +4,7 @@ from typing import Optional
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.db import models, transaction
-from django.db.models import Deferrable, UniqueConstraint
+from django.db.models import Deferrable, OuterRef, Subquery, UniqueConstraint
 from django.utils.translation import gettext_lazy as _
 from enumfields import EnumField
 from pgcrypto.fields import BooleanPGPPublicKeyField, CharPGPPublicKeyField
@@ -46,6 +46,20 @@ class ApartmentReservationQuerySet(models.QuerySet):
     def active(self):
         return self.exclude(state=ApartmentReservationState.CANCELED)
 
+    def with_cancellation_info(self):
+        """Annotate the reason and the timestamp of the latest cancellation."""
+        latest_canceled_event = ApartmentReservationStateChangeEvent.objects.filter(
+            reservation=OuterRef("pk"), state=ApartmentReservationState.CANCELED
+        ).order_by("-timestamp", "-id")
+        return self.annotate(
+            cancellation_reason=Subquery(
+                latest_canceled_event.values("cancellation_reason")[:1]
+            ),
+            cancellation_timestamp=Subquery(
+                latest_canceled_event.values("timestamp")[:1]
+            ),
+        )
+
     def first_in_queue(
         self, apartment_uuid: uuid.UUID
     ) -> Optional["ApartmentReservation"]:
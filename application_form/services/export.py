@@ -1,18 +1,20 @@
+import codecs
 import csv
 import operator
 from abc import abstractmethod
+from collections import Counter, defaultdict
 from io import StringIO
+from itertools import groupby
 
-from django.db.models import Max
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Case, Count, IntegerField, Max, Q, QuerySet, Value, When
 
 from apartment.elastic.queries import (
-    get_apartment,
-    get_apartment_project_uuid,
     get_apartment_uuids,
-    get_project,
+    get_apartments_by_project_uuids,
+    get_apartments_by_uuids,
 )
-from apartment.enums import ApartmentState
-from apartment.utils import get_apartment_state_from_apartment_uuid
+from application_form.enums import ApartmentReservationState
 from application_form.models import ApartmentReservation, LotteryEvent
 from application_form.utils import get_apartment_number_sort_tuple
 
@@ -53,13 +55,38 @@ def _get_reservation_cell_value(column_name, apartment=None, reservation=None):
     return ""
 
 
+def _get_apartment(apartments, apartment_uuid):
+    try:
+        return apartments[str(apartment_uuid)]
+    except KeyError:
+        raise ObjectDoesNotExist("Apartment does not exist in ElasticSearch.")
+
+
 class CSVExportService:
     CSV_DELIMITER = ";"
     FILE_ENCODING = "utf-8-sig"
     COLUMNS = []
+    # Approximate size in characters of the chunks the CSV is streamed in
+    STREAM_CHUNK_SIZE = 64 * 1024
 
-    @abstractmethod
     def get_rows(self):
+        return list(self.iter_rows())
+
+    def prepare(self):
+        """Fetch the data the rows are built from, unless already fetched.
+
+        Everything that can fail, e.g. the Elasticsearch lookups, is done here, so
+        that the errors are raised before any of the CSV has been streamed.
+        """
+        if not getattr(self, "_prepared", False):
+            self._prepare()
+            self._prepared = True
+
+    def _prepare(self):
+        pass
+
+    @abstractmethod
+    def iter_rows(self):
         pass
 
     @abstractmethod
@@ -70,25 +97,42 @@ class CSVExportService:
         return [col[0] for col in self.COLUMNS]
 
     def write_csv_file(self, path):
-        csv_string = self.get_csv_string()
         with open(path, encoding=self.FILE_ENCODING, mode="w") as f:
-            f.write(csv_string)
+            f.writelines(self.iter_csv())
 
     def get_csv_string(self):
-        return self._make_csv(self.get_rows())
-
-    def _make_csv(self, lines):
-        if len(lines) == 0:
-            return ""
+        return "".join(self.iter_csv())
 
+    def iter_csv(self):
+        """Render the rows to CSV text in chunks of about STREAM_CHUNK_SIZE."""
         io = StringIO()
         csv_writer = csv.writer(
             io, delimiter=self.CSV_DELIMITER, quoting=csv.QUOTE_NONNUMERIC
         )
-        for line in lines:
+        for line in self.iter_rows():
             csv_writer.writerow(line)
-
-        return io.getvalue()
+            if io.tell() >= self.STREAM_CHUNK_SIZE:
+                yield io.getvalue()
+                io.seek(0)
+                io.truncate()
+        if io.tell():
+            yield io.getvalue()
+
+    def iter_csv_bytes(self):
+        """Render the CSV encoded with FILE_ENCODING, e.g. for StreamingHttpResponse.
+
+        The chunks concatenate to the same bytes as encoding `get_csv_string()`. The
+        data is prepared already when this is called, so that the errors are raised
+        before a streaming response is returned.
+        """
+        self.prepare()
+        return self._iter_csv_bytes()
+
+    def _iter_csv_bytes(self):
+        encoder = codecs.getincrementalencoder(self.FILE_ENCODING)()
+        for chunk in self.iter_csv():
+            yield encoder.encode(chunk)
+        yield encoder.encode("", final=True)
 
 
 class ApplicantExportService(CSVExportService):
@@ -107,21 +151,42 @@ class ApplicantExportService(CSVExportService):
         ("Apartment area", "living_area"),
     ]
 
+    # Number of reservations read from the database at a time
+    CHUNK_SIZE = 500
+
     def __init__(self, reservations):
         self.reservations = reservations
 
     def get_reservations(self):
         return self.reservations
 
-    def get_rows(self):
-        rows = [self._get_header_row()]
-        for reservation in self.reservations:
-            apartment = get_apartment(
-                reservation.apartment_uuid, include_project_fields=True
+    def _iter_reservations(self):
+        if isinstance(self.reservations, QuerySet):
+            return self.reservations.select_related(
+                "customer__primary_profile", "customer__secondary_profile"
+            ).iterator(chunk_size=self.CHUNK_SIZE)
+        return iter(self.reservations)
+
+    def _prepare(self):
+        if isinstance(self.reservations, QuerySet):
+            apartment_uuids = self.reservations.order_by().values_list(
+                "apartment_uuid", flat=True
             )
-            row = self.get_row(reservation, apartment)
-            rows.append(row)
-        return rows
+        else:
+            apartment_uuids = (r.apartment_uuid for r in self.reservations)
+        apartment_uuids = {str(apartment_uuid) for apartment_uuid in apartment_uuids}
+        self.apartments = get_apartments_by_uuids(
+            apartment_uuids, include_project_fields=True
+        )
+        for apartment_uuid in apartment_uuids:
+            _get_apartment(self.apartments, apartment_uuid)
+
+    def iter_rows(self):
+        self.prepare()
+        yield self._get_header_row()
+        for reservation in self._iter_reservations():
+            apartment = self.apartments[str(reservation.apartment_uuid)]
+            yield self.get_row(reservation, apartment)
 
     def get_row(self, reservation, apartment):
         line = []
@@ -133,6 +198,8 @@ class ApplicantExportService(CSVExportService):
 
 class ProjectLotteryResultExportService(CSVExportService):
     CSV_TITLE = "ARVONTATULOKSET"
+    # Number of reservations read from the database at a time
+    CHUNK_SIZE = 500
 
     def __init__(self, project):
         self.project = project
@@ -158,9 +225,17 @@ class ProjectLotteryResultExportService(CSVExportService):
             ]
 
     def get_reservations_by_apartment_uuid(self, apartment_uuid):
+        return self._get_reservations([apartment_uuid])
+
+    def _get_reservations(self, apartment_uuids):
         return (
-            ApartmentReservation.objects.filter(apartment_uuid=apartment_uuid)
+            ApartmentReservation.objects.filter(apartment_uuid__in=apartment_uuids)
             .exclude(application_apartment__lotteryeventresult__isnull=True)
+            .select_related(
+                "customer__primary_profile",
+                "customer__secondary_profile",
+                "application_apartment__lotteryeventresult",
+            )
             .order_by("application_apartment__lotteryeventresult__result_position")
         )
 
@@ -178,34 +253,64 @@ class ProjectLotteryResultExportService(CSVExportService):
             [self.project.project_housing_company],
         ]
 
-    def get_rows(self):
+    def _prepare(self):
         apartment_uuids = get_apartment_uuids(self.project.project_uuid)
-        rows = [*self._get_document_title(apartment_uuids), self._get_header_row()]
-
-        # collect rows first to this dict grouped by apartment number so that they can
-        # be sorted by apartment number for the final result
-        apartment_dict = {}
-
-        for apartment_uuid in apartment_uuids:
-            reservations = self.get_reservations_by_apartment_uuid(apartment_uuid)
-            apartment = get_apartment(apartment_uuid, include_project_fields=True)
-            apartment_dict[apartment.apartment_number] = [
-                self.get_row(apartment=apartment if idx == 0 else None, reservation=r)
-                for idx, r in enumerate(reservations)
-            ] or [
-                # no reservations, just apartment fields
-                self.get_row(apartment)
-            ]
-
-        for apartment_rows in dict(
-            sorted(
-                apartment_dict.items(),
-                key=lambda item: get_apartment_number_sort_tuple(item[0]),
+        apartments = get_apartments_by_uuids(
+            apartment_uuids, include_project_fields=True
+        )
+        self.apartments = sorted(
+            (
+                _get_apartment(apartments, apartment_uuid)
+                for apartment_uuid in apartment_uuids
+            ),
+            key=lambda apartment: get_apartment_number_sort_tuple(
+                apartment.apartment_number
+            ),
+        )
+        self.document_title = self._get_document_title(apartment_uuids)
+
+    def _iter_reservations_by_apartment(self):
+        """Yield the apartment UUIDs with their reservations in apartment order."""
+        apartment_order = Case(
+            *(
+                When(apartment_uuid=apartment.uuid, then=Value(index))
+                for index, apartment in enumerate(self.apartments)
+            ),
+            output_field=IntegerField(),
+        )
+        reservations = (
+            self._get_reservations([apartment.uuid for apartment in self.apartments])
+            .order_by(
+                apartment_order,
+                "application_apartment__lotteryeventresult__result_position",
             )
-        ).values():
-            rows.extend(apartment_rows)
-
-        return rows
+            .iterator(chunk_size=self.CHUNK_SIZE)
+        )
+        for apartment_uuid, apartment_reservations in groupby(
+            reservations, key=lambda reservation: str(reservation.apartment_uuid)
+        ):
+            yield apartment_uuid, apartment_reservations
+
+    def iter_rows(self):
+        self.prepare()
+        yield from self.document_title
+        yield self._get_header_row()
+        if not self.apartments:
+            return
+
+        reservations_by_apartment = self._iter_reservations_by_apartment()
+        next_reservations = next(reservations_by_apartment, None)
+        for apartment in self.apartments:
+            if next_reservations and next_reservations[0] == str(apartment.uuid):
+                for idx, reservation in enumerate(next_reservations[1]):
+                    yield self.get_row(
+                        apartment=apartment if idx == 0 else None,
+                        reservation=reservation,
+                    )
+                next_reservations = next(reservations_by_apartment, None)
+            else:
+                # no reservations, just apartment fields
+                yield self.get_row(apartment)
 
     def get_row(self, apartment=None, reservation=None):
         line = []
@@ -225,41 +330,55 @@ class SaleReportExportService(CSVExportService):
 
     def __init__(self, sold_events):
         self.sold_events = sold_events
+        self.reported_sold_counts = self._get_reported_sold_counts()
         self.project_uuids = self._get_project_uuids()
 
-    def get_rows(self):
-        rows = [self._get_header_row()]
+    def _prepare(self):
+        projects = {}
+        apartment_uuids_by_project = defaultdict(list)
+        for apartment in get_apartments_by_project_uuids(
+            self.project_uuids,
+            fields=[
+                "project_street_address",
+                "project_ownership_type",
+                "project_apartment_count",
+            ],
+        ):
+            projects.setdefault(apartment.project_uuid, apartment)
+            apartment_uuids_by_project[apartment.project_uuid].append(apartment.uuid)
+        if set(self.project_uuids).difference(projects):
+            raise ObjectDoesNotExist("Project does not exist in ElasticSearch.")
+        self.projects = projects
+        self.apartment_uuids_by_project = apartment_uuids_by_project
+        self.sold_apartment_uuids = self._get_sold_apartment_uuids(
+            apartment_uuid
+            for apartment_uuids in apartment_uuids_by_project.values()
+            for apartment_uuid in apartment_uuids
+        )
+
+    def iter_rows(self):
+        self.prepare()
+        yield self._get_header_row()
         total_hitas_sold = total_haso_sold = total_unsold = 0
         for project_uuid in self.project_uuids:
-            project = get_project(project_uuid)
-            row = self.get_row(project)
-            rows.append(row)
+            apartment_uuids = self.apartment_uuids_by_project[project_uuid]
+            row = self.get_row(
+                self.projects[project_uuid],
+                total_sold=len(self.sold_apartment_uuids.intersection(apartment_uuids)),
+                reported_sold=sum(
+                    self.reported_sold_counts.get(apartment_uuid, 0)
+                    for apartment_uuid in apartment_uuids
+                ),
+            )
+            yield row
             total_hitas_sold += int(row[1] or 0)
             total_haso_sold += int(row[2] or 0)
             total_unsold += int(row[3])
         # Add a total row at the bottom
-        total_row = ["Total", total_hitas_sold, total_haso_sold, total_unsold]
-        rows.append(total_row)
-        return rows
+        yield ["Total", total_hitas_sold, total_haso_sold, total_unsold]
 
-    def get_row(self, project):
+    def get_row(self, project, total_sold, reported_sold):
         line = []
-        apartment_uuids = get_apartment_uuids(project.project_uuid)
-        total_sold = len(
-            [
-                apartment_uuid
-                for apartment_uuid in apartment_uuids
-                if get_apartment_state_from_apartment_uuid(apartment_uuid)
-                == ApartmentState.SOLD.value
-            ]
-        )
-        reported_sold = len(
-            [
-                e
-                for e in self.sold_events
-                if str(e.reservation.apartment_uuid) in apartment_uuids
-            ]
-        )
         remaining = project.project_apartment_count - total_sold
         for column in self.COLUMNS:
             cell_value = ""
@@ -272,11 +391,44 @@ class SaleReportExportService(CSVExportService):
             line.append(cell_value)
         return line
 
+    def _get_reported_sold_counts(self):
+        """Number of sold events per apartment, keyed by apartment UUID string."""
+        if not isinstance(self.sold_events, QuerySet):
+            return Counter(str(e.reservation.apartment_uuid) for e in self.sold_events)
+        return {
+            str(row["reservation__apartment_uuid"]): row["count"]
+            for row in self.sold_events.values("reservation__apartment_uuid")
+            .annotate(count=Count("id"))
+            .order_by()
+        }
+
     def _get_project_uuids(self):
-        project_uuids = set()
-        for e in self.sold_events:
-            project_uuid = get_apartment_project_uuid(
-                e.reservation.apartment_uuid
-            ).project_uuid
-            project_uuids.add(project_uuid)
-        return project_uuids
+        apartments = get_apartments_by_uuids(
+            self.reported_sold_counts, fields=["project_uuid"]
+        )
+        return list(
+            dict.fromkeys(apartment.project_uuid for apartment in apartments.values())
+        )
+
+    @staticmethod
+    def _get_sold_apartment_uuids(apartment_uuids):
+        """UUID strings of the given apartments whose state is sold.
+
+        An apartment is sold when its only reserved reservation is sold, see
+        `get_apartment_state_from_apartment_uuid`.
+        """
+        reserved_counts = (
+            ApartmentReservation.objects.reserved()
+            .filter(apartment_uuid__in=list(apartment_uuids))
+            .values("apartment_uuid")
+            .annotate(
+                reserved_count=Count("id"),
+                sold_count=Count("id", filter=Q(state=ApartmentReservationState.SOLD)),
+            )
+            .order_by()
+        )
+        return {
+            str(row["apartment_uuid"])
+            for row in reserved_counts
+            if row["reserved_count"] == 1 and row["sold_count"] == 1
+        }
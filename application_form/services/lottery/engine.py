@@ -0,0 +1,481 @@
+import uuid
+from collections import defaultdict
+from logging import getLogger
+from typing import Dict, Iterable, List, Optional, Set
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from apartment.elastic.queries import get_apartment, get_project
+from apartment_application_service.settings import METADATA_HANDLER_INFORMATION
+from application_form.enums import (
+    ApartmentQueueChangeEventType,
+    ApartmentReservationCancellationReason,
+    ApartmentReservationState,
+)
+from application_form.models import (
+    ApartmentQueueChangeEvent,
+    ApartmentReservation,
+    ApartmentReservationStateChangeEvent,
+    ApplicationApartment,
+    LotteryEvent,
+    LotteryEventResult,
+)
+from audit_log import audit_logging
+from audit_log.enums import Operation
+
+logger = getLogger(__name__)
+
+User = get_user_model()
+
+_BULK_BATCH_SIZE = 1000
+
+
+def _to_uuid(value) -> uuid.UUID:
+    return value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+
+
+class LotteryEngine:
+    """
+    Runs the apartment distribution of a project in memory.
+
+    The reservations, application apartments and the relevant application data of the
+    project are loaded once. Winners, lower priority cancellations and the resulting
+    queue shifts are then resolved in memory by following exactly the same rules as
+    `cancel_reservation`, `_reserve_apartments` and `_reserve_haso_apartment` in
+    `application_form.services.application`. Nothing is written to the database before
+    `commit()`, which persists all the changes with bulk queries.
+    """
+
+    def __init__(
+        self,
+        project_uuid: uuid.UUID,
+        apartment_uuids: Iterable[uuid.UUID],
+        user: User = None,
+    ):
+        self.user = user
+        self.apartment_uuids = [_to_uuid(uuid_) for uuid_ in apartment_uuids]
+
+        self._queues: Dict[uuid.UUID, List[ApartmentReservation]] = {}
+        self._original_values: Dict[int, tuple] = {}
+        self._reservations_by_app_apartment: Dict[int, ApartmentReservation] = {}
+        self._app_apartments: Dict[int, ApplicationApartment] = {}
+        self._app_apartments_by_application: Dict[
+            int, List[ApplicationApartment]
+        ] = defaultdict(list)
+        self._removed_reservation_ids: Set[int] = set()
+
+        project_ownership_type = get_project(project_uuid).project_ownership_type
+        self._ownership_types: Dict[uuid.UUID, str] = {
+            apartment_uuid: project_ownership_type
+            for apartment_uuid in self.apartment_uuids
+        }
+        self._recorded_apartment_uuids = set(
+            LotteryEvent.objects.filter(
+                apartment_uuid__in=self.apartment_uuids
+            ).values_list("apartment_uuid", flat=True)
+        )
+
+        self._lottery_events: List[LotteryEvent] = []
+        self._lottery_event_results: List[LotteryEventResult] = []
+        self._state_change_events: List[ApartmentReservationStateChangeEvent] = []
+        self._queue_change_events: List[ApartmentQueueChangeEvent] = []
+        self._audit_log_events: List[tuple] = []
+
+        self._load(self.apartment_uuids)
+
+    def get_queue(self, apartment_uuid: uuid.UUID) -> List[ApartmentReservation]:
+        """Return all reservations of the given apartment ordered by id."""
+        apartment_uuid = _to_uuid(apartment_uuid)
+        self._load([apartment_uuid])
+        return self._queues[apartment_uuid]
+
+    def get_application_apartment(
+        self, reservation: ApartmentReservation
+    ) -> ApplicationApartment:
+        return self._app_apartments[reservation.application_apartment_id]
+
+    def save_application_order(self, apartment_uuid: uuid.UUID) -> None:
+        """
+        Record the current queue of the given apartment as its lottery result.
+
+        Works like `_save_application_order` used to: a lottery is performed only once
+        and therefore its result is stored only once.
+        """
+        apartment_uuid = _to_uuid(apartment_uuid)
+        if apartment_uuid in self._recorded_apartment_uuids:
+            return  # don't record it twice
+        self._recorded_apartment_uuids.add(apartment_uuid)
+
+        event = LotteryEvent(apartment_uuid=apartment_uuid)
+        if self.user:
+            event.handler = (
+                METADATA_HANDLER_INFORMATION
+                + " / "
+                + self.user.profile_or_user_full_name
+            )
+        self._lottery_events.append(event)
+        for reservation in self.get_queue(apartment_uuid):
+            if reservation.application_apartment_id is None:
+                continue
+            self._lottery_event_results.append(
+                LotteryEventResult(
+                    event=event,
+                    application_apartment_id=reservation.application_apartment_id,
+                    result_position=reservation.list_position,
+                )
+            )
+        self._audit_log_events.append((self.user, Operation.CREATE, event))
+
+    def reserve_apartments(
+        self,
+        apartment_uuids: Iterable[uuid.UUID],
+        cancel_lower_priority_reserved: bool = True,
+    ) -> None:
+        """In-memory counterpart of `_reserve_apartments`."""
+        apartments_to_process = set(_to_uuid(uuid_) for uuid_ in apartment_uuids)
+        while apartments_to_process:
+            for apartment_uuid in apartments_to_process.copy():
+                apartments_to_process.remove(apartment_uuid)
+                # Mark the winner as "RESERVED"
+                winner = self._reserve_apartment(apartment_uuid)
+                if winner is None:
+                    continue
+                # If the winner has lower priority applications, we should cancel them.
+                # This will modify the queues of other apartments, and if the
+                # apartment's winner gets canceled, that apartment must be processed
+                # again.
+                canceled_winners = self._cancel_lower_priority_reservations(
+                    winner, cancel_lower_priority_reserved
+                )
+                apartments_to_process.update(
+                    reservation.apartment_uuid for reservation in canceled_winners
+                )
+
+    def reserve_haso_apartment(self, apartment_uuid: uuid.UUID) -> None:
+        """In-memory counterpart of `_reserve_haso_apartment`."""
+        apartment_uuid = _to_uuid(apartment_uuid)
+        reservations = self._get_ordered_reservations(apartment_uuid)
+
+        if reservations:
+            # There can be a single winner, or multiple winners if there are several
+            # winning candidates with the same right of residence number.
+            winning_key = self._right_of_residence_key(reservations[0])
+            winners = [
+                reservation
+                for reservation in reservations
+                if self._right_of_residence_key(reservation) == winning_key
+            ]
+            state = ApartmentReservationState.RESERVED
+            if len(winners) > 1:
+                state = ApartmentReservationState.REVIEW
+            for reservation in winners:
+                self._set_state(reservation, state)
+            for reservation in winners:
+                self._cancel_lower_priority_reservations(reservation)
+        else:
+            # There are no applications so the winning reservation is the one that is
+            # first in the queue.
+            winning_reservation = self._get_first_active_reservation(apartment_uuid)
+            if winning_reservation:
+                self._set_state(winning_reservation, ApartmentReservationState.RESERVED)
+
+    @transaction.atomic
+    def commit(self) -> None:
+        """Persist everything resolved so far using bulk queries."""
+        LotteryEvent.objects.bulk_create(self._lottery_events)
+        LotteryEventResult.objects.bulk_create(
+            self._lottery_event_results, batch_size=_BULK_BATCH_SIZE
+        )
+        if self.user and self._lottery_events:
+            ApartmentReservation.objects.filter(
+                apartment_uuid__in=[
+                    event.apartment_uuid for event in self._lottery_events
+                ]
+            ).update(handler=self.user.profile_or_user_full_name)
+
+        changed_reservations = [
+            reservation
+            for reservations in self._queues.values()
+            for reservation in reservations
+            if self._original_values[reservation.pk] != self._get_values(reservation)
+        ]
+        ApartmentReservation.objects.bulk_update(
+            changed_reservations,
+            ["queue_position", "list_position", "state"],
+            batch_size=_BULK_BATCH_SIZE,
+        )
+        ApartmentReservationStateChangeEvent.objects.bulk_create(
+            self._state_change_events, batch_size=_BULK_BATCH_SIZE
+        )
+        ApartmentQueueChangeEvent.objects.bulk_create(
+            self._queue_change_events, batch_size=_BULK_BATCH_SIZE
+        )
+        audit_logging.log_many(self._audit_log_events)
+
+        for reservation in changed_reservations:
+            self._original_values[reservation.pk] = self._get_values(reservation)
+        self._lottery_events = []
+        self._lottery_event_results = []
+        self._state_change_events = []
+        self._queue_change_events = []
+        self._audit_log_events = []
+
+    def _load(self, apartment_uuids: Iterable[uuid.UUID]) -> None:
+        """
+        Load the queues of the given apartments, unless they are loaded already, along
+        with all application apartments of the applications queuing in them.
+        """
+        apartment_uuids = [
+            apartment_uuid
+            for apartment_uuid in apartment_uuids
+            if apartment_uuid not in self._queues
+        ]
+        if not apartment_uuids:
+            return
+
+        for apartment_uuid in apartment_uuids:
+            self._queues[apartment_uuid] = []
+        reservations = (
+            ApartmentReservation.objects.filter(apartment_uuid__in=apartment_uuids)
+            .only(
+                "apartment_uuid",
+                "queue_position",
+                "list_position",
+                "state",
+                "application_apartment",
+            )
+            .order_by("id")
+        )
+        for reservation in reservations:
+            self._queues[reservation.apartment_uuid].append(reservation)
+            self._original_values[reservation.pk] = self._get_values(reservation)
+            if reservation.application_apartment_id is not None:
+                self._reservations_by_app_apartment[
+                    reservation.application_apartment_id
+                ] = reservation
+
+        self._removed_reservation_ids.update(
+            ApartmentQueueChangeEvent.objects.filter(
+                queue_application__apartment_uuid__in=apartment_uuids,
+                type=ApartmentQueueChangeEventType.REMOVED,
+            ).values_list("queue_application_id", flat=True)
+        )
+
+        app_apartments = (
+            ApplicationApartment.objects.filter(
+                application_id__in=ApplicationApartment.objects.filter(
+                    apartment_uuid__in=apartment_uuids
+                ).values("application_id")
+            )
+            .select_related("application")
+            .only(
+                "apartment_uuid",
+                "priority_number",
+                "application__has_children",
+                "application__right_of_residence",
+                "application__right_of_residence_is_old_batch",
+            )
+            .order_by("id")
+        )
+        for app_apartment in app_apartments:
+            if app_apartment.pk in self._app_apartments:
+                continue
+            self._app_apartments[app_apartment.pk] = app_apartment
+            self._app_apartments_by_application[app_apartment.application_id].append(
+                app_apartment
+            )
+
+    @staticmethod
+    def _get_values(reservation: ApartmentReservation) -> tuple:
+        return (
+            reservation.queue_position,
+            reservation.list_position,
+            reservation.state,
+        )
+
+    def _right_of_residence_key(self, reservation: ApartmentReservation) -> tuple:
+        application = self.get_application_apartment(reservation).application
+        return (
+            application.right_of_residence,
+            application.right_of_residence_is_old_batch,
+        )
+
+    def _get_ordered_reservations(
+        self, apartment_uuid: uuid.UUID
+    ) -> List[ApartmentReservation]:
+        """
+        Return the reservations of the apartment that have an application and have not
+        been removed from the queue, ordered by their queue position.
+
+        In-memory counterpart of `get_ordered_applications`.
+        """
+        reservations = [
+            reservation
+            for reservation in self.get_queue(apartment_uuid)
+            if reservation.application_apartment_id is not None
+            and reservation.pk not in self._removed_reservation_ids
+        ]
+        return sorted(reservations, key=self._queue_position_sort_key)
+
+    def _get_first_active_reservation(
+        self, apartment_uuid: uuid.UUID
+    ) -> Optional[ApartmentReservation]:
+        reservations = [
+            reservation
+            for reservation in self.get_queue(apartment_uuid)
+            if reservation.state != ApartmentReservationState.CANCELED
+        ]
+        if not reservations:
+            return None
+        return min(reservations, key=self._queue_position_sort_key)
+
+    @staticmethod
+    def _queue_position_sort_key(reservation: ApartmentReservation) -> tuple:
+        # NULL positions are sorted last, like PostgreSQL does
+        return (
+            reservation.queue_position is None,
+            reservation.queue_position or 0,
+            reservation.pk,
+        )
+
+    def _reserve_apartment(
+        self, apartment_uuid: uuid.UUID
+    ) -> Optional[ApartmentReservation]:
+        """
+        Mark the first reservation in the queue as reserved. Returns the reservation if
+        it has an application, None otherwise.
+        """
+        reservations = self._get_ordered_reservations(apartment_uuid)
+        if reservations:
+            winning_reservation = reservations[0]
+        else:
+            # There are no applications so the winning reservation is the first
+            # reservation in the queue
+            winning_reservation = self._get_first_active_reservation(apartment_uuid)
+            if not winning_reservation:
+                return None
+
+        self._set_state(winning_reservation, ApartmentReservationState.RESERVED)
+
+        if winning_reservation.application_apartment_id is None:
+            return None
+        return winning_reservation
+
+    def _cancel_lower_priority_reservations(
+        self,
+        winning_reservation: ApartmentReservation,
+        cancel_reserved: bool = True,
+    ) -> List[ApartmentReservation]:
+        """
+        Cancel the reservations the winner's application has made for apartments with a
+        lower priority than the won apartment. Returns the canceled reservations which
+        were first in their queue at the time of cancellation.
+        """
+        states_to_cancel = [ApartmentReservationState.SUBMITTED]
+        if cancel_reserved:
+            states_to_cancel.append(ApartmentReservationState.RESERVED)
+        app_apartment = self.get_application_apartment(winning_reservation)
+        lower_priority_reservations = []
+        for other_app_apartment in self._app_apartments_by_application[
+            app_apartment.application_id
+        ]:
+            if other_app_apartment.priority_number <= app_apartment.priority_number:
+                continue
+            self._load([other_app_apartment.apartment_uuid])
+            reservation = self._reservations_by_app_apartment.get(
+                other_app_apartment.pk
+            )
+            if reservation is not None and reservation.state in states_to_cancel:
+                lower_priority_reservations.append(reservation)
+
+        canceled_winners = []
+        for reservation in lower_priority_reservations:
+            if reservation.queue_position == 1:
+                canceled_winners.append(reservation)
+            self._cancel_reservation(
+                reservation, ApartmentReservationCancellationReason.LOWER_PRIORITY
+            )
+        return canceled_winners
+
+    def _cancel_reservation(
+        self,
+        reservation: ApartmentReservation,
+        cancellation_reason: ApartmentReservationCancellationReason,
+    ) -> None:
+        """In-memory counterpart of `cancel_reservation`."""
+        was_reserved = reservation.state is not ApartmentReservationState.SUBMITTED
+        apartment_uuid = reservation.apartment_uuid
+        ownership_type = self._get_ownership_type(apartment_uuid).upper()
+        if ownership_type not in ("HASO", "HITAS", "PUOLIHITAS"):
+            raise ValueError(
+                f"Apartment {apartment_uuid} has an invalid "
+                f"project_ownership_type {ownership_type}"
+            )
+
+        self._remove_reservation_from_queue(reservation, cancellation_reason)
+
+        if was_reserved:
+            if ownership_type == "HASO":
+                self.reserve_haso_apartment(apartment_uuid)
+            else:
+                self.reserve_apartments([apartment_uuid], False)
+
+        self._audit_log_events.append((None, Operation.UPDATE, reservation))
+
+    def _remove_reservation_from_queue(
+        self,
+        reservation: ApartmentReservation,
+        cancellation_reason: ApartmentReservationCancellationReason,
+    ) -> None:
+        """In-memory counterpart of `remove_reservation_from_queue`."""
+        old_queue_position = reservation.queue_position
+        reservation.queue_position = None
+        if old_queue_position is None:
+            logger.warning(
+                "from_position is None, bad reservation data in apartment uuid"
+                f"{reservation.apartment_uuid}?"
+            )
+        else:
+            for other in self.get_queue(reservation.apartment_uuid):
+                if (
+                    other.queue_position is not None
+                    and other.queue_position >= old_queue_position
+                ):
+                    other.queue_position -= 1
+        self._set_state(
+            reservation,
+            ApartmentReservationState.CANCELED,
+            cancellation_reason=cancellation_reason,
+        )
+        self._queue_change_events.append(
+            ApartmentQueueChangeEvent(
+                queue_application=reservation,
+                type=ApartmentQueueChangeEventType.REMOVED,
+                comment="",
+            )
+        )
+        self._removed_reservation_ids.add(reservation.pk)
+
+    def _set_state(
+        self,
+        reservation: ApartmentReservation,
+        state: ApartmentReservationState,
+        cancellation_reason: ApartmentReservationCancellationReason = None,
+    ) -> None:
+        """In-memory counterpart of `ApartmentReservation.set_state`."""
+        state_change_event = ApartmentReservationStateChangeEvent(
+            reservation=reservation,
+            state=state,
+            comment="",
+            cancellation_reason=cancellation_reason,
+        )
+        self._state_change_events.append(state_change_event)
+        reservation.state = state
+        self._audit_log_events.append((None, Operation.CREATE, state_change_event))
+
+    def _get_ownership_type(self, apartment_uuid: uuid.UUID) -> str:
+        if apartment_uuid not in self._ownership_types:
+            apartment = get_apartment(apartment_uuid, include_project_fields=True)
+            self._ownership_types[apartment_uuid] = apartment.project_ownership_type
+        return self._ownership_types[apartment_uuid]
@@ -3,8 +3,7 @@ import uuid
 from django.contrib.auth import get_user_model
 
 from apartment.elastic.queries import get_apartment_uuids
-from application_form.services.application import _reserve_haso_apartment
-from application_form.services.lottery.utils import _save_application_order
+from application_form.services.lottery.engine import LotteryEngine
 
 User = get_user_model()
 
@@ -18,12 +17,15 @@ def _distribute_haso_apartments(project_uuid: uuid.UUID, user: User = None) -> N
     state of the apartment queue will be persisted to the database.
     """
     apartment_uuids = get_apartment_uuids(project_uuid)
+    engine = LotteryEngine(project_uuid, apartment_uuids, user)
 
     # Persist the initial order of applications
     for apartment_uuid in apartment_uuids:
-        _save_application_order(apartment_uuid, user)
+        engine.save_application_order(apartment_uuid)
 
     # Reserve each apartment. This will modify the queue of each apartment, since
     # apartment applications with lower priority may get canceled.
     for apartment_uuid in apartment_uuids:
-        _reserve_haso_apartment(apartment_uuid)
+        engine.reserve_haso_apartment(apartment_uuid)
+
+    engine.commit()
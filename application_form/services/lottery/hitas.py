@@ -1,14 +1,12 @@
 import secrets
 import uuid
+from typing import List
 
 from django.contrib.auth import get_user_model
-from django.db import transaction
-from django.db.models import QuerySet
 
-from apartment.elastic.queries import get_apartment, get_apartment_uuids
-from application_form.models import ApplicationApartment
-from application_form.services.application import _reserve_apartments
-from application_form.services.lottery.utils import _save_application_order
+from apartment.elastic.queries import get_apartment_uuids, get_apartments
+from application_form.models import ApartmentReservation
+from application_form.services.lottery.engine import LotteryEngine
 
 User = get_user_model()
 # If the number of rooms in an apartment is greater or equal to this threshold,
@@ -26,16 +24,24 @@ def _distribute_hitas_apartments(project_uuid: uuid.UUID, user: User = None) ->
     """
 
     apartment_uuids = get_apartment_uuids(project_uuid)
+    room_counts = {
+        apartment.uuid: apartment.room_count
+        for apartment in get_apartments(project_uuid)
+    }
+    engine = LotteryEngine(project_uuid, apartment_uuids, user)
 
     # Perform lottery and persist the initial order of applications
     for apartment_uuid in apartment_uuids:
-        _shuffle_applications(apartment_uuid)
-        _save_application_order(apartment_uuid, user)
+        _shuffle_applications(engine, apartment_uuid, room_counts[apartment_uuid])
+        engine.save_application_order(apartment_uuid)
 
-    _reserve_apartments(apartment_uuids)
+    engine.reserve_apartments(apartment_uuids)
+    engine.commit()
 
 
-def _shuffle_applications(apartment_uuid: uuid.UUID) -> None:
+def _shuffle_applications(
+    engine: LotteryEngine, apartment_uuid: uuid.UUID, room_count: int
+) -> None:
     """
     Randomize the order of the applications to the given apartment.
 
@@ -49,48 +55,54 @@ def _shuffle_applications(apartment_uuid: uuid.UUID) -> None:
     random order. The remaining positions will go to the applications without children,
     in random order.
     """
-    apartment = get_apartment(apartment_uuid)
-    apartment_apps = ApplicationApartment.objects.filter(apartment_uuid=apartment_uuid)
+    reservations = sorted(
+        (
+            reservation
+            for reservation in engine.get_queue(apartment_uuid)
+            if reservation.application_apartment_id is not None
+        ),
+        key=lambda reservation: reservation.application_apartment_id,
+    )
 
     # If the apartment has enough rooms, applications with children should have priority
-    prioritize_children = apartment.room_count >= _PRIORITIZE_CHILDREN_ROOM_THRESHOLD
+    prioritize_children = room_count >= _PRIORITIZE_CHILDREN_ROOM_THRESHOLD
     if prioritize_children:
         # Split applications into two pools
-        apps_with_children = apartment_apps.filter(application__has_children=True)
-        apps_without_children = apartment_apps.exclude(application__has_children=True)
-        with transaction.atomic():
-            # The first queue segment go to applications with children, in random order
-            _shuffle_queue_segment(apps_with_children)
-            # The remaining segment go to applications without children
-            _shuffle_queue_segment(
-                apps_without_children, apps_with_children.count() + 1
-            )
+        with_children = []
+        without_children = []
+        for reservation in reservations:
+            application = engine.get_application_apartment(reservation).application
+            if application.has_children is True:
+                with_children.append(reservation)
+            else:
+                without_children.append(reservation)
+        # The first queue segment go to applications with children, in random order
+        _shuffle_queue_segment(with_children)
+        # The remaining segment go to applications without children
+        _shuffle_queue_segment(without_children, len(with_children) + 1)
     else:
         # Each application stays in the same pool and is assigned a random position
-        _shuffle_queue_segment(apartment_apps)
+        _shuffle_queue_segment(reservations)
 
 
-@transaction.atomic
 def _shuffle_queue_segment(
-    application_apartments: QuerySet,
+    reservations: List[ApartmentReservation],
     start_position: int = 1,
 ) -> None:
     """
-    Randomizes the queue segment of the given applications, starting at the given
+    Randomizes the queue segment of the given reservations, starting at the given
     position. A unique queue position between start_position (inclusive) and
-    start_position + number of application apartments (exclusive) will be assigned
-    randomly for each application in the queue.
+    start_position + number of reservations (exclusive) will be assigned randomly for
+    each reservation in the queue.
     """
-    end_position = start_position + application_apartments.count()
+    end_position = start_position + len(reservations)
 
     # Create a list of all possible queue positions between start and end position
     possible_positions = list(range(start_position, end_position))
 
-    for app_apartment in application_apartments.order_by("id").all():
-        # Remove a random queue position from the list assign it to the application
+    for reservation in reservations:
+        # Remove a random queue position from the list assign it to the reservation
         random_index = secrets.randbelow(len(possible_positions))
         position = possible_positions.pop(random_index)
-        apartment_reservation = app_apartment.apartment_reservation
-        apartment_reservation.list_position = position
-        apartment_reservation.queue_position = position
-        apartment_reservation.save(update_fields=["list_position", "queue_position"])
+        reservation.list_position = position
+        reservation.queue_position = position
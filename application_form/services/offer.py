@@ -13,11 +13,13 @@ from application_form.enums import (
 )
 from application_form.models import ApartmentReservation, Offer
 from application_form.services.application import cancel_reservation
+from application_form.services.reservation import set_reservations_state
+from audit_log import audit_logging
 
 User = get_user_model()
 
 
-@transaction.atomic()
+@audit_logging.buffered()
 def create_offer(offer_data: dict, user: User = None) -> Offer:
     apartment_reservation = offer_data["apartment_reservation"]
     if hasattr(apartment_reservation, "offer"):
@@ -76,30 +78,49 @@ def update_reservation_state_based_on_offer_expiration(
     )
 
 
+@transaction.atomic()
 def update_reservations_based_on_offer_expiration(
     reservation_qs=None, user: User = None
 ) -> (int, int):
     today = timezone.localdate()
 
-    if not reservation_qs:
+    if reservation_qs is None:
         reservation_qs = ApartmentReservation.objects.all()
     reservation_qs = reservation_qs.filter(offer__state=OfferState.PENDING)
 
-    new_expired_reservations = reservation_qs.filter(
-        state=ApartmentReservationState.OFFERED,
-        offer__valid_until__lt=today,
+    # Snapshot the reservations to update, so that the returned counts match exactly
+    # the reservations that were updated
+    new_expired_reservation_ids = _lock_reservation_ids(
+        reservation_qs.filter(
+            state=ApartmentReservationState.OFFERED,
+            offer__valid_until__lt=today,
+        )
+    )
+    not_anymore_expired_reservation_ids = _lock_reservation_ids(
+        reservation_qs.filter(
+            state=ApartmentReservationState.OFFER_EXPIRED,
+            offer__valid_until__gte=today,
+        )
+    )
+
+    num_of_expired = set_reservations_state(
+        new_expired_reservation_ids, ApartmentReservationState.OFFER_EXPIRED, user=user
     )
-    not_anymore_expired_reservations = reservation_qs.filter(
-        state=ApartmentReservationState.OFFER_EXPIRED,
-        offer__valid_until__gte=today,
+    num_of_unexpired = set_reservations_state(
+        not_anymore_expired_reservation_ids,
+        ApartmentReservationState.OFFERED,
+        user=user,
     )
 
-    for reservation in new_expired_reservations:
-        reservation.set_state(ApartmentReservationState.OFFER_EXPIRED, user=user)
-    for reservation in not_anymore_expired_reservations:
-        reservation.set_state(ApartmentReservationState.OFFERED, user=user)
+    return num_of_expired, num_of_unexpired
 
-    return new_expired_reservations.count(), not_anymore_expired_reservations.count()
+
+def _lock_reservation_ids(reservation_qs):
+    return list(
+        reservation_qs.select_for_update(of=("self",))
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
 
 
 def update_other_customer_reservations_states(reservation):
@@ -1,11 +1,14 @@
 import uuid
 from logging import getLogger
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
 from django.contrib.auth import get_user_model
 from django.db import transaction
-from django.db.models import F
+from django.db.models import Count, F, Max, Min, Q
 
+from apartment_application_service.models import (
+    get_right_of_residence_ordering_number_expression,
+)
 from application_form.enums import (
     ApartmentQueueChangeEventType,
     ApartmentReservationCancellationReason,
@@ -13,12 +16,12 @@ from application_form.enums import (
     ApplicationType,
 )
 from application_form.models import (
+    ApartmentQueueChangeEvent,
     ApartmentReservation,
     ApartmentReservationStateChangeEvent,
     Application,
-    ApplicationApartment,
 )
-from application_form.utils import lock_table
+from application_form.utils import lock_apartments
 
 logger = getLogger(__name__)
 
@@ -30,52 +33,47 @@ def add_application_to_queues(
 ) -> None:
     """
     Adds the given application to the queues of all the apartments applied to.
+
+    The queue positions in all the apartments are calculated in a single pass, and the
+    reservations and their events are created in bulk.
     """
-    for application_apartment in application.application_apartments.all():
-        apartment_uuid = application_apartment.apartment_uuid
-        with lock_table(ApartmentReservation):
-            if application.type == ApplicationType.HASO:
-                # For HASO applications, the queue position is determined by the
-                # right of residence number.
-                # The list position will be the same as queue position
-                queue_position = _calculate_queue_position(
-                    apartment_uuid, application_apartment
-                )
-                list_position = queue_position
+    if application.type not in (
+        ApplicationType.HASO,
+        ApplicationType.HITAS,
+        ApplicationType.PUOLIHITAS,
+    ):
+        raise ValueError(f"unsupported application type {application.type}")
+
+    application_apartments = list(application.application_apartments.all())
+    apartment_uuids = [
+        application_apartment.apartment_uuid
+        for application_apartment in application_apartments
+    ]
+    with lock_apartments(apartment_uuids):
+        if application.type == ApplicationType.HASO:
+            # For HASO applications, the queue position is determined by the
+            # right of residence number.
+            # The list position will be the same as queue position
+            positions = _calculate_haso_queue_positions(apartment_uuids, application)
+            for apartment_uuid, (queue_position, _) in positions.items():
                 # Need to shift both list position and queue position
                 _shift_positions(apartment_uuid, queue_position)
-            elif application.type in [
-                ApplicationType.HITAS,
-                ApplicationType.PUOLIHITAS,
-            ]:
-                # HITAS and PUOLIHITAS work the same way from the apartment lottery
-                # perspective, and should always be added to the end of the queue.
-                try:
-                    queue_position = (
-                        ApartmentReservation.objects.active()
-                        .filter(apartment_uuid=apartment_uuid)
-                        .order_by("-queue_position")[0]
-                        .queue_position
-                        + 1
-                    )
-                except IndexError:
-                    queue_position = 1
-                list_position = (
-                    ApartmentReservation.objects.filter(
-                        apartment_uuid=apartment_uuid
-                    ).count()
-                    + 1
-                )
-            else:
-                raise ValueError(f"unsupported application type {application.type}")
-
-            application = application_apartment.application
+        else:
+            # HITAS and PUOLIHITAS work the same way from the apartment lottery
+            # perspective, and should always be added to the end of the queue.
+            positions = _calculate_hitas_queue_positions(apartment_uuids)
+
+        apartment_reservations = []
+        for application_apartment in application_apartments:
+            queue_position, list_position = positions[
+                application_apartment.apartment_uuid
+            ]
             apartment_reservation = ApartmentReservation(
                 customer=application.customer,
                 queue_position=queue_position,
                 list_position=list_position,
                 application_apartment=application_apartment,
-                apartment_uuid=apartment_uuid,
+                apartment_uuid=application_apartment.apartment_uuid,
                 right_of_residence=application.right_of_residence,
                 right_of_residence_is_old_batch=application.right_of_residence_is_old_batch,  # noqa: E501
                 has_children=application.has_children,
@@ -83,11 +81,26 @@ def add_application_to_queues(
                 is_age_over_55=application.customer.is_age_over_55,
                 is_right_of_occupancy_housing_changer=application.is_right_of_occupancy_housing_changer,  # noqa: E501
             )
-            apartment_reservation.save(user=user)
-            apartment_reservation.queue_change_events.create(
+            apartment_reservation.normalize_right_of_residence_fields()
+            apartment_reservations.append(apartment_reservation)
+
+        ApartmentReservation.objects.bulk_create(apartment_reservations)
+        ApartmentReservationStateChangeEvent.objects.bulk_create(
+            ApartmentReservationStateChangeEvent(
+                reservation=apartment_reservation,
+                state=apartment_reservation.state,
+                user=user,
+            )
+            for apartment_reservation in apartment_reservations
+        )
+        ApartmentQueueChangeEvent.objects.bulk_create(
+            ApartmentQueueChangeEvent(
+                queue_application=apartment_reservation,
                 type=ApartmentQueueChangeEventType.ADDED,
                 comment=comment,
             )
+            for apartment_reservation in apartment_reservations
+        )
 
 
 @transaction.atomic
@@ -123,39 +136,96 @@ def remove_reservation_from_queue(
     return state_change_event
 
 
-def _calculate_queue_position(
-    apartment_uuid: uuid.UUID,
-    application_apartment: ApplicationApartment,
-) -> int:
+def _calculate_hitas_queue_positions(
+    apartment_uuids: List[uuid.UUID],
+) -> Dict[uuid.UUID, Tuple[int, int]]:
+    """
+    Returns the (queue position, list position) at the end of the queue of each of the
+    given apartments.
+    """
+    queues = {
+        row["apartment_uuid"]: row
+        for row in ApartmentReservation.objects.filter(
+            apartment_uuid__in=apartment_uuids
+        )
+        .values("apartment_uuid")
+        .annotate(
+            max_queue_position=Max(
+                "queue_position",
+                filter=~Q(state=ApartmentReservationState.CANCELED),
+            ),
+            reservation_count=Count("id"),
+        )
+        .order_by()
+    }
+    positions = {}
+    for apartment_uuid in apartment_uuids:
+        queue = queues.get(apartment_uuid, {})
+        positions[apartment_uuid] = (
+            (queue.get("max_queue_position") or 0) + 1,
+            queue.get("reservation_count", 0) + 1,
+        )
+    return positions
+
+
+def _calculate_haso_queue_positions(
+    apartment_uuids: List[uuid.UUID],
+    application: Application,
+) -> Dict[uuid.UUID, Tuple[int, int]]:
     """
-    Finds the new position in the queue for the given application based on its right
-    of residence number. The smaller the number, the smaller the position in the queue.
+    Returns the (queue position, list position) of the given application in the queue
+    of each of the given apartments, based on its right of residence number. The
+    smaller the number, the smaller the position in the queue.
 
     Late applications form a pool of their own and should be kept in the order of their
     right of residence number within that pool.
+
+    The positions are calculated in the database with a single query, so the queues
+    don't need to be loaded and decrypted in Python.
     """
-    right_of_residence_ordering_number = (
-        application_apartment.application.right_of_residence_ordering_number
-    )
-    submitted_late = application_apartment.application.submitted_late
-    all_reservations = ApartmentReservation.objects.filter(
-        apartment_uuid=apartment_uuid
-    ).only(
-        "queue_position",
-        "application_apartment__application__right_of_residence",
-        "application_apartment__application__right_of_residence_is_old_batch",
-    )
-    reservations = all_reservations.filter(
-        application_apartment__application__submitted_late=submitted_late
-    ).order_by("queue_position")
-    for apartment_reservation in reservations:
-        other_application = apartment_reservation.application_apartment.application
-        if (
-            right_of_residence_ordering_number
-            < other_application.right_of_residence_ordering_number
-        ):
-            return apartment_reservation.queue_position
-    return all_reservations.count() + 1
+    annotations = {
+        "reservation_count": Count("id"),
+        "unpositioned_count": Count("id", filter=Q(queue_position=None)),
+    }
+    ordering_number = application.right_of_residence_ordering_number
+    if ordering_number is not None:
+        annotations["next_queue_position"] = Min(
+            "queue_position",
+            filter=Q(
+                application_apartment__application__submitted_late=(
+                    application.submitted_late
+                ),
+                ordering_number__gt=ordering_number,
+            ),
+        )
+    queues = {
+        row["apartment_uuid"]: row
+        for row in ApartmentReservation.objects.filter(
+            apartment_uuid__in=apartment_uuids
+        )
+        .alias(
+            ordering_number=get_right_of_residence_ordering_number_expression(
+                "application_apartment__application__"
+            )
+        )
+        .values("apartment_uuid")
+        .annotate(**annotations)
+        .order_by()
+    }
+
+    positions = {}
+    for apartment_uuid in apartment_uuids:
+        queue = queues.get(apartment_uuid, {})
+        if queue.get("unpositioned_count"):
+            raise RuntimeError(
+                "Cannot add a reservation to the queue of an apartment that has "
+                "reservations without a queue_position."
+            )
+        queue_position = (
+            queue.get("next_queue_position") or queue.get("reservation_count", 0) + 1
+        )
+        positions[apartment_uuid] = (queue_position, queue_position)
+    return positions
 
 
 def _shift_positions(
@@ -169,7 +239,8 @@ def _shift_positions(
 
     NOTE: This function cannot be used for adding after the apartment's lottery has been
     executed, because then there can be cancelled reservations, and for those the
-    shifting won't work correctly.
+    shifting won't work correctly. The caller is responsible for checking that the
+    queue has no reservations without a queue_position when adding.
     """
     if from_position is None:
         logger.warning(
@@ -178,18 +249,16 @@ def _shift_positions(
         )
         return
 
-    reservations = ApartmentReservation.objects.filter(apartment_uuid=apartment_uuid)
-    if not deleted and reservations.filter(queue_position=None).exists():
-        raise RuntimeError(
-            "This function cannot be used for adding a reservation when the apartment "
-            "has reservations without a queue_position."
-        )
-
     # We only need to update the positions in the queue that are >= from_position
-    reservations = reservations.filter(queue_position__gte=from_position)
+    reservations = ApartmentReservation.objects.filter(
+        apartment_uuid=apartment_uuid, queue_position__gte=from_position
+    )
 
     # When deleting, we have to decrement each position. When adding, increment instead.
-    position_change = -1 if deleted else 1
-    reservations.update(queue_position=F("queue_position") + position_change)
-    if not deleted:
-        reservations.update(list_position=F("list_position") + position_change)
+    if deleted:
+        reservations.update(queue_position=F("queue_position") - 1)
+    else:
+        reservations.update(
+            queue_position=F("queue_position") + 1,
+            list_position=F("list_position") + 1,
+        )
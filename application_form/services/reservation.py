@@ -1,3 +1,5 @@
+from typing import Iterable
+
 from django.contrib.auth import get_user_model
 from django.db import transaction
 from django.db.models import F, Max
@@ -7,8 +9,13 @@ from application_form.enums import (
     ApartmentReservationCancellationReason,
     ApartmentReservationState,
 )
-from application_form.models import ApartmentReservation
-from application_form.utils import lock_table
+from application_form.models import (
+    ApartmentReservation,
+    ApartmentReservationStateChangeEvent,
+)
+from application_form.utils import lock_apartments
+from audit_log import audit_logging
+from audit_log.enums import Operation
 from customer.models import Customer
 
 User = get_user_model()
@@ -68,7 +75,7 @@ def transfer_reservation_to_another_customer(
 def create_reservation_without_application(
     reservation_data: dict, user: User = None
 ) -> ApartmentReservation:
-    with lock_table(ApartmentReservation):
+    with lock_apartments([reservation_data["apartment_uuid"]]):
         existing_reservations = ApartmentReservation.objects.filter(
             apartment_uuid=reservation_data["apartment_uuid"]
         )
@@ -107,3 +114,36 @@ def create_reservation_without_application(
         reservation.save(user=user)
 
     return reservation
+
+
+@transaction.atomic
+def set_reservations_state(
+    reservation_ids: Iterable[int],
+    state: ApartmentReservationState,
+    user: User = None,
+    comment: str = None,
+) -> int:
+    """Set the state of many reservations at once.
+
+    Does the same as `ApartmentReservation.set_state` for every given reservation, but
+    with one UPDATE and bulk created state change events and audit log entries.
+    Returns the number of reservations whose state was set.
+    """
+    reservation_ids = list(reservation_ids)
+    if not reservation_ids:
+        return 0
+    ApartmentReservation.objects.filter(id__in=reservation_ids).update(state=state)
+    state_change_events = ApartmentReservationStateChangeEvent.objects.bulk_create(
+        ApartmentReservationStateChangeEvent(
+            reservation_id=reservation_id,
+            state=state,
+            comment=comment or "",
+            user=user,
+        )
+        for reservation_id in reservation_ids
+    )
+    audit_logging.log_many(
+        (user, Operation.CREATE, state_change_event)
+        for state_change_event in state_change_events
+    )
+    return len(reservation_ids)
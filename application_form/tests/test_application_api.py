@@ -1,7 +1,8 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 
 import pytest
 from django.urls import reverse
+from django.utils import timezone
 from freezegun import freeze_time
 from rest_framework import status
 
@@ -12,6 +13,7 @@ from apartment_application_service.settings import (
     METADATA_HITAS_PROCESS_NUMBER,
 )
 from application_form import error_codes
+from application_form.api.sales.views import STATE_EVENT_COMMIT_MARGIN
 from application_form.enums import (
     ApartmentReservationState,
     ApplicationArrivalMethod,
@@ -630,3 +632,45 @@ def test_get_apartment_states_filter(
     )
     assert response.status_code == 200
     assert response.data == {}
+
+
+@pytest.mark.django_db
+def test_get_apartment_states_after_event_id(
+    drupal_server_api_client, elastic_single_project_with_apartments
+):
+    url = reverse("application_form:apartment_states")
+    apartments = elastic_single_project_with_apartments[:3]
+    with freeze_time(timezone.now() - timedelta(hours=1)):
+        for apartment in apartments:
+            ApartmentReservationFactory(
+                apartment_uuid=apartment.uuid, state=ApartmentReservationState.RESERVED
+            )
+            LotteryEventFactory(apartment_uuid=apartment.uuid)
+
+    response = drupal_server_api_client.get(url, {"after_event_id": 0})
+    assert response.status_code == 200
+    assert sorted(response.data.keys()) == sorted(a.uuid for a in apartments)
+    last_event_id = response["X-Last-Event-Id"]
+
+    response = drupal_server_api_client.get(url, {"after_event_id": last_event_id})
+    assert response.status_code == 200
+    assert response.data == {}
+    assert response["X-Last-Event-Id"] == last_event_id
+
+    ApartmentReservation.objects.get(apartment_uuid=apartments[1].uuid).set_state(
+        ApartmentReservationState.SOLD
+    )
+    response = drupal_server_api_client.get(url, {"after_event_id": last_event_id})
+    assert response.status_code == 200
+    assert response.data == {apartments[1].uuid: ApartmentStateOfSale.SOLD}
+    # The new event might still have uncommitted predecessors, so the cursor is
+    # not moved past it yet
+    assert response["X-Last-Event-Id"] == last_event_id
+
+    with freeze_time(timezone.now() + STATE_EVENT_COMMIT_MARGIN):
+        response = drupal_server_api_client.get(url, {"after_event_id": last_event_id})
+    assert response.data == {apartments[1].uuid: ApartmentStateOfSale.SOLD}
+    assert int(response["X-Last-Event-Id"]) > int(last_event_id)
+
+    response = drupal_server_api_client.get(url, {"after_event_id": "x"})
+    assert response.status_code == 400
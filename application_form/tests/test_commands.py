@@ -5,7 +5,11 @@ from django.core.management import call_command
 from django.utils import timezone
 
 from application_form.enums import ApartmentReservationState, OfferState
+from application_form.services.offer import (
+    update_reservations_based_on_offer_expiration,
+)
 from application_form.tests.factories import OfferFactory
+from audit_log.models import AuditLog
 
 
 @pytest.mark.django_db
@@ -70,3 +74,32 @@ def test_update_reservations_based_on_offer_expiration():
     for offer, expected_state in zip(offers, expected_states):
         offer.apartment_reservation.refresh_from_db()
         assert offer.apartment_reservation.state == expected_state
+
+
+@pytest.mark.django_db
+def test_update_reservations_based_on_offer_expiration_counts_and_events():
+    today = timezone.localdate()
+    yesterday = today - timedelta(days=1)
+    expiring_offers = OfferFactory.create_batch(
+        3,
+        valid_until=yesterday,
+        state=OfferState.PENDING,
+        apartment_reservation__state=ApartmentReservationState.OFFERED,
+    )
+    unexpiring_offer = OfferFactory(
+        valid_until=today,
+        state=OfferState.PENDING,
+        apartment_reservation__state=ApartmentReservationState.OFFER_EXPIRED,
+    )
+    audit_log_count = AuditLog.objects.count()
+
+    assert update_reservations_based_on_offer_expiration() == (3, 1)
+
+    for offer in expiring_offers:
+        event = offer.apartment_reservation.state_change_events.last()
+        assert event.state == ApartmentReservationState.OFFER_EXPIRED
+    event = unexpiring_offer.apartment_reservation.state_change_events.last()
+    assert event.state == ApartmentReservationState.OFFERED
+    assert AuditLog.objects.count() == audit_log_count + 4
+
+    assert update_reservations_based_on_offer_expiration() == (0, 0)
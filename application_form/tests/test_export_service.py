@@ -1,11 +1,18 @@
+from contextlib import contextmanager
 from datetime import timedelta
+from unittest.mock import patch
 
 import pytest
 from _pytest.fixtures import fixture
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
+from elasticsearch import Elasticsearch
 
 from apartment.elastic.queries import get_apartment_uuids, get_project
-from application_form.enums import ApartmentReservationState
+from apartment.tests.factories import ApartmentDocumentFactory
+from application_form.enums import ApartmentReservationState, ApplicationType
 from application_form.models import (
     ApartmentReservation,
     ApartmentReservationStateChangeEvent,
@@ -272,3 +279,94 @@ def test_write_csv_file(applicant_export_service, tmp_path):
         contents = f.read()
         assert contents.startswith('"Primary applicant";"Primary applicant address"')
         assert "äöÄÖtest" in contents
+
+
+@pytest.mark.django_db
+def test_csv_stream_matches_csv_string(applicant_export_service):
+    profile = applicant_export_service.get_reservations()[0].customer.primary_profile
+    profile.first_name = "äöÄÖtest"
+    profile.save()
+    applicant_export_service.STREAM_CHUNK_SIZE = 100
+    chunks = list(applicant_export_service.iter_csv_bytes())
+
+    assert len(chunks) > 2
+    assert b"".join(chunks) == applicant_export_service.get_csv_string().encode(
+        "utf-8-sig"
+    )
+    assert b"".join(chunks).count(b"\xef\xbb\xbf") == 1
+
+
+@pytest.mark.django_db
+def test_csv_stream_fails_before_streaming(applicant_export_service):
+    reservation = ApartmentReservationFactory()
+
+    with pytest.raises(ObjectDoesNotExist):
+        ApplicantExportService([reservation]).iter_csv_bytes()
+
+
+@fixture
+def elastic_hitas_project_with_10_apartments(elasticsearch):
+    apartment = ApartmentDocumentFactory(project_ownership_type="Hitas")
+    apartments = [apartment] + [
+        ApartmentDocumentFactory(
+            project_uuid=apartment.project_uuid, project_ownership_type="Hitas"
+        )
+        for _ in range(9)
+    ]
+    yield apartment.project_uuid, apartments
+
+    for apartment in apartments:
+        apartment.delete(refresh=True)
+
+
+@contextmanager
+def _count_sql_and_elasticsearch_calls():
+    counts = {}
+    with patch.object(
+        Elasticsearch, "search", autospec=True, side_effect=Elasticsearch.search
+    ) as search, CaptureQueriesContext(connection) as context:
+        yield counts
+    counts["sql"] = len(context.captured_queries)
+    counts["elasticsearch"] = search.call_count
+
+
+def _export_project(project_uuid, applications_per_apartment):
+    apartment_uuids = get_apartment_uuids(project_uuid)
+    for apartment_uuid in apartment_uuids:
+        for _ in range(applications_per_apartment):
+            application_apartment = ApplicationApartmentFactory(
+                apartment_uuid=apartment_uuid,
+                application__type=ApplicationType.HITAS,
+                application__customer__secondary_profile=ProfileFactory(),
+            )
+            add_application_to_queues(application_apartment.application)
+    distribute_apartments(project_uuid)
+    project = get_project(project_uuid)
+    reservations = ApartmentReservation.objects.filter(
+        apartment_uuid__in=apartment_uuids
+    )
+
+    with _count_sql_and_elasticsearch_calls() as applicant_export_counts:
+        applicant_rows = ApplicantExportService(reservations).get_rows()
+    with _count_sql_and_elasticsearch_calls() as lottery_export_counts:
+        lottery_rows = ProjectLotteryResultExportService(project).get_rows()
+
+    assert len(applicant_rows) == len(apartment_uuids) * applications_per_apartment + 1
+    assert len(lottery_rows) == len(apartment_uuids) * applications_per_apartment + 4
+    return applicant_export_counts, lottery_export_counts
+
+
+@pytest.mark.django_db
+def test_export_call_counts_do_not_depend_on_project_size(
+    settings,
+    elastic_hitas_project_with_5_apartments,
+    elastic_hitas_project_with_10_apartments,
+):
+    settings.ELASTICSEARCH_CACHE_TIMEOUT = 0
+    small_project_uuid, _ = elastic_hitas_project_with_5_apartments
+    large_project_uuid, _ = elastic_hitas_project_with_10_apartments
+
+    small_project_counts = _export_project(small_project_uuid, 1)
+    large_project_counts = _export_project(large_project_uuid, 3)
+
+    assert small_project_counts == large_project_counts
@@ -0,0 +1,117 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from pytest import fixture, mark
+
+from application_form.enums import (
+    ApartmentReservationCancellationReason,
+    ApartmentReservationState,
+    ApplicationType,
+)
+from application_form.models import ApartmentReservation, LotteryEvent
+from application_form.services.lottery.haso import _distribute_haso_apartments
+from application_form.services.lottery.hitas import _distribute_hitas_apartments
+from application_form.services.queue import add_application_to_queues
+from application_form.tests.factories import ApplicationFactory
+
+
+@fixture(autouse=True)
+def check_latest_reservation_state_change_events_after_every_test(
+    check_latest_reservation_state_change_events,
+):
+    pass
+
+
+def _create_applications(apartments, application_type, count):
+    applications = []
+    for i in range(count):
+        application = ApplicationFactory(
+            type=application_type, right_of_residence=1000 + i
+        )
+        for priority, apartment in enumerate(apartments):
+            application.application_apartments.create(
+                apartment_uuid=apartment.uuid, priority_number=priority
+            )
+        add_application_to_queues(application)
+        applications.append(application)
+    return applications
+
+
+def _count_queries(func, *args):
+    with CaptureQueriesContext(connection) as context:
+        func(*args)
+    return len(context.captured_queries)
+
+
+@mark.django_db
+@mark.parametrize(
+    "application_type,distribute",
+    [
+        (ApplicationType.HITAS, _distribute_hitas_apartments),
+        (ApplicationType.HASO, _distribute_haso_apartments),
+    ],
+)
+def test_distribution_query_count_does_not_depend_on_application_count(
+    application_type,
+    distribute,
+    elastic_hitas_project_with_5_apartments,
+    elastic_haso_project_with_5_apartments,
+):
+    if application_type == ApplicationType.HASO:
+        project_uuid, apartments = elastic_haso_project_with_5_apartments
+    else:
+        project_uuid, apartments = elastic_hitas_project_with_5_apartments
+
+    _create_applications(apartments[:2], application_type, 2)
+    query_count_small = _count_queries(distribute, project_uuid)
+
+    ApartmentReservation.objects.all().delete()
+    LotteryEvent.objects.all().delete()
+    _create_applications(apartments[2:], application_type, 20)
+    query_count_large = _count_queries(distribute, project_uuid)
+
+    assert query_count_large == query_count_small
+
+
+@mark.django_db
+def test_haso_distribution_resolves_cancellation_cascade_in_memory(
+    elastic_haso_project_with_5_apartments,
+):
+    project_uuid, apartments = elastic_haso_project_with_5_apartments
+    first_apartment, second_apartment = apartments[0], apartments[1]
+
+    # The first applicant has the best right of residence number for both apartments
+    first = ApplicationFactory(type=ApplicationType.HASO, right_of_residence=1)
+    first_app_1 = first.application_apartments.create(
+        apartment_uuid=first_apartment.uuid, priority_number=0
+    )
+    first_app_2 = first.application_apartments.create(
+        apartment_uuid=second_apartment.uuid, priority_number=1
+    )
+    add_application_to_queues(first)
+
+    second = ApplicationFactory(type=ApplicationType.HASO, right_of_residence=2)
+    second_app = second.application_apartments.create(
+        apartment_uuid=second_apartment.uuid, priority_number=0
+    )
+    add_application_to_queues(second)
+
+    _distribute_haso_apartments(project_uuid)
+
+    first_app_1.refresh_from_db()
+    first_app_2.refresh_from_db()
+    second_app.refresh_from_db()
+    canceled = first_app_2.apartment_reservation
+
+    assert first_app_1.apartment_reservation.state == ApartmentReservationState.RESERVED
+    assert canceled.state == ApartmentReservationState.CANCELED
+    assert canceled.queue_position is None
+    assert (
+        canceled.state_change_events.last().cancellation_reason
+        == ApartmentReservationCancellationReason.LOWER_PRIORITY
+    )
+    assert canceled.queue_change_events.count() == 2
+    assert second_app.apartment_reservation.state == ApartmentReservationState.RESERVED
+    assert second_app.apartment_reservation.queue_position == 1
+    # The lottery results are recorded before the cancellations
+    assert first_app_2.lotteryeventresult.result_position == 1
+    assert second_app.lotteryeventresult.result_position == 2
@@ -0,0 +1,87 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from unittest.mock import patch
+
+from django.db import connection, transaction
+from pytest import mark
+
+from application_form.enums import ApplicationType
+from application_form.models import ApartmentReservation
+from application_form.services.queue import add_application_to_queues
+from application_form.tests.factories import ApplicationFactory
+
+APPLICATIONS_PER_WORKER = 20
+APARTMENTS_PER_APPLICATION = 5
+
+
+@contextmanager
+def _lock_reservation_table(apartment_uuids):
+    """The locking used before advisory locks: the whole table is locked."""
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f"LOCK TABLE {ApartmentReservation._meta.db_table}")
+        yield
+
+
+def _create_worker_applications(worker_count):
+    """Create applications so that each worker applies to a project of its own."""
+    applications_per_worker = []
+    for _ in range(worker_count):
+        apartment_uuids = [uuid.uuid4() for _ in range(APARTMENTS_PER_APPLICATION)]
+        applications = []
+        for _ in range(APPLICATIONS_PER_WORKER):
+            application = ApplicationFactory(type=ApplicationType.HITAS)
+            for priority, apartment_uuid in enumerate(apartment_uuids):
+                application.application_apartments.create(
+                    apartment_uuid=apartment_uuid, priority_number=priority
+                )
+            applications.append(application)
+        applications_per_worker.append(applications)
+    return applications_per_worker
+
+
+def _submit(applications):
+    try:
+        for application in applications:
+            with transaction.atomic():
+                add_application_to_queues(application)
+    finally:
+        connection.close()
+
+
+def _measure_submissions_per_second(applications_per_worker):
+    with ThreadPoolExecutor(max_workers=len(applications_per_worker)) as executor:
+        start = time.perf_counter()
+        list(executor.map(_submit, applications_per_worker))
+        elapsed = time.perf_counter() - start
+    return len(applications_per_worker) * APPLICATIONS_PER_WORKER / elapsed
+
+
+@mark.benchmark
+@mark.django_db(transaction=True)
+@mark.parametrize("worker_count", [1, 4, 8])
+def test_benchmark_concurrent_application_submissions(worker_count, capsys):
+    results = {}
+    for name, lock in [
+        ("lock table", _lock_reservation_table),
+        ("advisory locks", None),
+    ]:
+        ApartmentReservation.objects.all().delete()
+        applications_per_worker = _create_worker_applications(worker_count)
+        if lock is None:
+            results[name] = _measure_submissions_per_second(applications_per_worker)
+        else:
+            with patch("application_form.services.queue.lock_apartments", lock):
+                results[name] = _measure_submissions_per_second(applications_per_worker)
+        assert ApartmentReservation.objects.count() == (
+            worker_count * APPLICATIONS_PER_WORKER * APARTMENTS_PER_APPLICATION
+        )
+
+    with capsys.disabled():
+        for name, submissions_per_second in results.items():
+            print(
+                f"\n{worker_count} workers, {name}: "
+                f"{submissions_per_second:.1f} submissions/s"
+            )
@@ -1,7 +1,9 @@
 import logging
 from unittest.mock import Mock
 
+from django.db import connection
 from django.db.models import QuerySet
+from django.test.utils import CaptureQueriesContext
 from pytest import mark, raises
 
 from application_form.enums import (
@@ -12,6 +14,7 @@ from application_form.enums import (
 from application_form.models.reservation import (
     ApartmentQueueChangeEvent,
     ApartmentReservation,
+    ApartmentReservationStateChangeEvent,
 )
 from application_form.services.application import get_ordered_applications
 from application_form.services.queue import (
@@ -345,3 +348,100 @@ def test_add_hitas_application_to_queue_with_only_cancelled_reservations(
         .queue_position
         == 1
     )
+
+
+@mark.django_db
+@mark.parametrize(
+    "application_type", [ApplicationType.HITAS, ApplicationType.PUOLIHITAS]
+)
+def test_add_application_to_queues_query_count_does_not_depend_on_apartment_count(
+    elastic_project_with_5_apartments, application_type
+):
+    project_uuid, apartments = elastic_project_with_5_apartments
+    query_counts = []
+    for apartment_count in (1, 5):
+        application = ApplicationFactory(type=application_type)
+        for priority, apartment in enumerate(apartments[:apartment_count]):
+            application.application_apartments.create(
+                apartment_uuid=apartment.uuid, priority_number=priority
+            )
+        with CaptureQueriesContext(connection) as context:
+            add_application_to_queues(application)
+        query_counts.append(len(context.captured_queries))
+
+    assert query_counts[0] == query_counts[1]
+
+
+@mark.django_db
+def test_add_haso_application_to_queues_with_several_apartments(
+    elastic_project_with_5_apartments,
+):
+    project_uuid, apartments = elastic_project_with_5_apartments
+    existing = ApplicationFactory(type=ApplicationType.HASO, right_of_residence=2)
+    for priority, apartment in enumerate(apartments):
+        existing.application_apartments.create(
+            apartment_uuid=apartment.uuid, priority_number=priority
+        )
+    add_application_to_queues(existing)
+    application = ApplicationFactory(type=ApplicationType.HASO, right_of_residence=1)
+    for priority, apartment in enumerate(apartments):
+        application.application_apartments.create(
+            apartment_uuid=apartment.uuid, priority_number=priority
+        )
+
+    add_application_to_queues(application, comment="Added in bulk.")
+
+    for apartment in apartments:
+        assert list(get_ordered_applications(apartment.uuid)) == [
+            application,
+            existing,
+        ]
+        reservations = ApartmentReservation.objects.filter(
+            apartment_uuid=apartment.uuid
+        ).order_by("queue_position")
+        assert [(r.queue_position, r.list_position) for r in reservations] == [
+            (1, 1),
+            (2, 2),
+        ]
+    reservations = ApartmentReservation.objects.filter(
+        application_apartment__application=application
+    )
+    assert ApartmentReservationStateChangeEvent.objects.filter(
+        reservation__in=reservations, state=ApartmentReservationState.SUBMITTED
+    ).count() == len(apartments)
+    assert ApartmentQueueChangeEvent.objects.filter(
+        queue_application__in=reservations,
+        type=ApartmentQueueChangeEventType.ADDED,
+        comment="Added in bulk.",
+    ).count() == len(apartments)
+
+
+@mark.django_db
+def test_add_haso_application_to_queue_query_count_does_not_depend_on_queue_length(
+    elastic_project_with_5_apartments,
+):
+    project_uuid, apartments = elastic_project_with_5_apartments
+    query_counts = []
+    for apartment, queue_length in ((apartments[0], 1), (apartments[1], 10)):
+        for right_of_residence in range(queue_length):
+            queued = ApplicationFactory(
+                type=ApplicationType.HASO, right_of_residence=2 * right_of_residence
+            )
+            queued.application_apartments.create(
+                apartment_uuid=apartment.uuid, priority_number=0
+            )
+            add_application_to_queues(queued)
+        application = ApplicationFactory(
+            type=ApplicationType.HASO, right_of_residence=1
+        )
+        application.application_apartments.create(
+            apartment_uuid=apartment.uuid, priority_number=0
+        )
+
+        with CaptureQueriesContext(connection) as context:
+            add_application_to_queues(application)
+        query_counts.append(len(context.captured_queries))
+
+        assert list(get_ordered_applications(apartment.uuid)).index(application) == 1
+
+    assert query_counts[0] == query_counts[1]
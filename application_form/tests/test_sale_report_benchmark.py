@@ -0,0 +1,64 @@
+import time
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from pytest import fixture, mark
+
+from apartment.tests.factories import ApartmentDocumentFactory
+from application_form.enums import ApartmentReservationState
+from application_form.models import ApartmentReservationStateChangeEvent
+from application_form.services.export import SaleReportExportService
+from application_form.tests.factories import ApartmentReservationFactory
+
+PROJECT_COUNT = 100
+APARTMENTS_PER_PROJECT = 5
+
+
+@fixture
+def elastic_projects_with_sold_apartments(elasticsearch):
+    apartments = []
+    for i in range(PROJECT_COUNT):
+        project_apartment = ApartmentDocumentFactory(
+            project_ownership_type="Hitas" if i % 2 else "Haso",
+            project_apartment_count=APARTMENTS_PER_PROJECT,
+        )
+        apartments.append(project_apartment)
+        for _ in range(APARTMENTS_PER_PROJECT - 1):
+            apartments.append(
+                ApartmentDocumentFactory(
+                    project_uuid=project_apartment.project_uuid,
+                    project_ownership_type=project_apartment.project_ownership_type,
+                    project_apartment_count=APARTMENTS_PER_PROJECT,
+                )
+            )
+    for apartment in apartments[::2]:
+        ApartmentReservationFactory(
+            apartment_uuid=apartment.uuid,
+            list_position=1,
+            queue_position=1,
+            state=ApartmentReservationState.SOLD,
+        )
+    yield apartments
+
+    for apartment in apartments:
+        apartment.delete(refresh=True)
+
+
+@mark.benchmark
+@mark.django_db
+def test_benchmark_sale_report(elastic_projects_with_sold_apartments, capsys):
+    sold_events = ApartmentReservationStateChangeEvent.objects.filter(
+        state=ApartmentReservationState.SOLD
+    )
+
+    with CaptureQueriesContext(connection) as context:
+        start = time.perf_counter()
+        rows = SaleReportExportService(sold_events).get_rows()
+        elapsed = time.perf_counter() - start
+
+    assert len(rows) == PROJECT_COUNT + 2
+    with capsys.disabled():
+        print(
+            f"\nSale report of {PROJECT_COUNT} projects: {elapsed:.2f} s, "
+            f"{len(context.captured_queries)} SQL queries"
+        )
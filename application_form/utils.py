@@ -1,21 +1,45 @@
 import re
+import uuid
 from contextlib import contextmanager
-from typing import Tuple
+from typing import Iterable, Tuple
 
 from django.db import transaction
 from django.db.transaction import get_connection
 
 
-# from https://stackoverflow.com/a/54403001
 @contextmanager
-def lock_table(model):
+def lock_apartments(apartment_uuids: Iterable[uuid.UUID]):
+    """
+    Lock the reservation queues of the given apartments until the end of the current
+    transaction.
+
+    Uses PostgreSQL transaction level advisory locks keyed on the apartment UUID, so
+    only the operations touching the same apartments are serialized. The locks are
+    always acquired in the same order to avoid deadlocks between transactions that
+    lock several apartments.
+    """
     with transaction.atomic():
-        cursor = get_connection().cursor()
-        cursor.execute(f"LOCK TABLE {model._meta.db_table}")
-        try:
-            yield
-        finally:
-            cursor.close()
+        lock_keys = sorted(
+            {
+                _get_advisory_lock_key(apartment_uuid)
+                for apartment_uuid in apartment_uuids
+            }
+        )
+        if lock_keys:
+            with get_connection().cursor() as cursor:
+                # The locks are acquired in the order of the array elements
+                cursor.execute(
+                    "SELECT pg_advisory_xact_lock(lock_key) "
+                    "FROM unnest(%s::bigint[]) AS lock_key",
+                    [lock_keys],
+                )
+        yield
+
+
+def _get_advisory_lock_key(apartment_uuid: uuid.UUID) -> int:
+    """Return a signed 64-bit advisory lock key for the given apartment UUID."""
+    apartment_uuid = uuid.UUID(str(apartment_uuid))
+    return int.from_bytes(apartment_uuid.bytes[:8], "big", signed=True)
 
 
 def get_apartment_number_sort_tuple(apartment_number: str) -> Tuple[str, int]:
@@ -202,6 +202,8 @@ def _import_data(directory=None, ignore_errors=False, skip_imported=False):
     import_model("LotteryEventResult.txt", LotteryEventResultSerializer)
     import_model("ProjectInstallmentTemplate.txt", ProjectInstallmentTemplateSerializer)
     import_model("ApartmentInstallment.txt", ApartmentInstallmentSerializer)
+    # The imported installments have their invoice numbers given explicitly
+    ApartmentInstallment.objects.sync_invoice_number_sequence()
 
 
 def _is_imported(
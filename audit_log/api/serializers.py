@@ -4,6 +4,7 @@ from rest_framework.fields import CharField, DateTimeField, IntegerField, UUIDFi
 
 from audit_log.enums import Operation, Role, Status
 from audit_log.models import AuditLog
+from audit_log.queries import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 
 class ActorSerializer(serializers.Serializer):
@@ -50,4 +51,42 @@ class AuditLogSerializer(serializers.Serializer):
         fields = ["audit_event"]
 
     def create(self, validated_data):
-        return AuditLog.objects.create(message=self.data)
+        audit_log = AuditLog.from_message(self.data)
+        audit_log.save()
+        return audit_log
+
+
+class AuditLogQuerySerializer(serializers.Serializer):
+    actor_profile_id = UUIDField(required=False)
+    actor_role = EnumField(Role, required=False)
+    operation = EnumField(Operation, required=False)
+    target_type = CharField(required=False)
+    target_id = CharField(required=False)
+    start_time = DateTimeField(required=False)
+    end_time = DateTimeField(required=False)
+    after_id = IntegerField(required=False, min_value=0)
+    limit = IntegerField(
+        required=False, default=DEFAULT_PAGE_SIZE, min_value=1, max_value=MAX_PAGE_SIZE
+    )
+
+    def to_internal_value(self, data):
+        attrs = super().to_internal_value(data)
+        for field in ["actor_role", "operation"]:
+            if field in attrs:
+                attrs[field] = attrs[field].value
+        return attrs
+
+
+class AuditLogEntrySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AuditLog
+        fields = [
+            "id",
+            "event_time",
+            "actor_profile_id",
+            "actor_role",
+            "operation",
+            "target_type",
+            "target_id",
+            "message",
+        ]
@@ -1,11 +1,42 @@
 from rest_framework import mixins, viewsets
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from audit_log.api.serializers import AuditLogSerializer
+from audit_log.api.serializers import (
+    AuditLogEntrySerializer,
+    AuditLogQuerySerializer,
+    AuditLogSerializer,
+)
 from audit_log.models import AuditLog
+from audit_log.queries import get_audit_log_entries
 
 
 class AuditLogViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
     queryset = AuditLog.objects.all()
     serializer_class = AuditLogSerializer
     permission_classes = [IsAuthenticated]
+
+
+class AuditLogQueryAPIView(APIView):
+    """
+    Returns the audit log entries matching the filters given as query parameters.
+
+    The entries are returned in the order they were written, `limit` entries at a
+    time. The id of the last returned entry is given in the X-Last-Id header, to be
+    used as the `after_id` of the next page.
+
+    The audit log is only readable by the admin users.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        query = AuditLogQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        entries = get_audit_log_entries(**query.validated_data)
+
+        response = Response(AuditLogEntrySerializer(entries, many=True).data)
+        if entries:
+            response["X-Last-Id"] = str(entries[-1].id)
+        return response
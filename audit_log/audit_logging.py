@@ -1,7 +1,10 @@
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timezone
-from typing import Callable, Optional, Union
+from typing import Callable, Iterable, List, Optional, Tuple, Union
 
 from django.contrib.auth.models import AnonymousUser
+from django.db import transaction
 from django.db.models import Model
 
 from audit_log.enums import Operation, Role, Status
@@ -10,6 +13,8 @@ from users.models import Profile
 
 ORIGIN = "APARTMENT_APPLICATION_SERVICE"
 
+_local = threading.local()
+
 
 def _now() -> datetime:
     """Returns the current time in UTC timezone."""
@@ -37,7 +42,91 @@ def log(
 
     Audit log events are written to the "audit" logger at "INFO" level.
     """
+    message = _get_message(actor, operation, target, status, get_time())
+    buffer = _get_current_buffer()
+    if buffer is not None:
+        buffer.append(message)
+    else:
+        AuditLog.from_message(message).save()
+
+
+def log_many(
+    events: Iterable[
+        Tuple[Optional[Union[Profile, AnonymousUser]], Operation, Optional[Model]]
+    ],
+    status: Status = Status.SUCCESS,
+    get_time: Callable[[], datetime] = _now,
+):
+    """
+    Write several events to the audit log with a single query.
+
+    Each event is an (actor, operation, target) tuple, interpreted the same way as
+    the arguments of `log`. The events are written in the given order.
+    """
     current_time = get_time()
+    messages = [
+        _get_message(actor, operation, target, status, current_time)
+        for actor, operation, target in events
+    ]
+    buffer = _get_current_buffer()
+    if buffer is not None:
+        buffer.extend(messages)
+    else:
+        _write(messages)
+
+
+@contextmanager
+def buffered():
+    """
+    Collect the audit log events of the block and write them with a single query.
+
+    The block is run in a transaction and the events are written in that transaction
+    right before it ends, so they are rolled back together with the changes they
+    describe, like unbuffered events are. Nested blocks use savepoints: the events of
+    a nested block that raises an exception are dropped.
+
+    The events are only dropped together with a nested `buffered` block, not with
+    a plain `transaction.atomic` savepoint. Code inside the block which catches
+    exceptions to roll back a part of its changes should therefore use a nested
+    `buffered` block instead of `transaction.atomic`.
+    """
+    buffers = _get_buffers()
+    with transaction.atomic():
+        buffers.append([])
+        try:
+            yield
+        except BaseException:
+            buffers.pop()
+            raise
+        buffer = buffers.pop()
+        if buffers:
+            buffers[-1].extend(buffer)
+        else:
+            _write(buffer)
+
+
+def _get_buffers() -> List[List[dict]]:
+    if not hasattr(_local, "buffers"):
+        _local.buffers = []
+    return _local.buffers
+
+
+def _get_current_buffer() -> Optional[List[dict]]:
+    buffers = _get_buffers()
+    return buffers[-1] if buffers else None
+
+
+def _write(messages: List[dict]):
+    AuditLog.objects.bulk_create(AuditLog.from_message(message) for message in messages)
+
+
+def _get_message(
+    actor: Optional[Union[Profile, AnonymousUser]],
+    operation: Operation,
+    target: Optional[Model],
+    status: Status,
+    current_time: datetime,
+) -> dict:
     profile_id = None
     if actor is None:
         role = Role.SYSTEM
@@ -49,7 +138,7 @@ def log(
     else:
         role = Role.USER
         profile_id = str(actor.pk)
-    message = {
+    return {
         "audit_event": {
             "origin": ORIGIN,
             "status": str(status.value),
@@ -66,7 +155,6 @@ def log(
             },
         },
     }
-    AuditLog.objects.create(message=message)
 
 
 def _get_target_id(instance: Optional[Model]) -> Optional[str]:
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from audit_log.models import AuditLog, get_message_fields
+
+BATCH_SIZE = 1000
+FIELDS = list(get_message_fields({}))
+
+
+class Command(BaseCommand):
+    help = "Fill in the queryable fields of the audit log entries from their messages"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help=f"Number of entries updated at a time (default: {BATCH_SIZE})",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        updated_count = 0
+        last_id = 0
+        while True:
+            entries = list(
+                AuditLog.objects.filter(event_time=None, id__gt=last_id)
+                .order_by("id")
+                .only("id", "message")[:batch_size]
+            )
+            if not entries:
+                break
+            last_id = entries[-1].id
+            for entry in entries:
+                for field, value in get_message_fields(entry.message).items():
+                    setattr(entry, field, value)
+            AuditLog.objects.bulk_update(entries, FIELDS)
+            updated_count += len(entries)
+            self.stdout.write(f"{updated_count} audit log entries updated")
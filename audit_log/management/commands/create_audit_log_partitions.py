@@ -0,0 +1,26 @@
+from logging import getLogger
+
+from django.core.management.base import BaseCommand
+
+from audit_log.partitions import create_partitions, DEFAULT_MONTHS_AHEAD
+
+logger = getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Create the monthly partitions of the audit log table ahead of time"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=DEFAULT_MONTHS_AHEAD,
+            help="Number of months to create the partitions ahead "
+            f"(default: {DEFAULT_MONTHS_AHEAD})",
+        )
+
+    def handle(self, *args, **options):
+        created = create_partitions(options["months_ahead"])
+        for name in created:
+            logger.info(f"Created audit log partition {name}")
+        self.stdout.write(f"{len(created)} audit log partitions created")
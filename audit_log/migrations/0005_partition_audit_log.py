@@ -0,0 +1,93 @@
+from django.db import migrations
+
+# The existing table is attached as is as the partition of the rows created
+# before the current month ends, so that the existing rows need not be copied.
+# The primary key of a partitioned table has to contain the partition key, and
+# identity columns are not supported on partitioned tables, so the ids are taken
+# from a plain sequence continuing the numbering of the existing table.
+forwards_sql = """
+ALTER TABLE audit_log_auditlog RENAME TO audit_log_auditlog_legacy;
+ALTER TABLE audit_log_auditlog_legacy
+    RENAME CONSTRAINT audit_log_auditlog_pkey TO audit_log_auditlog_legacy_pkey;
+
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_attribute
+        WHERE attrelid = 'audit_log_auditlog_legacy'::regclass
+        AND attname = 'id'
+        AND attidentity <> ''
+    ) THEN
+        ALTER TABLE audit_log_auditlog_legacy ALTER COLUMN id DROP IDENTITY;
+        CREATE SEQUENCE audit_log_auditlog_id_seq;
+        PERFORM setval(
+            'audit_log_auditlog_id_seq',
+            COALESCE((SELECT MAX(id) FROM audit_log_auditlog_legacy), 0) + 1,
+            false
+        );
+    ELSE
+        ALTER TABLE audit_log_auditlog_legacy ALTER COLUMN id DROP DEFAULT;
+        ALTER SEQUENCE audit_log_auditlog_id_seq OWNED BY NONE;
+    END IF;
+END $$;
+
+CREATE TABLE audit_log_auditlog (
+    id bigint NOT NULL DEFAULT nextval('audit_log_auditlog_id_seq'),
+    message jsonb NOT NULL,
+    sent_at timestamp with time zone NULL,
+    created_at timestamp with time zone NOT NULL,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+ALTER SEQUENCE audit_log_auditlog_id_seq OWNED BY audit_log_auditlog.id;
+
+ALTER TABLE audit_log_auditlog ATTACH PARTITION audit_log_auditlog_legacy
+    FOR VALUES FROM (MINVALUE) TO (date_trunc('month', now()) + interval '1 month');
+CREATE TABLE audit_log_auditlog_default PARTITION OF audit_log_auditlog DEFAULT;
+"""
+
+# The monthly partitions of the following three months, like those created with
+# the create_audit_log_partitions command
+create_partitions_sql = """
+DO $$
+DECLARE
+    month date;
+BEGIN
+    FOR month IN SELECT generate_series(
+        date_trunc('month', now()) + interval '1 month',
+        date_trunc('month', now()) + interval '3 months',
+        interval '1 month'
+    )::date
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF audit_log_auditlog '
+            'FOR VALUES FROM (%L) TO (%L)',
+            'audit_log_auditlog_p' || to_char(month, 'YYYY_MM'),
+            month,
+            (month + interval '1 month')::date
+        );
+    END LOOP;
+END $$;
+"""
+
+backwards_sql = """
+CREATE TABLE audit_log_auditlog_unpartitioned
+    (LIKE audit_log_auditlog INCLUDING DEFAULTS);
+INSERT INTO audit_log_auditlog_unpartitioned SELECT * FROM audit_log_auditlog;
+ALTER SEQUENCE audit_log_auditlog_id_seq
+    OWNED BY audit_log_auditlog_unpartitioned.id;
+DROP TABLE audit_log_auditlog;
+ALTER TABLE audit_log_auditlog_unpartitioned RENAME TO audit_log_auditlog;
+ALTER TABLE audit_log_auditlog ADD PRIMARY KEY (id);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("audit_log", "0004_add_fields_to_audit_log"),
+    ]
+
+    operations = [
+        migrations.RunSQL(forwards_sql, backwards_sql),
+        migrations.RunSQL(create_partitions_sql, migrations.RunSQL.noop),
+    ]
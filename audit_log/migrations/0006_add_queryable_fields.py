@@ -0,0 +1,131 @@
+# Generated by Django 4.2.6 on 2026-10-17 07:46
+
+from django.db import migrations, models
+
+# (name, partition index suffix, columns)
+INDEXES = [
+    ("audit_log_actor_id_idx", "actor_id_idx", "actor_profile_id, id"),
+    ("audit_log_target_id_idx", "target_id_idx", "target_id, id"),
+    ("audit_log_event_time_idx", "event_time_idx", "event_time"),
+]
+
+
+def create_indexes(apps, schema_editor):
+    """Create the indexes without blocking the writes to the audit log.
+
+    Indexes cannot be created concurrently on a partitioned table, so the index of
+    the partitioned table is first created as invalid without indexing the
+    partitions, then the index of each partition is created concurrently and
+    attached to it. The index becomes valid once all the partitions are attached.
+    """
+    quote_name = schema_editor.connection.ops.quote_name
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = 'audit_log_auditlog'
+            ORDER BY child.relname
+            """
+        )
+        partitions = [row[0] for row in cursor.fetchall()]
+        for name, suffix, columns in INDEXES:
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {name} "
+                f"ON ONLY audit_log_auditlog ({columns})"
+            )
+            for partition in partitions:
+                partition_index = quote_name(f"{partition}_{suffix}")
+                cursor.execute(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {partition_index} "
+                    f"ON {quote_name(partition)} ({columns})"
+                )
+                cursor.execute(f"ALTER INDEX {name} ATTACH PARTITION {partition_index}")
+
+
+def drop_indexes(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        for name, _, _ in INDEXES:
+            cursor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+    # The indexes are created concurrently, which cannot be done in a transaction
+    atomic = False
+
+    dependencies = [
+        ("audit_log", "0005_partition_audit_log"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="auditlog",
+            name="actor_profile_id",
+            field=models.UUIDField(
+                blank=True, null=True, verbose_name="actor profile id"
+            ),
+        ),
+        migrations.AddField(
+            model_name="auditlog",
+            name="actor_role",
+            field=models.CharField(
+                blank=True, max_length=16, null=True, verbose_name="actor role"
+            ),
+        ),
+        migrations.AddField(
+            model_name="auditlog",
+            name="event_time",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="event time"
+            ),
+        ),
+        migrations.AddField(
+            model_name="auditlog",
+            name="operation",
+            field=models.CharField(
+                blank=True, max_length=16, null=True, verbose_name="operation"
+            ),
+        ),
+        migrations.AddField(
+            model_name="auditlog",
+            name="target_id",
+            field=models.CharField(
+                blank=True, max_length=255, null=True, verbose_name="target id"
+            ),
+        ),
+        migrations.AddField(
+            model_name="auditlog",
+            name="target_type",
+            field=models.CharField(
+                blank=True, max_length=100, null=True, verbose_name="target type"
+            ),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name="auditlog",
+                    index=models.Index(
+                        fields=["actor_profile_id", "id"],
+                        name="audit_log_actor_id_idx",
+                    ),
+                ),
+                migrations.AddIndex(
+                    model_name="auditlog",
+                    index=models.Index(
+                        fields=["target_id", "id"], name="audit_log_target_id_idx"
+                    ),
+                ),
+                migrations.AddIndex(
+                    model_name="auditlog",
+                    index=models.Index(
+                        fields=["event_time"], name="audit_log_event_time_idx"
+                    ),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_indexes, drop_indexes),
+            ],
+        ),
+    ]
@@ -1,3 +1,7 @@
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
 from django.db import models
 from django.db.models import JSONField
 from django.utils.translation import gettext_lazy as _
@@ -8,6 +12,35 @@ class AuditLog(models.Model):
     sent_at = models.DateTimeField(null=True, blank=True, verbose_name=_("sent at"))
     created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("created at"))
 
+    # Copied from the message for querying
+    actor_profile_id = models.UUIDField(
+        null=True, blank=True, verbose_name=_("actor profile id")
+    )
+    actor_role = models.CharField(
+        max_length=16, null=True, blank=True, verbose_name=_("actor role")
+    )
+    operation = models.CharField(
+        max_length=16, null=True, blank=True, verbose_name=_("operation")
+    )
+    target_type = models.CharField(
+        max_length=100, null=True, blank=True, verbose_name=_("target type")
+    )
+    target_id = models.CharField(
+        max_length=255, null=True, blank=True, verbose_name=_("target id")
+    )
+    event_time = models.DateTimeField(
+        null=True, blank=True, verbose_name=_("event time")
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["actor_profile_id", "id"], name="audit_log_actor_id_idx"
+            ),
+            models.Index(fields=["target_id", "id"], name="audit_log_target_id_idx"),
+            models.Index(fields=["event_time"], name="audit_log_event_time_idx"),
+        ]
+
     def __str__(self):
         return " ".join(
             [
@@ -20,6 +53,48 @@ class AuditLog(models.Model):
             ]
         )
 
+    @classmethod
+    def from_message(cls, message: dict) -> "AuditLog":
+        return cls(message=message, **get_message_fields(message))
+
+
+def get_message_fields(message: dict) -> dict:
+    """Return the values of the queryable fields of the given audit log message."""
+    return {
+        "actor_profile_id": _parse_uuid(
+            _get(message, "audit_event", "actor", "profile_id")
+        ),
+        "actor_role": _get(message, "audit_event", "actor", "role"),
+        "operation": _get(message, "audit_event", "operation"),
+        "target_type": _get(message, "audit_event", "target", "type"),
+        "target_id": _get(message, "audit_event", "target", "id"),
+        "event_time": _parse_epoch(_get(message, "audit_event", "date_time_epoch")),
+    }
+
+
+def _get(value: dict, *keys: str) -> Optional[str]:
+    """Look up a nested key in the given dict, or return None if it is missing."""
+    for key in keys:
+        if not isinstance(value, dict) or value.get(key) is None:
+            return None
+        value = value[key]
+    return str(value)
+
+
+def _parse_uuid(value: Optional[str]) -> Optional[uuid.UUID]:
+    try:
+        return uuid.UUID(value) if value else None
+    except ValueError:
+        return None
+
+
+def _parse_epoch(value: Optional[str]) -> Optional[datetime]:
+    """Parse the given epoch timestamp in milliseconds."""
+    try:
+        return datetime.fromtimestamp(int(value) / 1000, tz=timezone.utc)
+    except (TypeError, ValueError):
+        return None
+
 
 def _safe_get(value: dict, *keys: str) -> str:
     """Look up a nested key in the given dict, or return "UNKNOWN" on KeyError."""
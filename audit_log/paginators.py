@@ -15,6 +15,9 @@ class LargeTablePaginator(Paginator):
     the COUNT(*) which is used by the default paginator. Therefore this
     should work better for tables containing millions of rows.
 
+    For a partitioned table the estimates of its partitions are summed up, as
+    the partitioned table itself holds no rows.
+
     See https://wiki.postgresql.org/wiki/Count_estimate for details.
     """
 
@@ -22,7 +25,18 @@ class LargeTablePaginator(Paginator):
     def count(self):
         with connection.cursor() as cursor:
             cursor.execute(
-                "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+                """
+                SELECT CASE
+                    WHEN parent.relkind <> 'p' THEN parent.reltuples
+                    WHEN bool_and(child.reltuples < 0) THEN -1
+                    ELSE SUM(GREATEST(child.reltuples, 0))
+                END::bigint
+                FROM pg_class parent
+                LEFT JOIN pg_inherits ON pg_inherits.inhparent = parent.oid
+                LEFT JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                WHERE parent.relname = %s
+                GROUP BY parent.relkind, parent.reltuples
+                """,
                 [self.object_list.query.model._meta.db_table],
             )
             estimate = cursor.fetchone()[0]
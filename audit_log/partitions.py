@@ -0,0 +1,241 @@
+"""
+Management of the monthly range partitions of the audit log table.
+
+The audit log table is partitioned by `created_at`. Each month is stored in its own
+partition named `audit_log_auditlog_pYYYY_MM`, and the rows created before the
+table was partitioned are stored in the `audit_log_auditlog_legacy` partition.
+Rows which do not fit in any of the partitions end up in the default partition.
+
+The partitions are created ahead of time with the `create_audit_log_partitions`
+management command, and the old partitions are dropped as a whole once all their
+rows have been sent to Elasticsearch. Rows are never deleted one by one from the
+monthly partitions, so a row is kept up to a month longer than its retention
+period. Only the legacy partition, which holds all the rows from before the
+partitioning, is also cleared of its old sent rows in small batches.
+"""
+import logging
+import re
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import List, Optional
+
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from audit_log.models import AuditLog
+
+LOGGER = logging.getLogger(__name__)
+
+PARTITION_NAME_FORMAT = "{table}_p{year:04d}_{month:02d}"
+LEGACY_PARTITION_NAME_FORMAT = "{table}_legacy"
+DEFAULT_MONTHS_AHEAD = 3
+LEGACY_DELETE_BATCH_SIZE = 1000
+LEGACY_DELETE_MAX_BATCHES = 100
+
+_UPPER_BOUND_PATTERN = re.compile(r"TO \('([^']+)'\)")
+
+
+@dataclass
+class Partition:
+    name: str
+    # None for the default partition
+    upper_bound: Optional[datetime]
+
+
+def _get_table() -> str:
+    return AuditLog._meta.db_table
+
+
+def _add_months(month: date, months: int) -> date:
+    month_index = month.year * 12 + month.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def get_partitions() -> List[Partition]:
+    """Return the partitions of the audit log table."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+            ORDER BY child.relname
+            """,
+            [_get_table()],
+        )
+        rows = cursor.fetchall()
+
+    partitions = []
+    for name, bound in rows:
+        match = _UPPER_BOUND_PATTERN.search(bound)
+        upper_bound = parse_datetime(match.group(1)) if match else None
+        partitions.append(Partition(name=name, upper_bound=upper_bound))
+    return partitions
+
+
+def create_partitions(
+    months_ahead: int = DEFAULT_MONTHS_AHEAD, today: Optional[date] = None
+) -> List[str]:
+    """Create the missing monthly partitions up to `months_ahead` months ahead.
+
+    The partitions are created starting from the month following the latest
+    existing partition. Returns the names of the created partitions.
+    """
+    today = today or date.today()
+    table = _get_table()
+    partitions = get_partitions()
+    upper_bounds = [p.upper_bound for p in partitions if p.upper_bound]
+    if upper_bounds:
+        month = max(upper_bounds).date().replace(day=1)
+    else:
+        month = today.replace(day=1)
+    last_month = _add_months(today.replace(day=1), months_ahead)
+    default_partition = next((p.name for p in partitions if not p.upper_bound), None)
+
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        while month <= last_month:
+            name = PARTITION_NAME_FORMAT.format(
+                table=table, year=month.year, month=month.month
+            )
+            bounds = [month.isoformat(), _add_months(month, 1).isoformat()]
+            if default_partition and _has_rows(cursor, default_partition, bounds):
+                _create_partition_from_default(
+                    cursor, table, name, default_partition, bounds
+                )
+            else:
+                cursor.execute(
+                    f"CREATE TABLE {connection.ops.quote_name(name)} "
+                    f"PARTITION OF {connection.ops.quote_name(table)} "
+                    "FOR VALUES FROM (%s) TO (%s)",
+                    bounds,
+                )
+            created.append(name)
+            month = _add_months(month, 1)
+    return created
+
+
+def _has_rows(cursor, partition: str, bounds: List[str]) -> bool:
+    cursor.execute(
+        f"SELECT EXISTS (SELECT 1 FROM {connection.ops.quote_name(partition)} "
+        "WHERE created_at >= %s AND created_at < %s)",
+        bounds,
+    )
+    return cursor.fetchone()[0]
+
+
+def _create_partition_from_default(
+    cursor, table: str, name: str, default_partition: str, bounds: List[str]
+):
+    """Create a partition for rows which are already in the default partition.
+
+    A partition cannot be created while the default partition contains rows
+    belonging to it, so the partition is created as a separate table, the rows
+    are moved to it and then it is attached to the partitioned table. Writes to
+    the default partition are blocked until the end of the transaction.
+    """
+    table = connection.ops.quote_name(table)
+    default_partition = connection.ops.quote_name(default_partition)
+    quoted_name = connection.ops.quote_name(name)
+    cursor.execute(f"LOCK TABLE {default_partition} IN EXCLUSIVE MODE")
+    cursor.execute(f"CREATE TABLE {quoted_name} (LIKE {table} INCLUDING DEFAULTS)")
+    cursor.execute(
+        f"WITH moved AS (DELETE FROM {default_partition} "
+        "WHERE created_at >= %s AND created_at < %s RETURNING *) "
+        f"INSERT INTO {quoted_name} SELECT * FROM moved",
+        bounds,
+    )
+    LOGGER.warning(
+        "Moved %s audit log entries from the default partition to %s",
+        cursor.rowcount,
+        name,
+    )
+    cursor.execute(
+        f"ALTER TABLE {table} ATTACH PARTITION {quoted_name} "
+        "FOR VALUES FROM (%s) TO (%s)",
+        bounds,
+    )
+
+
+def drop_partitions(
+    created_before: datetime, unsent_created_before: Optional[datetime] = None
+) -> int:
+    """Drop the partitions whose rows were all created before `created_before`.
+
+    A partition is dropped only if all its rows have been sent to Elasticsearch,
+    unless its rows were all created before `unsent_created_before`. This way an
+    entry which Elasticsearch keeps rejecting blocks the dropping of its partition
+    only for a grace period, after which it is dropped and the number of dropped
+    unsent entries is logged as an error.
+
+    Returns the number of rows dropped.
+    """
+    table = connection.ops.quote_name(_get_table())
+    dropped_count = 0
+    for partition in get_partitions():
+        if partition.upper_bound is None or partition.upper_bound > created_before:
+            continue
+        name = connection.ops.quote_name(partition.name)
+        grace_period_over = (
+            unsent_created_before is not None
+            and partition.upper_bound <= unsent_created_before
+        )
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT COUNT(*), COUNT(*) FILTER (WHERE sent_at IS NULL) FROM {name}"
+            )
+            row_count, unsent_count = cursor.fetchone()
+            if unsent_count and not grace_period_over:
+                LOGGER.warning(
+                    "Audit log partition %s has %s unsent entries, not dropped",
+                    partition.name,
+                    unsent_count,
+                )
+                continue
+            cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+            cursor.execute(f"DROP TABLE {name}")
+        if unsent_count:
+            LOGGER.error(
+                "Dropped %s unsent audit log entries with partition %s",
+                unsent_count,
+                partition.name,
+            )
+        LOGGER.info(
+            "Dropped audit log partition %s with %s entries", partition.name, row_count
+        )
+        dropped_count += row_count
+    return dropped_count
+
+
+def delete_legacy_entries(
+    created_before: datetime,
+    batch_size: int = LEGACY_DELETE_BATCH_SIZE,
+    max_batches: int = LEGACY_DELETE_MAX_BATCHES,
+) -> int:
+    """Delete the sent rows created before `created_before` from the legacy partition.
+
+    The rows are deleted in at most `max_batches` batches of `batch_size` rows, each
+    in its own transaction, so that a single run neither holds locks for long nor
+    produces a burst of WAL. The remaining rows are deleted by the following runs,
+    or dropped with the partition. Returns the number of rows deleted.
+    """
+    name = LEGACY_PARTITION_NAME_FORMAT.format(table=_get_table())
+    if name not in {p.name for p in get_partitions()}:
+        return 0
+    name = connection.ops.quote_name(name)
+
+    deleted_count = 0
+    for _ in range(max_batches):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {name} WHERE id IN (SELECT id FROM {name} "
+                "WHERE sent_at IS NOT NULL AND created_at <= %s LIMIT %s)",
+                [created_before, batch_size],
+            )
+            batch_count = cursor.rowcount
+        deleted_count += batch_count
+        if batch_count < batch_size:
+            break
+    return deleted_count
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+from uuid import UUID
+
+from audit_log.models import AuditLog
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# How far apart the time of an event and the time its entry was written can be.
+# The time filters are also applied to the creation time, which is the partition
+# key of the audit log table, so that only the partitions of the requested time
+# range are scanned. Entries written later than this after their events are not
+# found by the time filters.
+EVENT_TIME_MARGIN = timedelta(days=1)
+
+
+def get_audit_log_entries(
+    actor_profile_id: Optional[UUID] = None,
+    actor_role: Optional[str] = None,
+    operation: Optional[str] = None,
+    target_type: Optional[str] = None,
+    target_id: Optional[str] = None,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    after_id: Optional[int] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> List[AuditLog]:
+    """Return a page of the audit log entries matching the given filters.
+
+    The entries are ordered by id, i.e. in the order they were written. The next
+    page is fetched by passing the id of the last entry of a page as `after_id`.
+    """
+    filters = {
+        "actor_profile_id": actor_profile_id,
+        "actor_role": actor_role,
+        "operation": operation,
+        "target_type": target_type,
+        "target_id": target_id,
+        "event_time__gte": start_time,
+        "event_time__lte": end_time,
+        "created_at__gte": start_time and start_time - EVENT_TIME_MARGIN,
+        "created_at__lte": end_time and end_time + EVENT_TIME_MARGIN,
+        "id__gt": after_id,
+    }
+    entries = AuditLog.objects.filter(
+        **{key: value for key, value in filters.items() if value is not None}
+    )
+    return list(entries.order_by("id")[:limit])
@@ -1,17 +1,25 @@
 import logging
 from datetime import timedelta
+from typing import Iterable, List, Optional, Tuple
 
 from django.conf import settings
 from django.utils import timezone
 from elasticsearch import Elasticsearch
+from elasticsearch.helpers import streaming_bulk
 
 from audit_log.models import AuditLog
+from audit_log.partitions import delete_legacy_entries, drop_partitions
 
 ES_STATUS_CREATED = "created"
+ES_STATUS_CONFLICT = 409
+SEND_CHUNK_SIZE = 500
+# Entries that could not be sent to Elasticsearch are dropped with their partition
+# once they are this much older than the retention period
+UNSENT_GRACE_PERIOD = timedelta(days=30)
 LOGGER = logging.getLogger(__name__)
 
 
-def send_audit_log_to_elastic_search():
+def _get_elasticsearch_client() -> Optional[Elasticsearch]:
     if not (
         settings.AUDIT_LOG_ELASTICSEARCH_HOST
         and settings.AUDIT_LOG_ELASTICSEARCH_PORT
@@ -23,8 +31,8 @@ def send_audit_log_to_elastic_search():
             "Trying to send audit log to Elasticsearch without proper configuration,"
             "process skipped"
         )
-        return
-    es = Elasticsearch(
+        return None
+    return Elasticsearch(
         [
             {
                 "host": settings.AUDIT_LOG_ELASTICSEARCH_HOST,
@@ -37,28 +45,92 @@ def send_audit_log_to_elastic_search():
             settings.AUDIT_LOG_ELASTICSEARCH_PASSWORD,
         ),
     )
-    entries = AuditLog.objects.filter(sent_at=None).order_by("created_at")
-
-    for entry in entries:
-        message_body = entry.message.copy()
-        message_body["@timestamp"] = entry.message["audit_event"][
-            "date_time_epoch"
-        ]  # required by ES
-        rs = es.index(
-            index=settings.ELASTICSEARCH_APP_AUDIT_LOG_INDEX,
-            id=entry.id,
-            body=message_body,
-            op_type="create",
+
+
+def _get_actions(entries: Iterable[Tuple[int, dict]]):
+    for entry_id, message in entries:
+        yield {
+            "_op_type": "create",
+            "_index": settings.ELASTICSEARCH_APP_AUDIT_LOG_INDEX,
+            "_id": entry_id,
+            **message,
+            # required by ES
+            "@timestamp": message["audit_event"]["date_time_epoch"],
+        }
+
+
+def _send_chunk(es: Elasticsearch, entries: List[Tuple[int, dict]]) -> List[int]:
+    """Index the given entries and return the ids of the ones that are in ES.
+
+    An entry which already exists in the index was sent by an earlier run that
+    failed before it could mark the entry sent, so it is considered sent as well.
+    """
+    sent_ids = []
+    for ok, item in streaming_bulk(
+        es,
+        _get_actions(entries),
+        chunk_size=len(entries),
+        max_retries=3,
+        raise_on_error=False,
+    ):
+        result = item["create"]
+        if ok or result.get("status") == ES_STATUS_CONFLICT:
+            sent_ids.append(int(result["_id"]))
+        else:
+            LOGGER.error(
+                "Failed to send audit log entry %s to Elasticsearch: %s",
+                result.get("_id"),
+                result.get("error"),
+            )
+    return sent_ids
+
+
+def send_audit_log_to_elastic_search(
+    es: Optional[Elasticsearch] = None, chunk_size: int = SEND_CHUNK_SIZE
+) -> Optional[int]:
+    """Send the unsent audit log entries to Elasticsearch in bulk.
+
+    The entries are read in chunks of `chunk_size` in id order, and each chunk is
+    marked sent with a single update as soon as it has been indexed. The unsent
+    entries thus act as the checkpoint: if the run fails, the next one continues
+    from the first chunk which was not marked sent. Entries that are rejected by
+    Elasticsearch are skipped and retried on the next run.
+
+    Returns the number of entries sent.
+    """
+    if es is None:
+        es = _get_elasticsearch_client()
+        if es is None:
+            return None
+
+    sent_count = 0
+    last_id = 0
+    while True:
+        entries = list(
+            AuditLog.objects.filter(sent_at=None, id__gt=last_id)
+            .order_by("id")
+            .values_list("id", "message")[:chunk_size]
         )
-        if rs.get("result") == ES_STATUS_CREATED:
-            entry.sent_at = timezone.now()
-            entry.save()
-    return entries.count()
+        if not entries:
+            break
+        last_id = entries[-1][0]
+        sent_ids = _send_chunk(es, entries)
+        if sent_ids:
+            AuditLog.objects.filter(id__in=sent_ids).update(sent_at=timezone.now())
+        sent_count += len(sent_ids)
+    return sent_count
 
 
 def clear_audit_log_entries(days_to_keep=30):
-    # Only remove entries older than `X` days
-    sent_entries = AuditLog.objects.exclude(sent_at=None).filter(
-        created_at__lte=(timezone.now() - timedelta(days=days_to_keep))
+    """Drop the audit log partitions older than `days_to_keep` days.
+
+    The entries are retained at partition granularity, see `audit_log.partitions`.
+    A partition with unsent entries is kept for `UNSENT_GRACE_PERIOD` longer.
+    """
+    created_before = timezone.now() - timedelta(days=days_to_keep)
+    dropped_count = drop_partitions(
+        created_before, unsent_created_before=created_before - UNSENT_GRACE_PERIOD
     )
-    return sent_entries.delete()
+    deleted_count = delete_legacy_entries(created_before)
+    total_count = dropped_count + deleted_count
+    return total_count, {AuditLog._meta.label: total_count}
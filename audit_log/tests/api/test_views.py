@@ -1,5 +1,9 @@
+import uuid
+from datetime import datetime, timezone
+
 import pytest
 from dateutil import parser
+from django.db.models import F
 from django.urls import reverse
 from rest_framework import status
 
@@ -56,6 +60,9 @@ def test_audit_log_post_writes_audit_log_with_authorized_user(
         "id": data["audit_event"]["target"]["id"],
         "type": data["audit_event"]["target"]["type"],
     }
+    entry = AuditLog.objects.get()
+    assert str(entry.actor_profile_id) == data["audit_event"]["actor"]["profile_id"]
+    assert entry.target_id == data["audit_event"]["target"]["id"]
 
 
 @pytest.mark.django_db
@@ -80,3 +87,99 @@ def test_audit_log_patch_not_allowed(drupal_salesperson_api_client):
 def test_audit_log_delete_not_allowed(drupal_salesperson_api_client):
     response = drupal_salesperson_api_client.delete(reverse("audit_log:auditlog-list"))
     assert response.status_code == status.HTTP_405_METHOD_NOT_ALLOWED
+
+
+def _create_entries(actor_profile_ids, target_id):
+    for i, actor_profile_id in enumerate(actor_profile_ids):
+        message = {
+            "audit_event": {
+                **_common_fields["audit_event"],
+                "date_time_epoch": 1590969600000 + i * 1000,
+                "actor": {"role": "USER", "profile_id": actor_profile_id},
+                "target": {"id": target_id, "type": "Customer"},
+            }
+        }
+        AuditLog.from_message(message).save()
+    # Entries are written right after their events
+    AuditLog.objects.update(created_at=F("event_time"))
+
+
+@pytest.mark.django_db
+def test_audit_log_query(admin_api_client):
+    actor_profile_id = str(uuid.uuid4())
+    other_profile_id = str(uuid.uuid4())
+    _create_entries([actor_profile_id, other_profile_id] * 3, "1")
+    _create_entries([actor_profile_id], "2")
+    url = reverse("audit_log:audit-log-query")
+
+    response = admin_api_client.get(
+        url, {"actor_profile_id": actor_profile_id, "target_id": "1", "limit": 2}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [entry["actor_profile_id"] for entry in response.data] == [
+        actor_profile_id
+    ] * 2
+    assert {entry["target_id"] for entry in response.data} == {"1"}
+    assert response.data[0]["message"]["audit_event"]["target"]["type"] == "Customer"
+
+    response = admin_api_client.get(
+        url,
+        {
+            "actor_profile_id": actor_profile_id,
+            "target_id": "1",
+            "after_id": response["X-Last-Id"],
+        },
+    )
+
+    assert len(response.data) == 1
+    assert parser.isoparse(response.data[0]["event_time"]) == datetime(
+        2020, 6, 1, 0, 0, 4, tzinfo=timezone.utc
+    )
+
+
+@pytest.mark.django_db
+def test_audit_log_query_filters_by_time_and_operation(
+    admin_api_client,
+):
+    _create_entries([str(uuid.uuid4()) for _ in range(3)], "1")
+    url = reverse("audit_log:audit-log-query")
+
+    response = admin_api_client.get(
+        url,
+        {
+            "operation": "READ",
+            "start_time": "2020-06-01T00:00:01Z",
+            "end_time": "2020-06-01T00:00:02Z",
+        },
+    )
+
+    assert len(response.data) == 2
+    assert "X-Last-Id" in response
+    response = admin_api_client.get(url, {"operation": "UPDATE"})
+    assert response.data == []
+    assert "X-Last-Id" not in response
+
+
+@pytest.mark.django_db
+def test_audit_log_query_invalid_parameters(admin_api_client):
+    response = admin_api_client.get(
+        reverse("audit_log:audit-log-query"), {"operation": "JUMP", "limit": 0}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_audit_log_query_not_allowed_for_sales_ui_salesperson(
+    sales_ui_salesperson_api_client,
+):
+    response = sales_ui_salesperson_api_client.get(reverse("audit_log:audit-log-query"))
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+def test_audit_log_query_not_allowed_for_drupal_salesperson(
+    drupal_salesperson_api_client,
+):
+    response = drupal_salesperson_api_client.get(reverse("audit_log:audit-log-query"))
+    assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -2,9 +2,15 @@ from datetime import datetime, timezone
 from typing import Callable
 
 from pytest import fixture
+from rest_framework.test import APIClient
 
+from audit_log.tests.elasticsearch_stub import ElasticsearchStub
 from users.models import Profile, User
-from users.tests.conftest import api_client, drupal_salesperson_api_client  # noqa: F401
+from users.tests.conftest import (  # noqa: F401
+    api_client,
+    drupal_salesperson_api_client,
+    sales_ui_salesperson_api_client,
+)
 from users.tests.factories import ProfileFactory
 
 
@@ -26,3 +32,16 @@ def fixed_datetime() -> Callable[[], datetime]:
 @fixture
 def superuser() -> User:
     return User.objects.create_superuser("admin", "admin@example.com", "admin")
+
+
+@fixture
+def admin_api_client(superuser) -> APIClient:
+    client = APIClient()
+    client.force_authenticate(superuser)
+    return client
+
+
+@fixture
+def elasticsearch_stub() -> ElasticsearchStub:
+    with ElasticsearchStub() as stub:
+        yield stub
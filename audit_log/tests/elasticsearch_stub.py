@@ -0,0 +1,125 @@
+"""
+A minimal Elasticsearch compatible HTTP server for testing the audit log shipping.
+
+Only the product check and the create operations of the bulk API are supported.
+The documents are kept in memory.
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+from elasticsearch import Elasticsearch
+
+ELASTICSEARCH_VERSION = "7.17.0"
+
+
+class ElasticsearchStub:
+    """Serve the stand-in in a background thread.
+
+    `fail_after_requests` makes the bulk requests fail with a server error once
+    that many of them have been served, and `rejected_ids` makes the creation of
+    the documents with the given ids fail.
+    """
+
+    def __init__(self):
+        self.documents: Dict[str, Dict[str, dict]] = {}
+        self.bulk_request_count = 0
+        self.fail_after_requests: Optional[int] = None
+        self.rejected_ids = set()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._get_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def get_client(self) -> Elasticsearch:
+        return Elasticsearch([{"host": "127.0.0.1", "port": self.port}])
+
+    def bulk(self, body: bytes) -> Optional[dict]:
+        with self._lock:
+            self.bulk_request_count += 1
+            if (
+                self.fail_after_requests is not None
+                and self.bulk_request_count > self.fail_after_requests
+            ):
+                return None
+            lines = [json.loads(line) for line in body.splitlines() if line.strip()]
+            items = [
+                self._create(action["create"], document)
+                for action, document in zip(lines[::2], lines[1::2])
+            ]
+        return {
+            "took": 1,
+            "errors": any(item["create"]["status"] >= 300 for item in items),
+            "items": items,
+        }
+
+    def _create(self, action: dict, document: dict) -> dict:
+        index = self.documents.setdefault(action["_index"], {})
+        document_id = str(action["_id"])
+        result = {"_index": action["_index"], "_id": document_id}
+        if document_id in self.rejected_ids:
+            result["status"] = 400
+            result["error"] = {"type": "mapper_parsing_exception"}
+        elif document_id in index:
+            result["status"] = 409
+            result["error"] = {"type": "version_conflict_engine_exception"}
+        else:
+            index[document_id] = document
+            result["status"] = 201
+            result["result"] = "created"
+        return {"create": result}
+
+    def _get_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self._respond(
+                    200,
+                    {
+                        "version": {
+                            "number": ELASTICSEARCH_VERSION,
+                            "build_flavor": "default",
+                        },
+                        "tagline": "You Know, for Search",
+                    },
+                )
+
+            def do_POST(self):
+                if not self.path.split("?")[0].endswith("/_bulk"):
+                    self._respond(404, {"error": "not supported"})
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                response = stub.bulk(self.rfile.read(length))
+                if response is None:
+                    self._respond(500, {"error": "stub failure"})
+                else:
+                    self._respond(200, response)
+
+            do_PUT = do_POST
+
+            def _respond(self, status: int, body: dict):
+                content = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(content)))
+                self.send_header("X-Elastic-Product", "Elasticsearch")
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -1,10 +1,16 @@
 from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from io import StringIO
 from unittest import mock
 
 import pytest
 from django.contrib.auth.models import AnonymousUser
+from django.core.management import call_command
+from django.db import connection, transaction
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
+from elasticsearch import TransportError
 
 from audit_log import audit_logging
 from audit_log.enums import Operation, Status
@@ -125,6 +131,127 @@ def test_log_current_timestamp(profile):
     assert date_before_logging <= logged_date_from_date_time <= date_after_logging
 
 
+@pytest.mark.django_db
+def test_log_many(fixed_datetime, profile, other_profile):
+    audit_logging.log_many(
+        [
+            (profile, Operation.READ, profile),
+            (None, Operation.UPDATE, other_profile),
+        ],
+        get_time=fixed_datetime,
+    )
+    messages = [entry.message for entry in AuditLog.objects.order_by("id")]
+    assert messages == [
+        _common_fields,
+        {
+            **_common_fields,
+            "audit_event": {
+                **_common_fields["audit_event"],
+                "operation": "UPDATE",
+                "actor": {"role": "SYSTEM", "profile_id": None},
+                "target": {"id": str(other_profile.pk), "type": "Profile"},
+            },
+        },
+    ]
+
+
+@pytest.mark.django_db
+def test_buffered_writes_events_with_one_query(profile, other_profile):
+    with CaptureQueriesContext(connection) as context:
+        with audit_logging.buffered():
+            audit_logging.log(profile, Operation.READ, profile)
+            with audit_logging.buffered():
+                audit_logging.log(profile, Operation.READ, other_profile)
+            audit_logging.log_many([(None, Operation.UPDATE, other_profile)])
+            assert AuditLog.objects.count() == 0
+
+    inserts = [q for q in context.captured_queries if q["sql"].startswith("INSERT")]
+    assert len(inserts) == 1
+    assert [
+        entry.message["audit_event"]["target"]["id"]
+        for entry in AuditLog.objects.order_by("id")
+    ] == [str(profile.pk), str(other_profile.pk), str(other_profile.pk)]
+
+
+@pytest.mark.django_db
+def test_buffered_drops_events_of_failed_block(profile, other_profile):
+    with audit_logging.buffered():
+        audit_logging.log(profile, Operation.READ, profile)
+        with pytest.raises(ValueError):
+            with audit_logging.buffered():
+                audit_logging.log(profile, Operation.READ, other_profile)
+                raise ValueError()
+
+    with pytest.raises(ValueError):
+        with audit_logging.buffered():
+            audit_logging.log(profile, Operation.UPDATE, profile)
+            raise ValueError()
+
+    assert [entry.message for entry in AuditLog.objects.all()] == [
+        {
+            **_common_fields,
+            "audit_event": {
+                **_common_fields["audit_event"],
+                "date_time_epoch": mock.ANY,
+                "date_time": mock.ANY,
+            },
+        }
+    ]
+
+
+@pytest.mark.django_db
+def test_buffered_drops_events_of_failed_block_with_savepoints(profile, other_profile):
+    with audit_logging.buffered():
+        audit_logging.log(profile, Operation.READ, profile)
+        with pytest.raises(ValueError):
+            with audit_logging.buffered():
+                audit_logging.log(profile, Operation.READ, other_profile)
+                with transaction.atomic():
+                    audit_logging.log_many([(None, Operation.UPDATE, other_profile)])
+                raise ValueError()
+        with transaction.atomic():
+            audit_logging.log(profile, Operation.UPDATE, profile)
+
+    assert [
+        (entry.operation, entry.target_id) for entry in AuditLog.objects.order_by("id")
+    ] == [("READ", str(profile.pk)), ("UPDATE", str(profile.pk))]
+
+
+@pytest.mark.django_db
+def test_log_fills_queryable_fields(profile, other_profile, fixed_datetime):
+    audit_logging.log(profile, Operation.UPDATE, other_profile, get_time=fixed_datetime)
+    with audit_logging.buffered():
+        audit_logging.log(None, Operation.READ, profile, get_time=fixed_datetime)
+
+    user_entry, system_entry = AuditLog.objects.order_by("id")
+    assert user_entry.actor_profile_id == profile.id
+    assert user_entry.actor_role == "USER"
+    assert user_entry.operation == "UPDATE"
+    assert user_entry.target_type == "Profile"
+    assert user_entry.target_id == str(other_profile.id)
+    assert user_entry.event_time == fixed_datetime()
+    assert system_entry.actor_profile_id is None
+    assert system_entry.actor_role == "SYSTEM"
+    assert system_entry.target_id == str(profile.id)
+
+
+@pytest.mark.django_db
+def test_backfill_audit_log_fields(profile):
+    AuditLog.objects.bulk_create(
+        [AuditLog(message=_common_fields), AuditLog(message={"test": "test"})]
+    )
+
+    call_command("backfill_audit_log_fields", batch_size=1, stdout=StringIO())
+
+    entry = AuditLog.objects.get(operation="READ")
+    assert entry.actor_profile_id == profile.id
+    assert entry.actor_role == "OWNER"
+    assert entry.target_type == "Profile"
+    assert entry.target_id == str(profile.id)
+    assert entry.event_time == datetime(2020, 6, 1, tzinfo=dt_timezone.utc)
+    assert AuditLog.objects.filter(event_time=None).count() == 1
+
+
 @pytest.mark.django_db
 @override_settings(
     ENABLE_SEND_AUDIT_LOG=True,
@@ -144,8 +271,8 @@ def test_send_audit_log_missing_configuration(profile, fixed_datetime):
 
 
 @pytest.mark.parametrize(
-    "result_value, expected_status",
-    [("created", True), ("failed", False)],  # Log sent successfully
+    "rejected, expected_status",
+    [(False, True), (True, False)],  # Log sent successfully
 )
 @pytest.mark.django_db
 @override_settings(
@@ -155,7 +282,9 @@ def test_send_audit_log_missing_configuration(profile, fixed_datetime):
     AUDIT_LOG_ELASTICSEARCH_PASSWORD="e_password",
     ENABLE_SEND_AUDIT_LOG=True,
 )
-def test_send_audit_log_success(profile, fixed_datetime, result_value, expected_status):
+def test_send_audit_log_success(
+    profile, fixed_datetime, elasticsearch_stub, rejected, expected_status
+):
     audit_logging.log(
         profile,
         Operation.READ,
@@ -163,12 +292,91 @@ def test_send_audit_log_success(profile, fixed_datetime, result_value, expected_
         get_time=fixed_datetime,
     )
     assert AuditLog.objects.count() == 1
-    assert AuditLog.objects.first().sent_at is None
+    entry = AuditLog.objects.first()
+    assert entry.sent_at is None
+    if rejected:
+        elasticsearch_stub.rejected_ids.add(str(entry.id))
+
+    with mock.patch(
+        "audit_log.tasks.Elasticsearch", return_value=elasticsearch_stub.get_client()
+    ):
+        sent_count = send_audit_log_to_elastic_search()
+
+    assert sent_count == int(expected_status)
+    assert (AuditLog.objects.first().sent_at is not None) == expected_status
+    if expected_status:
+        document = elasticsearch_stub.documents["apartment_application_audit_log"][
+            str(entry.id)
+        ]
+        assert (
+            document["@timestamp"] == _common_fields["audit_event"]["date_time_epoch"]
+        )
+
+
+def _log_entries(profile, count):
+    with audit_logging.buffered():
+        for _ in range(count):
+            audit_logging.log(profile, Operation.READ, profile)
+
+
+@pytest.mark.django_db
+def test_send_audit_log_in_chunks(profile, elasticsearch_stub):
+    _log_entries(profile, 25)
+
+    with CaptureQueriesContext(connection) as context:
+        sent_count = send_audit_log_to_elastic_search(
+            elasticsearch_stub.get_client(), chunk_size=10
+        )
+
+    assert sent_count == 25
+    assert not AuditLog.objects.filter(sent_at=None).exists()
+    assert elasticsearch_stub.bulk_request_count == 3
+    updates = [q for q in context.captured_queries if q["sql"].startswith("UPDATE")]
+    assert len(updates) == 3
+
+
+@pytest.mark.django_db
+def test_send_audit_log_resumes_after_failure(profile, elasticsearch_stub):
+    _log_entries(profile, 25)
+    es = elasticsearch_stub.get_client()
+    elasticsearch_stub.fail_after_requests = 2
+
+    with pytest.raises(TransportError):
+        send_audit_log_to_elastic_search(es, chunk_size=10)
+    assert AuditLog.objects.filter(sent_at=None).count() == 5
+
+    elasticsearch_stub.fail_after_requests = None
+    assert send_audit_log_to_elastic_search(es, chunk_size=10) == 5
+    assert not AuditLog.objects.filter(sent_at=None).exists()
+    assert len(elasticsearch_stub.documents["apartment_application_audit_log"]) == 25
+
+
+@pytest.mark.django_db
+def test_send_audit_log_already_indexed_entries_are_marked_sent(
+    profile, elasticsearch_stub
+):
+    _log_entries(profile, 5)
+    es = elasticsearch_stub.get_client()
+    send_audit_log_to_elastic_search(es)
+    # The previous run indexed the entries but failed to mark them sent
+    AuditLog.objects.update(sent_at=None)
+
+    assert send_audit_log_to_elastic_search(es) == 5
+    assert not AuditLog.objects.filter(sent_at=None).exists()
+
+
+@pytest.mark.django_db
+def test_send_audit_log_skips_rejected_entries(profile, elasticsearch_stub):
+    _log_entries(profile, 5)
+    rejected_entry = AuditLog.objects.order_by("id")[2]
+    elasticsearch_stub.rejected_ids.add(str(rejected_entry.id))
+
+    sent_count = send_audit_log_to_elastic_search(
+        elasticsearch_stub.get_client(), chunk_size=2
+    )
 
-    with mock.patch("elasticsearch.Elasticsearch.index") as elasticsearch_index_mock:
-        elasticsearch_index_mock.return_value = {"result": result_value}
-        send_audit_log_to_elastic_search()
-        assert (AuditLog.objects.first().sent_at is not None) == expected_status
+    assert sent_count == 4
+    assert list(AuditLog.objects.filter(sent_at=None)) == [rejected_entry]
 
 
 @pytest.mark.django_db
@@ -0,0 +1,42 @@
+import time
+import uuid
+
+from pytest import mark
+
+from audit_log import audit_logging
+from audit_log.enums import Operation
+from audit_log.models import AuditLog
+from users.models import Profile
+
+OBJECT_COUNT = 1000
+
+
+def _log_bulk_operation(targets):
+    for target in targets:
+        audit_logging.log(None, Operation.UPDATE, target)
+
+
+@mark.benchmark
+@mark.django_db
+def test_benchmark_buffered_audit_logging(capsys):
+    targets = [Profile(id=uuid.uuid4()) for _ in range(OBJECT_COUNT)]
+
+    start = time.perf_counter()
+    _log_bulk_operation(targets)
+    per_event_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with audit_logging.buffered():
+        _log_bulk_operation(targets)
+    buffered_elapsed = time.perf_counter() - start
+
+    assert AuditLog.objects.count() == 2 * OBJECT_COUNT
+    with capsys.disabled():
+        for name, elapsed in [
+            ("per-event", per_event_elapsed),
+            ("buffered", buffered_elapsed),
+        ]:
+            print(
+                f"\n{OBJECT_COUNT} objects, {name} audit logging: "
+                f"{OBJECT_COUNT / elapsed:.0f} events/s"
+            )
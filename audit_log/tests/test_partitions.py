@@ -0,0 +1,124 @@
+from datetime import timedelta
+
+from django.utils import timezone
+from pytest import mark
+
+from audit_log import audit_logging
+from audit_log.enums import Operation
+from audit_log.models import AuditLog
+from audit_log.partitions import (
+    create_partitions,
+    delete_legacy_entries,
+    drop_partitions,
+    get_partitions,
+)
+
+LEGACY_PARTITION = "audit_log_auditlog_legacy"
+
+
+def _get_legacy_upper_bound():
+    return next(p.upper_bound for p in get_partitions() if p.name == LEGACY_PARTITION)
+
+
+@mark.django_db
+def test_create_partitions():
+    partitions = {p.name: p.upper_bound for p in get_partitions()}
+    assert partitions[LEGACY_PARTITION] is not None
+    assert partitions["audit_log_auditlog_default"] is None
+
+    created = create_partitions(months_ahead=12)
+
+    upper_bounds = [p.upper_bound for p in get_partitions() if p.name in created]
+    assert created
+    assert max(upper_bounds) > timezone.now() + timedelta(days=365)
+    assert min(upper_bounds) > max(b for b in partitions.values() if b)
+    assert create_partitions(months_ahead=12) == []
+
+
+@mark.django_db
+def test_entries_are_stored_in_monthly_partitions(profile):
+    create_partitions(months_ahead=2)
+    audit_logging.log(profile, Operation.READ, profile)
+    entry = AuditLog.objects.get()
+    next_month = _get_legacy_upper_bound() + timedelta(days=1)
+
+    AuditLog.objects.filter(id=entry.id).update(created_at=next_month)
+
+    entry.refresh_from_db()
+    assert entry.created_at == next_month
+    partition = f"audit_log_auditlog_p{next_month:%Y_%m}"
+    assert AuditLog.objects.raw(f"SELECT * FROM {partition}")[0] == entry
+
+
+@mark.django_db
+def test_create_partitions_moves_entries_from_default_partition(profile):
+    create_partitions(months_ahead=2)
+    audit_logging.log(profile, Operation.READ, profile)
+    entry = AuditLog.objects.get()
+    latest_upper_bound = max(p.upper_bound for p in get_partitions() if p.upper_bound)
+    later_month = latest_upper_bound + timedelta(days=40)
+    AuditLog.objects.filter(id=entry.id).update(created_at=later_month)
+    assert AuditLog.objects.raw("SELECT * FROM audit_log_auditlog_default")[0] == entry
+
+    created = create_partitions(months_ahead=12)
+
+    partition = f"audit_log_auditlog_p{later_month:%Y_%m}"
+    assert partition in created
+    assert AuditLog.objects.raw(f"SELECT * FROM {partition}")[0] == entry
+    assert not list(AuditLog.objects.raw("SELECT * FROM audit_log_auditlog_default"))
+    entry.refresh_from_db()
+    assert entry.created_at == later_month
+
+
+@mark.parametrize("sent, expected_count", [(True, 1), (False, 0)])
+@mark.django_db
+def test_drop_partitions(profile, sent, expected_count):
+    audit_logging.log(profile, Operation.READ, profile)
+    audit_logging.log(profile, Operation.READ, profile)
+    AuditLog.objects.update(sent_at=timezone.now())
+    newer_entry = AuditLog.objects.order_by("id").last()
+    AuditLog.objects.filter(id=newer_entry.id).update(
+        created_at=_get_legacy_upper_bound() + timedelta(days=1),
+        sent_at=None,
+    )
+    if not sent:
+        AuditLog.objects.exclude(id=newer_entry.id).update(sent_at=None)
+
+    assert drop_partitions(_get_legacy_upper_bound()) == expected_count
+
+    assert (LEGACY_PARTITION in {p.name for p in get_partitions()}) != sent
+    assert AuditLog.objects.count() == 2 - expected_count
+    assert AuditLog.objects.filter(id=newer_entry.id).exists()
+
+
+@mark.django_db
+def test_drop_partitions_with_unsent_entries_after_grace_period(profile):
+    audit_logging.log(profile, Operation.READ, profile)
+    legacy_upper_bound = _get_legacy_upper_bound()
+
+    assert drop_partitions(legacy_upper_bound, legacy_upper_bound) == 1
+
+    assert LEGACY_PARTITION not in {p.name for p in get_partitions()}
+    assert not AuditLog.objects.exists()
+
+
+@mark.django_db
+def test_delete_legacy_entries(profile):
+    create_partitions(months_ahead=2)
+    for _ in range(4):
+        audit_logging.log(profile, Operation.READ, profile)
+    unsent_entry, *sent_entries, monthly_entry = AuditLog.objects.order_by("id")
+    AuditLog.objects.exclude(id=unsent_entry.id).update(sent_at=timezone.now())
+    AuditLog.objects.filter(id=monthly_entry.id).update(
+        created_at=_get_legacy_upper_bound() + timedelta(days=1)
+    )
+    created_before = timezone.now() + timedelta(days=365)
+
+    assert delete_legacy_entries(created_before, batch_size=1, max_batches=1) == 1
+    assert delete_legacy_entries(created_before, batch_size=1) == 1
+    assert delete_legacy_entries(created_before) == 0
+
+    assert set(AuditLog.objects.values_list("id", flat=True)) == {
+        unsent_entry.id,
+        monthly_entry.id,
+    }
@@ -0,0 +1,42 @@
+import time
+import uuid
+
+from pytest import mark
+
+from audit_log.models import AuditLog
+from audit_log.tasks import send_audit_log_to_elastic_search
+
+ENTRY_COUNT = 10000
+
+
+def _message(index):
+    return {
+        "audit_event": {
+            "origin": "APARTMENT_APPLICATION_SERVICE",
+            "status": "SUCCESS",
+            "date_time_epoch": 1590969600000 + index,
+            "actor": {"role": "SYSTEM", "profile_id": None},
+            "operation": "UPDATE",
+            "target": {"id": str(uuid.uuid4()), "type": "Profile"},
+        }
+    }
+
+
+@mark.benchmark
+@mark.django_db
+def test_benchmark_send_audit_log(elasticsearch_stub, capsys):
+    AuditLog.objects.bulk_create(
+        AuditLog(message=_message(i)) for i in range(ENTRY_COUNT)
+    )
+
+    start = time.perf_counter()
+    sent_count = send_audit_log_to_elastic_search(elasticsearch_stub.get_client())
+    elapsed = time.perf_counter() - start
+
+    assert sent_count == ENTRY_COUNT
+    with capsys.disabled():
+        print(
+            f"\n{ENTRY_COUNT} audit log entries sent to ES: "
+            f"{ENTRY_COUNT / elapsed:.0f} entries/s, "
+            f"{elasticsearch_stub.bulk_request_count} bulk requests"
+        )
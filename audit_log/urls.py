@@ -1,11 +1,12 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from audit_log.api.views import AuditLogViewSet
+from audit_log.api.views import AuditLogQueryAPIView, AuditLogViewSet
 
 router = DefaultRouter()
 router.register(r"auditlogs", AuditLogViewSet)
 
 urlpatterns = [
+    path("sales/auditlogs/", AuditLogQueryAPIView.as_view(), name="audit-log-query"),
     path("", include(router.urls)),
 ]
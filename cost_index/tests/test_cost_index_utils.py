@@ -1,3 +1,4 @@
+import uuid
 from datetime import date, timedelta
 from decimal import Decimal
 
@@ -10,7 +11,13 @@ from application_form.enums import ApartmentReservationState
 from application_form.tests.factories import ApartmentReservationFactory
 from cost_index.models import CostIndex
 from cost_index.tests.factories import ApartmentRevaluationFactory
-from cost_index.utils import calculate_end_value
+from cost_index.utils import (
+    calculate_end_value,
+    reservation_right_of_occupancy_payment,
+    reservation_right_of_occupancy_payments,
+)
+from invoicing.enums import InstallmentType
+from invoicing.tests.factories import ApartmentInstallmentFactory
 
 
 @mark.django_db
@@ -74,3 +81,58 @@ def test_apartment_revaluation_effect_on_apartment_document(
     assert (
         haso_0.right_of_occupancy_payment != haso_0.current_right_of_occupancy_payment
     )
+
+
+@pytest.mark.django_db
+def test_reservation_right_of_occupancy_payments():
+    apartment_uuid = uuid.uuid4()
+    other_apartment_uuid = uuid.uuid4()
+    original_payments = {str(apartment_uuid): 1000, str(other_apartment_uuid): 2000}
+    revaluated_reservation = ApartmentReservationFactory(
+        apartment_uuid=apartment_uuid,
+        list_position=1,
+        state=ApartmentReservationState.CANCELED,
+    )
+    ApartmentRevaluationFactory(
+        apartment_reservation=revaluated_reservation,
+        start_date=date(2022, 1, 1),
+        end_date=date(2023, 1, 1),
+        start_right_of_occupancy_payment=Decimal("100.00"),
+        start_cost_index_value=Decimal("100.00"),
+        end_cost_index_value=Decimal("110.00"),
+        end_right_of_occupancy_payment=Decimal("110.00"),
+        alteration_work=Decimal("5.00"),
+    )
+    earlier_reservation = ApartmentReservationFactory(
+        apartment_uuid=apartment_uuid, list_position=2
+    )
+    ApartmentInstallmentFactory(
+        apartment_reservation=earlier_reservation,
+        type=InstallmentType.PAYMENT_1,
+        due_date=date(2022, 6, 1),
+    )
+    later_reservation = ApartmentReservationFactory(
+        apartment_uuid=apartment_uuid, list_position=3
+    )
+    other_reservation = ApartmentReservationFactory(apartment_uuid=other_apartment_uuid)
+    reservations = [
+        revaluated_reservation,
+        earlier_reservation,
+        later_reservation,
+        other_reservation,
+    ]
+
+    payments = reservation_right_of_occupancy_payments(reservations, original_payments)
+
+    assert payments == {
+        revaluated_reservation.id: 10000,
+        earlier_reservation.id: 1000,
+        later_reservation.id: 11500,
+        other_reservation.id: 2000,
+    }
+    for reservation in reservations:
+        assert payments[reservation.id] == reservation_right_of_occupancy_payment(
+            reservation.id,
+            reservation.apartment_uuid,
+            original_payments[str(reservation.apartment_uuid)],
+        )
@@ -1,7 +1,12 @@
 import math
+from collections import defaultdict
 from datetime import date
 from decimal import Decimal
+from typing import Dict, Iterable
 
+from django.db.models import F
+
+from application_form.models import ApartmentReservation
 from cost_index.models import ApartmentRevaluation, CostIndex
 from invoicing.enums import InstallmentType
 from invoicing.models import ApartmentInstallment
@@ -48,13 +53,16 @@ def current_right_of_occupancy_payment(
 
     revaluation = revaluation_qs.first()
     if revaluation:
-        return int(
-            (revaluation.end_right_of_occupancy_payment + revaluation.alteration_work)
-            * 100
-        )
+        return _get_revaluated_right_of_occupancy_payment(revaluation)
     return original_right_of_occupancy_payment
 
 
+def _get_revaluated_right_of_occupancy_payment(revaluation: ApartmentRevaluation):
+    return int(
+        (revaluation.end_right_of_occupancy_payment + revaluation.alteration_work) * 100
+    )
+
+
 def reservation_right_of_occupancy_payment(
     reservation_id,
     apartment_uuid,
@@ -91,3 +99,62 @@ def reservation_right_of_occupancy_payment(
         return current_right_of_occupancy_payment(
             apartment_uuid, original_right_of_occupancy_payment
         )
+
+
+def reservation_right_of_occupancy_payments(
+    reservations: Iterable[ApartmentReservation],
+    original_right_of_occupancy_payments: Dict[str, int],
+) -> Dict[int, int]:
+    """
+    Bulk version of `reservation_right_of_occupancy_payment`, which calculates the
+    payments of all the given reservations with three queries.
+
+    `original_right_of_occupancy_payments` maps the apartment uuids of the
+    reservations, as strings, to the original right of occupancy payments of the
+    apartments. Returns the payments in cents keyed by reservation id.
+    """
+    reservations = list(reservations)
+    reservation_ids = [reservation.id for reservation in reservations]
+    reservation_revaluation_payments = dict(
+        ApartmentRevaluation.objects.filter(
+            apartment_reservation_id__in=reservation_ids
+        ).values_list("apartment_reservation_id", "start_right_of_occupancy_payment")
+    )
+    payment1_due_dates = dict(
+        ApartmentInstallment.objects.filter(
+            apartment_reservation_id__in=reservation_ids,
+            type=InstallmentType.PAYMENT_1,
+        ).values_list("apartment_reservation_id", "due_date")
+    )
+    apartment_revaluations = defaultdict(list)
+    for revaluation in (
+        ApartmentRevaluation.objects.filter(
+            apartment_reservation__apartment_uuid__in={
+                reservation.apartment_uuid for reservation in reservations
+            }
+        )
+        .annotate(apartment_uuid=F("apartment_reservation__apartment_uuid"))
+        .order_by("-end_date")
+    ):
+        apartment_revaluations[str(revaluation.apartment_uuid)].append(revaluation)
+
+    payments = {}
+    for reservation in reservations:
+        if reservation.id in reservation_revaluation_payments:
+            payments[reservation.id] = int(
+                reservation_revaluation_payments[reservation.id] * 100
+            )
+            continue
+        apartment_uuid = str(reservation.apartment_uuid)
+        revaluations = apartment_revaluations[apartment_uuid]
+        if not_after := payment1_due_dates.get(reservation.id):
+            revaluations = [r for r in revaluations if r.end_date <= not_after]
+        if revaluations:
+            payments[reservation.id] = _get_revaluated_right_of_occupancy_payment(
+                revaluations[0]
+            )
+        else:
+            payments[reservation.id] = original_right_of_occupancy_payments.get(
+                apartment_uuid
+            )
+    return payments
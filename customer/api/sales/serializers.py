@@ -1,20 +1,27 @@
 from uuid import UUID
 
 from django.db import transaction
+from django.db.models import Prefetch
 from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 
-from apartment.elastic.queries import get_apartment
+from apartment.elastic.queries import get_apartment, get_apartments_by_uuids
 from apartment_application_service.utils import update_obj
 from application_form.api.serializers import (
     ApartmentReservationSerializerBase,
     ApartmentReservationStateChangeEventSerializer,
 )
 from application_form.enums import ApartmentReservationState
-from application_form.models import ApartmentReservation, LotteryEvent
+from application_form.models import (
+    ApartmentReservation,
+    ApartmentReservationStateChangeEvent,
+    LotteryEvent,
+)
 from application_form.utils import get_apartment_number_sort_tuple
+from cost_index.utils import reservation_right_of_occupancy_payments
 from customer.models import Customer
 from invoicing.api.serializers import ApartmentInstallmentSerializer
+from invoicing.models import Payment
 from users.api.sales.serializers import ProfileSerializer
 from users.models import Profile
 
@@ -57,9 +64,13 @@ class CustomerApartmentReservationSerializer(ApartmentReservationSerializerBase)
         ) + ApartmentReservationSerializerBase.Meta.fields
 
     def to_representation(self, instance):
-        self.context["apartment"] = get_apartment(
-            instance.apartment_uuid, include_project_fields=True
-        )
+        # The apartments can be fetched beforehand in bulk to the context
+        apartment = self.context.get("apartments", {}).get(str(instance.apartment_uuid))
+        if apartment is None:
+            apartment = get_apartment(
+                instance.apartment_uuid, include_project_fields=True
+            )
+        self.context["apartment"] = apartment
         self.context["reservation_id"] = instance.id
         return super().to_representation(instance)
 
@@ -94,11 +105,19 @@ class CustomerApartmentReservationSerializer(ApartmentReservationSerializerBase)
         return self.context["apartment"].debt_free_sales_price
 
     def get_apartment_right_of_occupancy_payment(self, obj) -> int:
+        # The payments can be calculated beforehand in bulk to the context
+        payments = self.context.get("right_of_occupancy_payments", {})
+        if obj.id in payments:
+            return payments[obj.id]
         return self.context["apartment"].reservation_right_of_occupancy_payment(
             self.context["reservation_id"]
         )
 
     def get_project_lottery_completed(self, obj) -> bool:
+        # The apartments with a lottery can be fetched beforehand to the context
+        lottery_apartment_uuids = self.context.get("lottery_apartment_uuids")
+        if lottery_apartment_uuids is not None:
+            return str(obj.apartment_uuid) in lottery_apartment_uuids
         lottery_completed = LotteryEvent.objects.filter(
             apartment_uuid=obj.apartment_uuid
         ).exists()
@@ -130,9 +149,50 @@ class CustomerSerializer(serializers.ModelSerializer):
 
     @extend_schema_field(CustomerApartmentReservationSerializer(many=True))
     def get_apartment_reservations(self, obj):
-        reservations = ApartmentReservation.objects.filter(customer=obj)
+        state_change_events = ApartmentReservationStateChangeEvent.objects.all()
+        reservations = list(
+            ApartmentReservation.objects.filter(customer=obj)
+            .select_related("offer", "application_apartment__lotteryeventresult")
+            .prefetch_related(
+                "apartment_installments",
+                # only the fields of PaymentSerializer are needed
+                Prefetch(
+                    "apartment_installments__payments",
+                    queryset=Payment.objects.only(
+                        "apartment_installment_id", "amount", "payment_date"
+                    ),
+                ),
+                Prefetch(
+                    "state_change_events",
+                    queryset=state_change_events.select_related("user__profile"),
+                ),
+            )
+        )
+        apartment_uuids = {reservation.apartment_uuid for reservation in reservations}
+        apartments = get_apartments_by_uuids(
+            apartment_uuids, include_project_fields=True
+        )
+        lottery_apartment_uuids = {
+            str(apartment_uuid)
+            for apartment_uuid in LotteryEvent.objects.filter(
+                apartment_uuid__in=apartment_uuids
+            ).values_list("apartment_uuid", flat=True)
+        }
+        right_of_occupancy_payments = reservation_right_of_occupancy_payments(
+            reservations,
+            {
+                apartment_uuid: apartment.right_of_occupancy_payment
+                for apartment_uuid, apartment in apartments.items()
+            },
+        )
         serialized_reservations = CustomerApartmentReservationSerializer(
-            reservations, many=True
+            reservations,
+            many=True,
+            context={
+                "apartments": apartments,
+                "lottery_apartment_uuids": lottery_apartment_uuids,
+                "right_of_occupancy_payments": right_of_occupancy_payments,
+            },
         ).data
 
         # sort reservations by
@@ -3,6 +3,7 @@ from django.db.models import Q
 from audit_log.viewsets import AuditLoggingModelViewSet
 from customer.api.sales.serializers import CustomerListSerializer, CustomerSerializer
 from customer.models import Customer
+from users.search import get_matching_profile_ids, NGRAM_LENGTH
 
 
 class CustomerViewSet(AuditLoggingModelViewSet):
@@ -33,25 +34,26 @@ class CustomerViewSet(AuditLoggingModelViewSet):
                 "secondary_profile__last_name",
                 "secondary_profile__first_name",
             )
-            if first_name:
+            search_values = {
+                "first_name": first_name,
+                "last_name": last_name,
+                "phone_number": phone_number,
+                "email": email,
+            }
+            for field_name, value in search_values.items():
+                if not value:
+                    continue
+                # Narrow the customers down with the search index first, so that
+                # only the profiles of the candidates need to be decrypted
+                if len(value) >= NGRAM_LENGTH:
+                    profile_ids = get_matching_profile_ids(field_name, value)
+                    queryset = queryset.filter(
+                        Q(primary_profile__in=profile_ids)
+                        | Q(secondary_profile__in=profile_ids)
+                    )
                 queryset = queryset.filter(
-                    Q(primary_profile__first_name__icontains=first_name)
-                    | Q(secondary_profile__first_name__icontains=first_name)
-                )
-            if last_name:
-                queryset = queryset.filter(
-                    Q(primary_profile__last_name__icontains=last_name)
-                    | Q(secondary_profile__last_name__icontains=last_name)
-                )
-            if phone_number:
-                queryset = queryset.filter(
-                    Q(primary_profile__phone_number__icontains=phone_number)
-                    | Q(secondary_profile__phone_number__icontains=phone_number)
-                )
-            if email:
-                queryset = queryset.filter(
-                    Q(primary_profile__email__icontains=email)
-                    | Q(secondary_profile__email__icontains=email)
+                    Q(**{f"primary_profile__{field_name}__icontains": value})
+                    | Q(**{f"secondary_profile__{field_name}__icontains": value})
                 )
             return queryset
         return super().get_queryset()
@@ -2,10 +2,14 @@
 Test cases for customer api of sales.
 """
 import uuid
+from unittest.mock import patch
 
 import pytest
 from django.contrib.auth.models import Group
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from elasticsearch import Elasticsearch
 from rest_framework import status
 
 from apartment.tests.factories import ApartmentDocumentFactory
@@ -14,12 +18,16 @@ from application_form.enums import (
     ApartmentReservationState,
 )
 from application_form.models import LotteryEvent
-from application_form.tests.factories import ApartmentReservationFactory
+from application_form.tests.factories import (
+    ApartmentReservationFactory,
+    LotteryEventFactory,
+)
 from customer.api.sales.views import CustomerViewSet
 from customer.models import Customer
 from customer.tests.factories import CustomerFactory
 from customer.tests.utils import assert_customer_list_match_data
-from invoicing.tests.factories import ApartmentInstallmentFactory
+from invoicing.enums import InstallmentType
+from invoicing.tests.factories import ApartmentInstallmentFactory, PaymentFactory
 from users.enums import Roles
 from users.models import Profile
 from users.tests.factories import ProfileFactory, UserFactory
@@ -136,6 +144,47 @@ def test_get_customer_api_detail(sales_ui_salesperson_api_client):
     ]
 
 
+def _create_reservations(customer, apartments):
+    for apartment in apartments:
+        reservation = ApartmentReservationFactory(
+            customer=customer,
+            apartment_uuid=apartment.uuid,
+            application_apartment__apartment_uuid=apartment.uuid,
+            queue_position=1,
+        )
+        PaymentFactory(
+            apartment_installment=ApartmentInstallmentFactory(
+                apartment_reservation=reservation, type=InstallmentType.PAYMENT_1
+            )
+        )
+        LotteryEventFactory(apartment_uuid=apartment.uuid)
+
+
+@pytest.mark.django_db
+def test_get_customer_api_detail_query_count_does_not_depend_on_reservations(
+    sales_ui_salesperson_api_client,
+):
+    apartments = [ApartmentDocumentFactory() for _ in range(4)]
+    counts = []
+    for reservation_count in [1, 4]:
+        customer = CustomerFactory()
+        _create_reservations(customer, apartments[:reservation_count])
+        with patch.object(
+            Elasticsearch, "search", autospec=True, side_effect=Elasticsearch.search
+        ) as search, CaptureQueriesContext(connection) as context:
+            response = sales_ui_salesperson_api_client.get(
+                reverse("customer:sales-customer-detail", args=(customer.pk,)),
+            )
+        assert len(response.data["apartment_reservations"]) == reservation_count
+        for reservation in response.data["apartment_reservations"]:
+            assert reservation["project_lottery_completed"] is True
+            assert len(reservation["apartment_installments"][0]["payments"]) == 1
+        counts.append((len(context.captured_queries), search.call_count))
+
+    assert counts[0] == counts[1]
+    assert counts[0][1] == 1
+
+
 @pytest.mark.django_db
 def test_customer_detail_state_event_cancellation_reason(
     sales_ui_salesperson_api_client,
@@ -423,6 +472,28 @@ def test_get_customer_api_list_with_parameters(sales_ui_salesperson_api_client):
         assert_customer_list_match_data(customers[item["id"]], item)
 
 
+@pytest.mark.django_db
+def test_get_customer_api_list_search_checks_index_matches(
+    sales_ui_salesperson_api_client,
+):
+    customer = CustomerFactory(
+        primary_profile__last_name="Baab", primary_profile__phone_number="040 123"
+    )
+    CustomerFactory(primary_profile__last_name="Abba")
+
+    # "Baab" has all the n-grams of "aba" but does not contain it
+    response = sales_ui_salesperson_api_client.get(
+        reverse("customer:sales-customer-list"), data={"last_name": "aba"}
+    )
+    assert response.data == []
+
+    response = sales_ui_salesperson_api_client.get(
+        reverse("customer:sales-customer-list"),
+        data={"last_name": "AAB", "phone_number": "0"},
+    )
+    assert [item["id"] for item in response.data] == [customer.id]
+
+
 @pytest.mark.django_db
 def test_customer_reservation_ordering(sales_ui_salesperson_api_client):
     project_uuid = uuid.uuid4()
@@ -0,0 +1,65 @@
+import time
+
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from pytest import fixture, mark
+
+from customer.models import Customer
+from users.models import Profile
+from users.search import rebuild_search_index
+from users.tests.factories import ProfileFactory
+
+PROFILE_COUNT = 100000
+BATCH_SIZE = 5000
+
+
+@fixture
+def customers():
+    for _ in range(PROFILE_COUNT // BATCH_SIZE):
+        profiles = Profile.objects.bulk_create(
+            ProfileFactory.build_batch(BATCH_SIZE, user=None)
+        )
+        Customer.objects.bulk_create(
+            Customer(primary_profile=profile) for profile in profiles
+        )
+    rebuild_search_index()
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+def _search_by_decrypting(last_name):
+    return list(
+        Customer.objects.filter(
+            Q(primary_profile__last_name__icontains=last_name)
+            | Q(secondary_profile__last_name__icontains=last_name)
+        ).values_list("id", flat=True)
+    )
+
+
+@mark.benchmark
+@mark.django_db
+def test_benchmark_customer_search(customers, sales_ui_salesperson_api_client, capsys):
+    last_name = Profile.objects.order_by("?").first().last_name[:4]
+
+    start = time.perf_counter()
+    expected_ids = _search_by_decrypting(last_name)
+    decrypting_elapsed = time.perf_counter() - start
+
+    with CaptureQueriesContext(connection) as context:
+        start = time.perf_counter()
+        response = sales_ui_salesperson_api_client.get(
+            reverse("customer:sales-customer-list"), data={"last_name": last_name}
+        )
+        indexed_elapsed = time.perf_counter() - start
+
+    assert sorted(item["id"] for item in response.data) == sorted(expected_ids)
+    with capsys.disabled():
+        print(
+            f"\nCustomer search of {PROFILE_COUNT} profiles for {last_name!r}, "
+            f"{len(expected_ids)} matches: "
+            f"decrypting {decrypting_elapsed:.2f} s, "
+            f"search index {indexed_elapsed:.2f} s "
+            f"({len(context.captured_queries)} SQL queries)"
+        )
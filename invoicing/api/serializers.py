@@ -1,7 +1,6 @@
 from decimal import Decimal
 from typing import Union
 
-from django.db import transaction
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from drf_spectacular.utils import extend_schema_serializer, OpenApiExample
@@ -60,7 +59,7 @@ class IntegerCentsField(serializers.IntegerField):
 
 
 class InstallmentListSerializer(serializers.ListSerializer):
-    @transaction.atomic
+    @audit_logging.buffered()
     def create(self, validated_data):
         now = timezone.now()
         old_installments_by_type = {
@@ -349,3 +348,59 @@ class ApartmentInstallmentSerializer(ApartmentInstallmentSerializerBase):
         if not is_installment_editable(instance):
             return instance
         return super().update(instance, validated_data)
+
+
+class ReceivablesQuerySerializer(serializers.Serializer):
+    overdue = serializers.BooleanField(
+        default=False, help_text=_("Include only overdue installments.")
+    )
+    status = EnumField(
+        PaymentStatus,
+        required=False,
+        help_text=_("Include only installments with the given payment status."),
+    )
+
+
+class ReceivableSerializer(EnumSupportSerializerMixin, serializers.ModelSerializer):
+    """An apartment installment annotated with `with_payment_state()`."""
+
+    apartment_uuid = serializers.UUIDField(
+        source="apartment_reservation.apartment_uuid"
+    )
+    amount = IntegerCentsField(source="value")
+    paid_amount = IntegerCentsField()
+    outstanding_amount = IntegerCentsField()
+    status = serializers.CharField(source="payment_state")
+    is_overdue = serializers.BooleanField(source="is_overdue_now")
+
+    class Meta:
+        model = ApartmentInstallment
+        fields = (
+            "id",
+            "apartment_uuid",
+            "apartment_reservation_id",
+            "type",
+            "invoice_number",
+            "reference_number",
+            "amount",
+            "paid_amount",
+            "outstanding_amount",
+            "due_date",
+            "last_payment_date",
+            "status",
+            "is_overdue",
+        )
+        read_only_fields = fields
+
+
+class ReceivablesTotalsSerializer(serializers.Serializer):
+    installment_count = serializers.IntegerField()
+    overdue_count = serializers.IntegerField()
+    amount = IntegerCentsField()
+    paid_amount = IntegerCentsField()
+    outstanding_amount = IntegerCentsField()
+
+
+class ReceivablesReportSerializer(serializers.Serializer):
+    totals = ReceivablesTotalsSerializer()
+    installments = ReceivableSerializer(many=True)
@@ -1,14 +1,18 @@
-from django.db import transaction
+from decimal import Decimal
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Count, Q, Sum, Value
+from django.db.models.functions import Coalesce
 from django.http import Http404, HttpResponse
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from rest_framework import generics
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from apartment.elastic.queries import get_apartment
+from apartment.elastic.queries import get_apartment, get_apartment_uuids, get_project
 from application_form.models import ApartmentReservation
 from audit_log import audit_logging
 from audit_log.enums import Operation
@@ -16,6 +20,8 @@ from audit_log.enums import Operation
 from ..api.serializers import (
     ApartmentInstallmentSerializer,
     ProjectInstallmentTemplateSerializer,
+    ReceivablesQuerySerializer,
+    ReceivablesReportSerializer,
 )
 from ..enums import InstallmentType
 from ..models import (
@@ -131,7 +137,7 @@ class ApartmentInstallmentAddToSapAPIView(APIView):
         if not installments.exists():
             raise Http404
 
-        with transaction.atomic():
+        with audit_logging.buffered():
             for installment in installments:
                 try:
                     installment.add_to_be_sent_to_sap()
@@ -145,3 +151,51 @@ class ApartmentInstallmentAddToSapAPIView(APIView):
             reservation.apartment_installments.order_by("id"), many=True
         )
         return Response(seri.data)
+
+
+@extend_schema(
+    description="Receivables report of the apartment installments of a project.",
+    parameters=[ReceivablesQuerySerializer],
+    responses={200: ReceivablesReportSerializer},
+)
+class ProjectReceivablesAPIView(APIView):
+    """
+    Returns the apartment installments of the project with their payment totals.
+
+    The installments can be filtered with `overdue=true` and with `status`, which
+    is one of the payment statuses. The totals are calculated over the filtered
+    installments.
+    """
+
+    def get(self, request, project_uuid):
+        query = ReceivablesQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        try:
+            get_project(project_uuid)
+            apartment_uuids = get_apartment_uuids(project_uuid)
+        except ObjectDoesNotExist:
+            raise NotFound()
+
+        installments = ApartmentInstallment.objects.filter(
+            apartment_reservation__apartment_uuid__in=apartment_uuids
+        ).with_payment_state()
+        if query.validated_data["overdue"]:
+            installments = installments.overdue()
+        if status := query.validated_data.get("status"):
+            installments = installments.filter(payment_state=status.value)
+
+        zero = Value(Decimal(0))
+        totals = installments.aggregate(
+            installment_count=Count("id"),
+            overdue_count=Count("id", filter=Q(is_overdue_now=True)),
+            amount=Coalesce(Sum("value"), zero),
+            paid_amount=Coalesce(Sum("paid_amount"), zero),
+            outstanding_amount=Coalesce(Sum("outstanding_amount"), zero),
+        )
+        installments = installments.select_related("apartment_reservation").order_by(
+            "apartment_reservation__apartment_uuid", "due_date", "id"
+        )
+        serializer = ReceivablesReportSerializer(
+            {"totals": totals, "installments": installments}
+        )
+        return Response(serializer.data)
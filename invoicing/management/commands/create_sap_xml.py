@@ -1,7 +1,7 @@
 from django.core.management.base import BaseCommand
 
 from invoicing.models import ApartmentInstallment
-from invoicing.sap.send.xml import generate_installments_xml
+from invoicing.sap.send.xml import write_installments_xml
 from invoicing.services import generate_sap_xml_filename
 
 
@@ -38,9 +38,12 @@ class Command(BaseCommand):
             f"Generating a SAP XML of {installments.count()} installment(s)"
         )
 
-        xml_str = generate_installments_xml(installments).decode("utf-8")
+        installments = installments.select_related(
+            "apartment_reservation__customer__primary_profile",
+            "apartment_reservation__customer__secondary_profile",
+        ).order_by("id")
         xml_filename = generate_sap_xml_filename()
 
         self.stdout.write(f"Writing XML file {xml_filename}")
-        with open(xml_filename, "w") as f:
-            f.write(xml_str)
+        with open(xml_filename, "wb") as f:
+            write_installments_xml(installments.iterator(), f)
@@ -0,0 +1,30 @@
+from django.db import migrations
+
+# The sequence continues from the highest existing invoice number
+forwards_sql = """
+CREATE SEQUENCE invoicing_apartmentinstallment_invoice_number_seq
+    AS integer
+    MINVALUE 730000001
+    MAXVALUE 999999999
+    NO CYCLE
+    OWNED BY invoicing_apartmentinstallment.invoice_number;
+SELECT setval('invoicing_apartmentinstallment_invoice_number_seq', MAX(invoice_number))
+FROM invoicing_apartmentinstallment
+WHERE invoice_number BETWEEN 730000001 AND 999999999
+HAVING COUNT(*) > 0;
+"""
+
+backwards_sql = """
+DROP SEQUENCE invoicing_apartmentinstallment_invoice_number_seq;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("invoicing", "0015_alter_apartmentinstallment_invoice_number"),
+    ]
+
+    operations = [
+        migrations.RunSQL(forwards_sql, backwards_sql),
+    ]
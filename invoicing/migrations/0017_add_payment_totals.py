@@ -0,0 +1,66 @@
+# Generated by Django 4.2.6 on 2026-10-17 08:05
+
+from django.db import migrations, models
+
+calculate_payment_totals_sql = """
+UPDATE invoicing_apartmentinstallment
+SET paid_amount = totals.paid_amount,
+    paid_by_due_date_amount = totals.paid_by_due_date_amount,
+    last_payment_date = totals.last_payment_date
+FROM (
+    SELECT installment.id,
+        SUM(payment.amount) AS paid_amount,
+        COALESCE(
+            SUM(payment.amount) FILTER (
+                WHERE payment.payment_date <= installment.due_date
+            ),
+            0
+        ) AS paid_by_due_date_amount,
+        MAX(payment.payment_date) AS last_payment_date
+    FROM invoicing_apartmentinstallment installment
+    JOIN invoicing_payment payment
+        ON payment.apartment_installment_id = installment.id
+    GROUP BY installment.id
+) totals
+WHERE invoicing_apartmentinstallment.id = totals.id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("invoicing", "0016_add_invoice_number_sequence"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="apartmentinstallment",
+            name="last_payment_date",
+            field=models.DateField(
+                blank=True, editable=False, null=True, verbose_name="last payment date"
+            ),
+        ),
+        migrations.AddField(
+            model_name="apartmentinstallment",
+            name="paid_amount",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                editable=False,
+                max_digits=16,
+                verbose_name="paid amount",
+            ),
+        ),
+        migrations.AddField(
+            model_name="apartmentinstallment",
+            name="paid_by_due_date_amount",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                editable=False,
+                max_digits=16,
+                verbose_name="amount paid by due date",
+            ),
+        ),
+        migrations.RunSQL(calculate_payment_totals_sql, migrations.RunSQL.noop),
+    ]
@@ -1,11 +1,26 @@
 from datetime import datetime, timedelta
-from uuid import uuid4
+from decimal import Decimal
+from functools import lru_cache
+from typing import List, Sequence, Tuple
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models, transaction
-from django.db.models import UniqueConstraint
+from django.db import connection, models, transaction
+from django.db.models import (
+    Case,
+    ExpressionWrapper,
+    F,
+    Max,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    UniqueConstraint,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.utils.timezone import localdate, now
 from django.utils.translation import gettext_lazy as _
@@ -28,6 +43,11 @@ from invoicing.utils import (
 
 User = get_user_model()
 
+INVOICE_NUMBER_SEQUENCE = "invoicing_apartmentinstallment_invoice_number_seq"
+PAYMENT_TOTAL_FIELDS = ("paid_amount", "paid_by_due_date_amount", "last_payment_date")
+
+_NOT_LOADED = object()
+
 
 class AlreadyAddedToBeSentToSapError(Exception):
     pass
@@ -55,6 +75,38 @@ class InstallmentBase(models.Model):
         abstract = True
 
 
+def _get_next_values(*sequence_counts: Tuple[str, int]) -> List[List[int]]:
+    """Draw the given numbers of values from the given sequences with one query."""
+    row_count = max((count for _, count in sequence_counts), default=0)
+    if not row_count:
+        return [[] for _ in sequence_counts]
+    columns = ", ".join(
+        "CASE WHEN i <= %s THEN nextval(%s) END" for _ in sequence_counts
+    )
+    params = [
+        param for sequence, count in sequence_counts for param in (count, sequence)
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT {columns} FROM generate_series(1, %s) AS i", params + [row_count]
+        )
+        rows = cursor.fetchall()
+    return [
+        [row[index] for row in rows[:count]]
+        for index, (_, count) in enumerate(sequence_counts)
+    ]
+
+
+@lru_cache(maxsize=None)
+def _get_pk_sequence(model) -> str:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_get_serial_sequence(%s, %s)",
+            [model._meta.db_table, model._meta.pk.column],
+        )
+        return cursor.fetchone()[0]
+
+
 class ApartmentInstallmentQuerySet(models.QuerySet):
     def sending_to_sap_needed(self):
         max_due_date = timezone.localdate() + timedelta(
@@ -69,6 +121,118 @@ class ApartmentInstallmentQuerySet(models.QuerySet):
     def set_sent_to_sap_at(self, dt: datetime = None):
         self.update(sent_to_sap_at=dt or timezone.now())
 
+    def allocate_numbers(self, installments: Sequence["ApartmentInstallment"]):
+        """Set the missing invoice and reference numbers of unsaved installments.
+
+        The invoice numbers are drawn from a sequence, and the reference numbers are
+        generated from ids drawn from the sequence of the primary key, so the
+        installments can be inserted with a single statement each or all of them
+        with one bulk_create.
+        """
+        without_invoice_number = [i for i in installments if not i.invoice_number]
+        without_reference_number = [
+            i for i in installments if not i.reference_number and i.pk is None
+        ]
+        sequence_counts = [(INVOICE_NUMBER_SEQUENCE, len(without_invoice_number))]
+        if without_reference_number:
+            sequence_counts.append(
+                (_get_pk_sequence(self.model), len(without_reference_number))
+            )
+        invoice_numbers, *pks = _get_next_values(*sequence_counts)
+
+        for installment, invoice_number in zip(without_invoice_number, invoice_numbers):
+            installment.invoice_number = invoice_number
+        for installment, pk in zip(without_reference_number, pks[0] if pks else []):
+            installment.pk = pk
+            installment.reference_number = generate_reference_number(pk)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        self.allocate_numbers(objs)
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def update_payment_totals(self) -> int:
+        """Recalculate the payment totals of the installments from their payments."""
+        payments = (
+            Payment.objects.filter(apartment_installment=OuterRef("pk"))
+            .order_by()
+            .values("apartment_installment")
+        )
+        return self.update(
+            paid_amount=Coalesce(
+                Subquery(payments.annotate(total=Sum("amount")).values("total")),
+                Value(Decimal(0)),
+            ),
+            paid_by_due_date_amount=Coalesce(
+                Subquery(
+                    payments.filter(payment_date__lte=OuterRef("due_date"))
+                    .annotate(total=Sum("amount"))
+                    .values("total")
+                ),
+                Value(Decimal(0)),
+            ),
+            last_payment_date=Subquery(
+                payments.annotate(last=Max("payment_date")).values("last")
+            ),
+        )
+
+    def with_payment_state(self):
+        """Annotate the outstanding amount and the payment state of the installments.
+
+        The payment state is the value of the `PaymentStatus` matching
+        `ApartmentInstallment.payment_status`, and `is_overdue_now` matches
+        `ApartmentInstallment.is_overdue`.
+        """
+        return self.annotate(
+            outstanding_amount=F("value") - F("paid_amount"),
+            payment_state=Case(
+                When(paid_amount=0, then=Value(PaymentStatus.UNPAID.value)),
+                When(paid_amount=F("value"), then=Value(PaymentStatus.PAID.value)),
+                When(
+                    paid_amount__lt=F("value"),
+                    then=Value(PaymentStatus.UNDERPAID.value),
+                ),
+                default=Value(PaymentStatus.OVERPAID.value),
+                output_field=models.CharField(),
+            ),
+            is_overdue_now=ExpressionWrapper(
+                Q(
+                    due_date__lt=localdate(),
+                    paid_by_due_date_amount__lt=F("value"),
+                ),
+                output_field=models.BooleanField(),
+            ),
+        )
+
+    def overdue(self):
+        return self.filter(
+            due_date__lt=localdate(), paid_by_due_date_amount__lt=F("value")
+        )
+
+    def underpaid(self):
+        """Return the installments that have been paid less than their value."""
+        return self.filter(paid_amount__lt=F("value"))
+
+    def sync_invoice_number_sequence(self):
+        """Move the invoice number sequence past the existing invoice numbers.
+
+        Needs to be called after installments have been created with explicitly
+        given invoice numbers, e.g. when importing them.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT setval(%s, MAX(invoice_number)) "
+                f"FROM {connection.ops.quote_name(self.model._meta.db_table)} "
+                "WHERE invoice_number BETWEEN %s AND %s "
+                "HAVING MAX(invoice_number) >= "
+                f"(SELECT last_value FROM {INVOICE_NUMBER_SEQUENCE})",
+                [
+                    INVOICE_NUMBER_SEQUENCE,
+                    self.model.MIN_INVOICE_NUMBER,
+                    self.model.MAX_INVOICE_NUMBER,
+                ],
+            )
+
 
 class ApartmentInstallment(InstallmentBase):
     MIN_INVOICE_NUMBER = 730000001
@@ -102,6 +266,24 @@ class ApartmentInstallment(InstallmentBase):
     handler = CharPGPPublicKeyField(
         verbose_name=_("handler"), max_length=200, blank=True
     )
+    # Payment totals, maintained when the payments are saved
+    paid_amount = models.DecimalField(
+        verbose_name=_("paid amount"),
+        max_digits=16,
+        decimal_places=2,
+        default=0,
+        editable=False,
+    )
+    paid_by_due_date_amount = models.DecimalField(
+        verbose_name=_("amount paid by due date"),
+        max_digits=16,
+        decimal_places=2,
+        default=0,
+        editable=False,
+    )
+    last_payment_date = models.DateField(
+        verbose_name=_("last payment date"), null=True, blank=True, editable=False
+    )
 
     objects = ApartmentInstallmentQuerySet.as_manager()
 
@@ -117,66 +299,59 @@ class ApartmentInstallment(InstallmentBase):
         if not self.due_date or localdate() <= self.due_date:
             return False
 
-        return (
-            sum(
-                payment.amount
-                for payment in self.payments.filter(payment_date__lte=self.due_date)
-            )
-            < self.value
-        )
+        return self.paid_by_due_date_amount < self.value
 
     @property
     def payment_status(self) -> PaymentStatus:
-        paid_amount = sum(payment.amount for payment in self.payments.all())
-        if not paid_amount:
+        if not self.paid_amount:
             return PaymentStatus.UNPAID
-        elif paid_amount == self.value:
+        elif self.paid_amount == self.value:
             return PaymentStatus.PAID
-        elif paid_amount < self.value:
+        elif self.paid_amount < self.value:
             return PaymentStatus.UNDERPAID
         else:
             return PaymentStatus.OVERPAID
 
-    def _get_next_invoice_number(self):
-        if self.invoice_number:
-            return self.invoice_number
-
-        apartment_installment = (
-            ApartmentInstallment.objects.all().order_by("-invoice_number").first()
-        )
-
-        if apartment_installment:
-            return apartment_installment.invoice_number + 1
-
-        return self.MIN_INVOICE_NUMBER
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if "due_date" in field_names:
+            instance._loaded_due_date = instance.due_date
+        return instance
 
-    def set_reference_number(self, force=False):
-        if self.reference_number and not force:
-            return
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        if fields is None or "due_date" in fields:
+            self._loaded_due_date = self.due_date
 
-        self.reference_number = generate_reference_number(self.id)
-        self.save(update_fields=("reference_number",))
+    def refresh_payment_totals(self):
+        """Recalculate the payment totals in the database and reload them."""
+        ApartmentInstallment.objects.filter(pk=self.pk).update_payment_totals()
+        self.refresh_from_db(fields=PAYMENT_TOTAL_FIELDS)
 
-    @transaction.atomic
     def save(self, *args, **kwargs):
-        creating = not self.id
-
-        self.invoice_number = self._get_next_invoice_number()
-
-        if creating:
-            generate_reference_number = not self.reference_number
-
-            if generate_reference_number:
-                # set a temporary unique reference number to please the unique
-                # constraint
-                self.reference_number = str(f"TEMP-{uuid4()}")
-
+        if self._state.adding:
+            has_pk = self.pk is not None
+            ApartmentInstallment.objects.allocate_numbers([self])
+            if not has_pk and self.pk is not None:
+                # the id was allocated, so there is no need to try an update first
+                kwargs["force_insert"] = True
             super().save(*args, **kwargs)
+            self._loaded_due_date = self.due_date
+            return
 
-            if generate_reference_number:
-                self.set_reference_number(force=True)
-        else:
+        update_fields = kwargs.get("update_fields")
+        # the amount paid by the due date depends on the due date
+        due_date_changed = (
+            update_fields is None or "due_date" in update_fields
+        ) and self.due_date != getattr(self, "_loaded_due_date", _NOT_LOADED)
+        if not due_date_changed:
+            super().save(*args, **kwargs)
+            return
+        with transaction.atomic():
             super().save(*args, **kwargs)
+            self.refresh_payment_totals()
+        self._loaded_due_date = self.due_date
 
     def add_to_be_sent_to_sap(self, force=False):
         if self.added_to_be_sent_to_sap_at and not force:
@@ -283,3 +458,36 @@ class Payment(TimestampedModel):
         verbose_name = _("payment")
         verbose_name_plural = _("payments")
         ordering = ("id",)
+
+    @transaction.atomic
+    def save(self, *args, **kwargs):
+        # Lock the installment so that concurrent payments are all included in the
+        # totals calculated after the save
+        installment_ids = {self.apartment_installment_id}
+        if not self._state.adding:
+            installment_ids |= set(
+                Payment.objects.filter(pk=self.pk).values_list(
+                    "apartment_installment_id", flat=True
+                )
+            )
+        installments = ApartmentInstallment.objects.filter(pk__in=installment_ids)
+        list(installments.select_for_update().values_list("pk", flat=True))
+        super().save(*args, **kwargs)
+        installments.update_payment_totals()
+        self._refresh_installment_payment_totals()
+
+    @transaction.atomic
+    def delete(self, *args, **kwargs):
+        installments = ApartmentInstallment.objects.filter(
+            pk=self.apartment_installment_id
+        )
+        list(installments.select_for_update().values_list("pk", flat=True))
+        result = super().delete(*args, **kwargs)
+        installments.update_payment_totals()
+        self._refresh_installment_payment_totals()
+        return result
+
+    def _refresh_installment_payment_totals(self):
+        # keep an already loaded installment instance up to date
+        if Payment.apartment_installment.is_cached(self):
+            self.apartment_installment.refresh_from_db(fields=PAYMENT_TOTAL_FIELDS)
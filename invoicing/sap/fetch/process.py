@@ -1,7 +1,8 @@
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
+from itertools import islice
 from logging import getLogger
-from typing import Optional
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
 
 from django.db import IntegrityError, transaction
 
@@ -10,6 +11,7 @@ from invoicing.models import ApartmentInstallment, Payment, PaymentBatch
 logger = getLogger(__name__)
 
 EVENT_RECORD_ID = "3"  # tapahtumatietue
+PAYMENT_CHUNK_SIZE = 1000
 
 
 class SapPaymentDataAlreadyProcessedError(Exception):
@@ -20,6 +22,13 @@ class SapPaymentDataParsingError(Exception):
     pass
 
 
+class PaymentRow(NamedTuple):
+    line_number: int
+    invoice_number: int
+    payment_date: date
+    amount: Decimal
+
+
 class LineParser:
     def __init__(self, line: str):
         assert len(line) == 90, f"Incorrect line length {len(line)}"
@@ -40,13 +49,68 @@ class LineParser:
         return int(self.get_value_from_line(27, 9))
 
 
+def _iter_lines(payment_data: Union[str, Iterable[str]]) -> Iterator[str]:
+    if isinstance(payment_data, str):
+        yield from payment_data.splitlines()
+    else:
+        for line in payment_data:
+            yield line.rstrip("\r\n")
+
+
+def _parse_payment_rows(
+    payment_data: Union[str, Iterable[str]], errors: List[Tuple[int, str]]
+) -> List[PaymentRow]:
+    rows = []
+    for line_number, line in enumerate(_iter_lines(payment_data), 1):
+        # Other than event records are ignored at least for now
+        if line[:1] != EVENT_RECORD_ID:
+            continue
+
+        try:
+            parser = LineParser(line)
+            rows.append(
+                PaymentRow(
+                    line_number=line_number,
+                    invoice_number=parser.get_invoice_number(),
+                    payment_date=parser.get_payment_date(),
+                    amount=parser.get_amount(),
+                )
+            )
+        except Exception as e:  # noqa
+            errors.append((line_number, str(e)))
+    return rows
+
+
+def _create_payments(
+    rows: List[PaymentRow],
+    installment_ids: Dict[int, int],
+    payment_batch: Optional[PaymentBatch],
+) -> None:
+    payments = (
+        Payment(
+            batch=payment_batch,
+            apartment_installment_id=installment_ids[row.invoice_number],
+            payment_date=row.payment_date,
+            amount=row.amount,
+        )
+        for row in rows
+    )
+    while chunk := list(islice(payments, PAYMENT_CHUNK_SIZE)):
+        Payment.objects.bulk_create(chunk)
+
+
 @transaction.atomic
-def process_payment_data(  # noqa: C901
-    payment_data: str, filename: Optional[str] = None
+def process_payment_data(
+    payment_data: Union[str, Iterable[str]], filename: Optional[str] = None
 ) -> int:
-    logger.debug(
-        f"Processing payment data. Filename: {filename} Data: \n{payment_data}\n"
-    )
+    """Create the payments of the event records of a SAP payment data file.
+
+    The data is given either as a string or as an iterable of lines, such as a file
+    object, which is read in a single pass. The installments of all the payments
+    are fetched with one query, the payments are inserted in chunks, and the
+    payment totals of the installments are updated with one query.
+    """
+    logger.debug("Processing payment data. Filename: %s", filename)
 
     if filename:
         try:
@@ -59,41 +123,35 @@ def process_payment_data(  # noqa: C901
         payment_batch = None
 
     errors = []
-    num_of_payments = 0
-    for line_number, line in enumerate(payment_data.splitlines(), 1):
-        # Other than event records are ignored at least for now
-        if line[0] != EVENT_RECORD_ID:
-            continue
-
-        try:
-            parser = LineParser(line)
-            invoice_number = parser.get_invoice_number()
-            payment_date = parser.get_payment_date()
-            amount = parser.get_amount()
-        except Exception as e:  # noqa
-            errors.append(f"{line_number}: {e}")
-            continue
+    rows = _parse_payment_rows(payment_data, errors)
 
-        try:
-            installment = ApartmentInstallment.objects.get(
-                invoice_number=invoice_number
-            )
-        except ApartmentInstallment.DoesNotExist:
+    # The installments are locked until their payment totals have been updated
+    installment_ids = dict(
+        ApartmentInstallment.objects.filter(
+            invoice_number__in={row.invoice_number for row in rows}
+        )
+        .select_for_update()
+        .values_list("invoice_number", "id")
+    )
+    for row in rows:
+        if row.invoice_number not in installment_ids:
             errors.append(
-                f"{line_number}: ApartmentInstallment with invoice number "
-                f'"{invoice_number}" does not exist.'
+                (
+                    row.line_number,
+                    "ApartmentInstallment with invoice number "
+                    f'"{row.invoice_number}" does not exist.',
+                )
             )
-            continue
-
-        Payment.objects.create(
-            batch=payment_batch,
-            apartment_installment=installment,
-            payment_date=payment_date,
-            amount=amount,
-        )
-        num_of_payments += 1
 
     if errors:
-        raise SapPaymentDataParsingError("Parsing errors:\n" + "\n".join(errors))
+        errors.sort(key=lambda error: error[0])
+        raise SapPaymentDataParsingError(
+            "Parsing errors:\n"
+            + "\n".join(f"{line_number}: {error}" for line_number, error in errors)
+        )
 
-    return num_of_payments
+    _create_payments(rows, installment_ids, payment_batch)
+    ApartmentInstallment.objects.filter(
+        id__in={installment_ids[row.invoice_number] for row in rows}
+    ).update_payment_totals()
+    return len(rows)
@@ -1,5 +1,8 @@
-from io import BytesIO
-from typing import List, Optional
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from tempfile import TemporaryFile
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import paramiko
 
@@ -7,35 +10,106 @@ from apartment_application_service import settings
 
 
 class SFTPConnection:
+    """
+    A connection to the SAP SFTP server.
+
+    The files can be downloaded and renamed concurrently by `concurrency` threads,
+    each of which uses its own SFTP channel over the same SSH transport.
+    """
+
     def __init__(
         self,
         host: Optional[str] = None,
         username: Optional[str] = None,
         password: Optional[str] = None,
-        port: Optional[int] = 22,
+        port: Optional[int] = None,
+        concurrency: Optional[int] = None,
     ):
         self.host = host or settings.SAP_SFTP_FETCH_HOST
         self.username = username or settings.SAP_SFTP_FETCH_USERNAME
         self.password = password or settings.SAP_SFTP_FETCH_PASSWORD
         self.port = port or settings.SAP_SFTP_FETCH_PORT
+        self.concurrency = concurrency or settings.SAP_SFTP_FETCH_CONCURRENCY
 
     def __enter__(self):
         self.transport = paramiko.Transport((self.host, self.port))
         self.transport.connect(username=self.username, password=self.password)
         self.sftp = paramiko.SFTPClient.from_transport(self.transport)
+        self._thread_local = threading.local()
+        self._thread_sftps: List[paramiko.SFTPClient] = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency)
         return self
 
     def __exit__(self, *args):
+        self._executor.shutdown(wait=True)
+        for sftp in self._thread_sftps:
+            sftp.close()
         self.transport.close()
 
+    def _get_thread_sftp(self) -> paramiko.SFTPClient:
+        sftp = getattr(self._thread_local, "sftp", None)
+        if sftp is None:
+            sftp = paramiko.SFTPClient.from_transport(self.transport)
+            self._thread_local.sftp = sftp
+            with self._lock:
+                self._thread_sftps.append(sftp)
+        return sftp
+
     def get_filenames(self) -> List[str]:
         return self.sftp.listdir()
 
-    def get_file(self, filename: str) -> str:
-        local_file = BytesIO()
-        self.sftp.getfo(filename, local_file)
+    def download_file(self, filename: str) -> BinaryIO:
+        """Download the file into a temporary file, which is returned rewound."""
+        local_file = TemporaryFile()
+        try:
+            self._get_thread_sftp().getfo(filename, local_file)
+        except Exception:
+            local_file.close()
+            raise
         local_file.seek(0)
-        return local_file.read().decode("utf-8")
+        return local_file
+
+    def iter_downloads(
+        self, filenames: Iterable[str]
+    ) -> Iterator[Tuple[str, "Future[BinaryIO]"]]:
+        """Download the files in the background in the order they are given.
+
+        Yields the filenames with the futures of their downloaded files. While a
+        file is being handled by the caller, at most `concurrency` of the following
+        files are being downloaded or are waiting to be handled.
+        """
+        pending = deque()
+        for filename in filenames:
+            pending.append(
+                (filename, self._executor.submit(self.download_file, filename))
+            )
+            if len(pending) > self.concurrency:
+                yield pending.popleft()
+        while pending:
+            yield pending.popleft()
 
     def rename_file(self, old_filename: str, new_filename: str) -> None:
         self.sftp.rename(old_filename, new_filename)
+
+    def rename_files(self, filenames: Dict[str, str]) -> Dict[str, Exception]:
+        """Rename the files concurrently.
+
+        `filenames` maps the old filenames to the new ones. Returns the errors of
+        the failed renames by the old filename.
+        """
+        futures = {
+            old_filename: self._executor.submit(
+                lambda old, new: self._get_thread_sftp().rename(old, new),
+                old_filename,
+                new_filename,
+            )
+            for old_filename, new_filename in filenames.items()
+        }
+        errors = {}
+        for old_filename, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                errors[old_filename] = e
+        return errors
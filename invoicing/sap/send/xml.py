@@ -73,7 +73,7 @@
 #         </LineItem>
 #     </SBO_AccountsReceivable>
 # </SBO_AccountsReceivableContainer>
-from typing import List, Union
+from typing import BinaryIO, Iterable, List, Union
 from xml.etree.ElementTree import Element, SubElement, tostring
 
 from django.conf import settings
@@ -86,6 +86,8 @@ from invoicing.sap.send.xml_utils import (
     get_wbs_element,
 )
 
+XML_DECLARATION = b"<?xml version='1.0' encoding='utf-8'?>\n"
+
 
 def generate_installments_xml(
     apartment_installments: Union[
@@ -96,6 +98,28 @@ def generate_installments_xml(
     return tostring(xml_content, encoding="utf-8", xml_declaration=True)
 
 
+def write_installments_xml(
+    apartment_installments: Iterable[ApartmentInstallment], xml_file: BinaryIO
+) -> int:
+    """Write the XML of the installments to the file one installment at a time.
+
+    Unlike `generate_installments_xml`, the whole XML tree is never held in memory,
+    so the installments can be given as a queryset iterator. Returns the number of
+    installments written.
+    """
+    xml_file.write(XML_DECLARATION)
+    xml_file.write(b"<SBO_AccountsReceivableContainer>")
+    count = 0
+    for apartment_installment in apartment_installments:
+        element = _append_account_receivable_container_xml(
+            Element("SBO_AccountsReceivableContainer"), apartment_installment
+        )
+        xml_file.write(tostring(element, encoding="utf-8", xml_declaration=False))
+        count += 1
+    xml_file.write(b"</SBO_AccountsReceivableContainer>")
+    return count
+
+
 def _append_account_receivable_container_xml(
     parent: Element,
     apartment_installment: ApartmentInstallment,
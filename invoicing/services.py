@@ -1,10 +1,14 @@
+from concurrent.futures import Future
 from datetime import datetime
-from io import BytesIO
+from io import BytesIO, TextIOWrapper
+from itertools import islice
 from logging import getLogger
-from typing import Optional
+from tempfile import TemporaryFile
+from typing import BinaryIO, Optional, Union
 
 from django.conf import settings
 from django.core.mail import EmailMessage
+from django.db import transaction
 from django.utils import timezone
 from django.utils.timezone import localtime
 
@@ -17,11 +21,13 @@ from invoicing.sap.fetch import (
 )
 from invoicing.sap.fetch.sftp import SFTPConnection
 from invoicing.sap.send.sftp import sftp_put_file_object
-from invoicing.sap.send.xml import generate_installments_xml
+from invoicing.sap.send.xml import write_installments_xml
 
 logger = getLogger(__name__)
 
 
+SAP_XML_CHUNK_SIZE = 1000
+
 TALPA_EMAIL_SUBJECT_TEMPLATE = "{sender_id} aineisto"
 TALPA_EMAIL_CONTENT_TEMPLATE = (
     "{sender_id} myyntireskontra-aineistoa lähetetty {count} kpl {date_time}"
@@ -29,21 +35,72 @@ TALPA_EMAIL_CONTENT_TEMPLATE = (
 
 
 def send_needed_installments_to_sap() -> (int, datetime):
-    installments = ApartmentInstallment.objects.sending_to_sap_needed()
-    logger.debug(f"Installment IDs: {[i.pk for i in installments]}")
-    num_of_installments = installments.count()
+    """Send the installments that need to be sent to SAP in one XML file.
+
+    The ids of the installments are captured once, so exactly the installments in
+    the XML are marked as sent even if more installments become ready to be sent
+    meanwhile. No locks are held while the XML is generated and uploaded, so
+    payments can be saved during a slow upload. The installments are marked sent
+    in a short transaction after the upload, unless another run already did it.
+    """
     timestamp = timezone.now()
-    if num_of_installments:
-        xml = generate_installments_xml(installments)
-        logger.debug(f"Generated XML:\n{xml.decode('utf-8')}")
-        send_xml_to_sap(xml, timestamp=timestamp)
-        installments.set_sent_to_sap_at()
-        for installment in installments:
-            audit_logging.log(None, Operation.UPDATE, installment)
-    return num_of_installments, timestamp
+    installment_ids = list(
+        ApartmentInstallment.objects.sending_to_sap_needed()
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    logger.debug(f"Installment IDs: {installment_ids}")
+    if not installment_ids:
+        return 0, timestamp
+
+    installments = (
+        ApartmentInstallment.objects.filter(id__in=installment_ids)
+        .select_related(
+            "apartment_reservation__customer__primary_profile",
+            "apartment_reservation__customer__secondary_profile",
+        )
+        .order_by("id")
+    )
+    with TemporaryFile() as xml_file:
+        write_installments_xml(
+            installments.iterator(chunk_size=SAP_XML_CHUNK_SIZE), xml_file
+        )
+        xml_file.seek(0)
+        send_xml_to_sap(xml_file, timestamp=timestamp)
+
+    with transaction.atomic():
+        sent_ids = list(
+            ApartmentInstallment.objects.filter(
+                id__in=installment_ids, sent_to_sap_at=None
+            )
+            .select_for_update()
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        ApartmentInstallment.objects.filter(id__in=sent_ids).set_sent_to_sap_at(
+            timestamp
+        )
+        remaining_ids = iter(sent_ids)
+        while chunk := list(islice(remaining_ids, SAP_XML_CHUNK_SIZE)):
+            audit_logging.log_many(
+                (None, Operation.UPDATE, ApartmentInstallment(pk=installment_id))
+                for installment_id in chunk
+            )
+    return len(installment_ids), timestamp
+
+
+def _process_payment_file(filename: str, download: "Future[BinaryIO]") -> int:
+    with TextIOWrapper(download.result(), encoding="utf-8") as payment_data_file:
+        return process_payment_data(payment_data_file, filename)
 
 
 def fetch_payments_from_sap() -> (int, int):
+    """Fetch and process the payment data files from SAP.
+
+    The files are downloaded concurrently ahead of the processing, which is done
+    one file at a time in the order of the filenames. The processed files are
+    moved to the archive directory once all of them have been handled.
+    """
     with SFTPConnection() as sftp_connection:
         filenames = [
             filename
@@ -54,10 +111,10 @@ def fetch_payments_from_sap() -> (int, int):
 
         num_of_payments = 0
         num_of_files = 0
-        for filename in filenames:
+        archived_filenames = []
+        for filename, download in sftp_connection.iter_downloads(filenames):
             try:
-                payment_data_file = sftp_connection.get_file(filename)
-                num_of_payments += process_payment_data(payment_data_file, filename)
+                num_of_payments += _process_payment_file(filename, download)
             except SapPaymentDataAlreadyProcessedError:
                 logger.warning("Payment data file %s already processed", filename)
             except Exception:
@@ -65,11 +122,15 @@ def fetch_payments_from_sap() -> (int, int):
                 continue
             else:
                 num_of_files += 1
+            archived_filenames.append(filename)
 
-            try:
-                sftp_connection.rename_file(filename, f"arch/{filename}")
-            except Exception:
-                logger.exception("Error renaming payment data file: %s", filename)
+        errors = sftp_connection.rename_files(
+            {filename: f"arch/{filename}" for filename in archived_filenames}
+        )
+        for filename, error in errors.items():
+            logger.error(
+                "Error renaming payment data file: %s", filename, exc_info=error
+            )
 
     return num_of_payments, num_of_files
 
@@ -101,7 +162,7 @@ def generate_sap_xml_filename(timestamp: Optional[datetime] = None) -> str:
 
 
 def send_xml_to_sap(
-    xml: bytes, filename: str = None, timestamp: datetime = None
+    xml: Union[bytes, BinaryIO], filename: str = None, timestamp: datetime = None
 ) -> None:
     if filename is None:
         if timestamp is None:
@@ -115,7 +176,7 @@ def send_xml_to_sap(
         settings.SAP_SFTP_SEND_HOST,
         settings.SAP_SFTP_SEND_USERNAME,
         settings.SAP_SFTP_SEND_PASSWORD,
-        BytesIO(xml),
+        BytesIO(xml) if isinstance(xml, bytes) else xml,
         filename,
         settings.SAP_SFTP_SEND_PORT,
     )
@@ -1,5 +1,8 @@
+from unittest import mock
+
 import pytest
 
+from invoicing.tests.sftp_server import PASSWORD, SFTPServerStub, USERNAME
 from users.tests.conftest import (  # noqa: F401
     api_client,
     sales_ui_salesperson_api_client,
@@ -14,3 +17,17 @@ def settings_for_tests(settings):
     settings.SAP_SFTP_SEND_HOST = "localhost"
     settings.SAP_SFTP_SEND_PORT = 22
     settings.SAP_SFTP_SEND_FILENAME_PREFIX = "test_sap_filename_prefix"
+
+
+@pytest.fixture
+def sftp_server(tmp_path) -> SFTPServerStub:
+    """An SFTP server serving `tmp_path`, used by SFTPConnection by default."""
+    (tmp_path / "arch").mkdir()
+    with SFTPServerStub(str(tmp_path)) as server, mock.patch.multiple(
+        "apartment_application_service.settings",
+        SAP_SFTP_FETCH_HOST="127.0.0.1",
+        SAP_SFTP_FETCH_PORT=server.port,
+        SAP_SFTP_FETCH_USERNAME=USERNAME,
+        SAP_SFTP_FETCH_PASSWORD=PASSWORD,
+    ):
+        yield server
@@ -0,0 +1,154 @@
+"""
+A minimal SFTP server for testing the SAP payment file fetching.
+
+The server serves the files of a local directory. Only listing, reading, stating
+and renaming the files are supported.
+"""
+import os
+import socket
+import threading
+import time
+from typing import List
+
+import paramiko
+
+USERNAME = "test_sap_username"
+PASSWORD = "test_sap_password"
+
+_host_key = None
+
+
+def _get_host_key() -> paramiko.PKey:
+    # Generating a key is slow, so the same key is used by all the servers
+    global _host_key
+    if _host_key is None:
+        _host_key = paramiko.RSAKey.generate(2048)
+    return _host_key
+
+
+class _Server(paramiko.ServerInterface):
+    def check_auth_password(self, username, password):
+        if username == USERNAME and password == PASSWORD:
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+
+class _Handle(paramiko.SFTPHandle):
+    def stat(self):
+        return paramiko.SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+
+
+class _SFTPInterface(paramiko.SFTPServerInterface):
+    def __init__(self, server, stub: "SFTPServerStub", *args, **kwargs):
+        super().__init__(server, *args, **kwargs)
+        self.stub = stub
+
+    def list_folder(self, path):
+        local_path = self.stub.get_path(path)
+        try:
+            attributes = []
+            for filename in os.listdir(local_path):
+                attr = paramiko.SFTPAttributes.from_stat(
+                    os.stat(os.path.join(local_path, filename))
+                )
+                attr.filename = filename
+                attributes.append(attr)
+            return attributes
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    def stat(self, path):
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.stat(self.stub.get_path(path)))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    lstat = stat
+
+    def open(self, path, flags, attr):
+        if flags & (os.O_WRONLY | os.O_RDWR):
+            return paramiko.SFTP_PERMISSION_DENIED
+        time.sleep(self.stub.latency)
+        try:
+            local_file = open(self.stub.get_path(path), "rb")
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+        self.stub.add_opened_file(path)
+        handle = _Handle(flags)
+        handle.filename = path
+        handle.readfile = local_file
+        return handle
+
+    def rename(self, oldpath, newpath):
+        try:
+            os.rename(self.stub.get_path(oldpath), self.stub.get_path(newpath))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+        self.stub.add_renamed_file(oldpath)
+        return paramiko.SFTP_OK
+
+
+class SFTPServerStub:
+    """Serve the files of `root` in a background thread.
+
+    `latency` is the time in seconds it takes to open a file, to simulate the
+    round trips to a remote server.
+    """
+
+    def __init__(self, root: str, latency: float = 0):
+        self.root = root
+        self.latency = latency
+        self.opened_files: List[str] = []
+        self.renamed_files: List[str] = []
+        self._lock = threading.Lock()
+        self._transports: List[paramiko.Transport] = []
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.bind(("127.0.0.1", 0))
+        self._socket.listen()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._socket.close()
+        for transport in self._transports:
+            transport.close()
+
+    @property
+    def port(self) -> int:
+        return self._socket.getsockname()[1]
+
+    def add_opened_file(self, path: str):
+        with self._lock:
+            self.opened_files.append(path)
+
+    def add_renamed_file(self, path: str):
+        with self._lock:
+            self.renamed_files.append(path)
+
+    def get_path(self, path: str) -> str:
+        return os.path.join(self.root, os.path.normpath("/" + path).lstrip("/"))
+
+    def _serve(self):
+        while True:
+            try:
+                client, _ = self._socket.accept()
+            except OSError:
+                return
+            transport = paramiko.Transport(client)
+            transport.add_server_key(_get_host_key())
+            transport.set_subsystem_handler(
+                "sftp", paramiko.SFTPServer, _SFTPInterface, self
+            )
+            transport.start_server(server=_Server())
+            self._transports.append(transport)
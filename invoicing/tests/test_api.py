@@ -5,6 +5,7 @@ from decimal import Decimal
 import pytest
 from django.urls import reverse
 from django.utils import timezone
+from freezegun import freeze_time
 
 from apartment.tests.factories import ApartmentDocumentFactory
 from application_form.tests.factories import ApartmentReservationFactory
@@ -1011,3 +1012,96 @@ def test_apartment_installment_refund_value_cannot_be_positive(
     )
     assert response.status_code == 400
     assert "positive" in str(response.data)
+
+
+@pytest.mark.django_db
+def test_project_receivables_unauthorized(apartment_document, user_api_client):
+    response = user_api_client.get(
+        reverse(
+            "apartment:project-receivables",
+            kwargs={"project_uuid": apartment_document.project_uuid},
+        ),
+        format="json",
+    )
+    assert response.status_code == 403
+
+
+@pytest.mark.django_db
+@freeze_time("2022-03-01")
+def test_project_receivables(apartment_document, sales_ui_salesperson_api_client):
+    reservation = ApartmentReservationFactory(apartment_uuid=apartment_document.uuid)
+    overdue = ApartmentInstallmentFactory(
+        apartment_reservation=reservation,
+        type=InstallmentType.PAYMENT_1,
+        value=Decimal("1000.00"),
+        due_date=datetime.date(2022, 2, 1),
+    )
+    PaymentFactory(
+        apartment_installment=overdue,
+        amount=Decimal("400.00"),
+        payment_date=datetime.date(2022, 1, 15),
+    )
+    paid = ApartmentInstallmentFactory(
+        apartment_reservation=reservation,
+        type=InstallmentType.PAYMENT_2,
+        value=Decimal("500.00"),
+        due_date=datetime.date(2022, 4, 1),
+    )
+    PaymentFactory(
+        apartment_installment=paid,
+        amount=Decimal("500.00"),
+        payment_date=datetime.date(2022, 2, 15),
+    )
+    # installments of other projects are not included
+    ApartmentInstallmentFactory(due_date=datetime.date(2022, 2, 1))
+    url = reverse(
+        "apartment:project-receivables",
+        kwargs={"project_uuid": apartment_document.project_uuid},
+    )
+
+    response = sales_ui_salesperson_api_client.get(url, format="json")
+
+    assert response.status_code == 200
+    assert response.data["totals"] == {
+        "installment_count": 2,
+        "overdue_count": 1,
+        "amount": 150000,
+        "paid_amount": 90000,
+        "outstanding_amount": 60000,
+    }
+    assert [i["id"] for i in response.data["installments"]] == [overdue.id, paid.id]
+    assert response.data["installments"][0] == {
+        "id": overdue.id,
+        "apartment_uuid": str(apartment_document.uuid),
+        "apartment_reservation_id": reservation.id,
+        "type": "PAYMENT_1",
+        "invoice_number": overdue.invoice_number,
+        "reference_number": overdue.reference_number,
+        "amount": 100000,
+        "paid_amount": 40000,
+        "outstanding_amount": 60000,
+        "due_date": "2022-02-01",
+        "last_payment_date": "2022-01-15",
+        "status": "UNDERPAID",
+        "is_overdue": True,
+    }
+
+    response = sales_ui_salesperson_api_client.get(
+        url, {"overdue": "true"}, format="json"
+    )
+    assert [i["id"] for i in response.data["installments"]] == [overdue.id]
+
+    response = sales_ui_salesperson_api_client.get(
+        url, {"status": "PAID"}, format="json"
+    )
+    assert [i["id"] for i in response.data["installments"]] == [paid.id]
+    assert response.data["totals"]["overdue_count"] == 0
+
+
+@pytest.mark.django_db
+def test_project_receivables_project_not_found(sales_ui_salesperson_api_client):
+    response = sales_ui_salesperson_api_client.get(
+        reverse("apartment:project-receivables", kwargs={"project_uuid": uuid.uuid4()}),
+        format="json",
+    )
+    assert response.status_code == 404
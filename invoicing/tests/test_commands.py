@@ -1,17 +1,23 @@
 from datetime import timedelta
 from unittest import mock
 from unittest.mock import MagicMock, Mock
+from xml.etree import ElementTree
 
 import pytest
 from django.conf import settings
 from django.core import mail
 from django.core.management import call_command
+from django.db import connection
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from django.utils.timezone import localtime
 
 from apartment.tests.factories import ApartmentDocumentFactory
+from audit_log.enums import Operation
+from audit_log.models import AuditLog
 from invoicing.services import (
+    send_needed_installments_to_sap,
     TALPA_EMAIL_CONTENT_TEMPLATE,
     TALPA_EMAIL_SUBJECT_TEMPLATE,
 )
@@ -52,7 +58,7 @@ def test_pending_installments_to_sap(send_xml_to_sap):
     )  # already sent to SAP
 
     def send_xml_to_sap_side_effect(xml, filename=None, timestamp=None):
-        return assert_apartment_installment_match_xml_data(should_get_sent, xml)
+        return assert_apartment_installment_match_xml_data(should_get_sent, xml.read())
 
     # check generated xml and make sure only should_get_sent is included
     send_xml_to_sap.side_effect = send_xml_to_sap_side_effect
@@ -69,6 +75,59 @@ def test_pending_installments_to_sap(send_xml_to_sap):
     assert added_to_be_sent_but_not_yet_ready.sent_to_sap_at is None
 
 
+@mock.patch("invoicing.services.send_xml_to_sap", autospec=True)
+@pytest.mark.django_db
+def test_pending_installments_to_sap_snapshot(send_xml_to_sap):
+    apartment = ApartmentDocumentFactory()
+    installments = [
+        ApartmentInstallmentFactory(
+            apartment_reservation__apartment_uuid=apartment.uuid,
+            apartment_reservation__list_position=list_position,
+            added_to_be_sent_to_sap_at=timezone.now(),
+            sent_to_sap_at=None,
+        )
+        for list_position in range(1, 4)
+    ]
+    sent_xml = []
+
+    def send_xml_to_sap_side_effect(xml, filename=None, timestamp=None):
+        sent_xml.append(xml.read())
+        # no installments are locked during the upload
+        assert not any("FOR UPDATE" in q["sql"] for q in context.captured_queries)
+        # an installment becoming ready while sending must wait for the next run
+        installments.append(
+            ApartmentInstallmentFactory(
+                apartment_reservation__apartment_uuid=apartment.uuid,
+                apartment_reservation__list_position=4,
+                added_to_be_sent_to_sap_at=timezone.now(),
+                sent_to_sap_at=None,
+            )
+        )
+
+    send_xml_to_sap.side_effect = send_xml_to_sap_side_effect
+
+    with mock.patch("invoicing.services.SAP_XML_CHUNK_SIZE", 2):
+        with CaptureQueriesContext(connection) as context:
+            num_of_installments, timestamp = send_needed_installments_to_sap()
+
+    assert num_of_installments == 3
+    root = ElementTree.fromstring(sent_xml[0])
+    assert [element.find("Reference").text for element in root] == [
+        str(installment.invoice_number) for installment in installments[:3]
+    ]
+    for installment in installments[:3]:
+        installment.refresh_from_db()
+        assert installment.sent_to_sap_at == timestamp
+    installments[3].refresh_from_db()
+    assert installments[3].sent_to_sap_at is None
+    assert (
+        AuditLog.objects.filter(
+            target_type="ApartmentInstallment", operation=Operation.UPDATE.value
+        ).count()
+        == 3
+    )
+
+
 @override_settings(
     MAILER_EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
     TALPA_EMAIL="taplaemail@example.com",
@@ -142,3 +201,35 @@ def test_fetch_payments_from_sap(_, paramiko_sftp):
 
     mock_sftp.rename.assert_called_with("MR_TESTING_123.TXT", "arch/MR_TESTING_123.TXT")
     assert installment.payments.count() == 2
+
+
+@pytest.mark.django_db
+def test_fetch_payments_from_sap_server(sftp_server, tmp_path):
+    installment = ApartmentInstallmentFactory(invoice_number=730000077)
+    for filename in ["MR_TESTING_1.TXT", "MR_TESTING_2.TXT"]:
+        (tmp_path / filename).write_text(VALID_TEST_PAYMENT_DATA)
+    (tmp_path / "MR_TESTING_3.TXT").write_text("not payment data\n")
+    (tmp_path / "OTHER_FILE.XML").write_text("")
+
+    call_command("fetch_payments_from_sap")
+
+    assert installment.payments.count() == 4
+    assert sorted(sftp_server.opened_files) == [
+        "MR_TESTING_1.TXT",
+        "MR_TESTING_2.TXT",
+        "MR_TESTING_3.TXT",
+    ]
+    # the file with errors is left in place to be handled manually
+    assert sorted(path.name for path in (tmp_path / "arch").iterdir()) == [
+        "MR_TESTING_1.TXT",
+        "MR_TESTING_2.TXT",
+    ]
+    assert (tmp_path / "MR_TESTING_3.TXT").exists()
+
+    # already processed files are archived again without new payments
+    (tmp_path / "MR_TESTING_1.TXT").write_text(VALID_TEST_PAYMENT_DATA)
+
+    call_command("fetch_payments_from_sap")
+
+    assert installment.payments.count() == 4
+    assert not (tmp_path / "MR_TESTING_1.TXT").exists()
@@ -0,0 +1,47 @@
+import time
+from unittest import mock
+
+from pytest import mark
+
+from invoicing.models import Payment
+from invoicing.services import fetch_payments_from_sap
+from invoicing.tests.factories import ApartmentInstallmentFactory
+
+FILE_COUNT = 20
+LINES_PER_FILE = 1000
+LATENCY = 0.1
+
+EVENT_RECORD = (
+    "300000010700152221218221218{invoice_number:09d}"
+    "                           SAP ATestaaj1 00006658100  "
+)
+
+
+@mark.benchmark
+@mark.django_db
+@mark.parametrize("concurrency", [1, 4])
+def test_benchmark_fetch_payments_from_sap(sftp_server, tmp_path, concurrency, capsys):
+    sftp_server.latency = LATENCY
+    installments = ApartmentInstallmentFactory.create_batch(LINES_PER_FILE)
+    payment_data = "\n".join(
+        EVENT_RECORD.format(invoice_number=installment.invoice_number)
+        for installment in installments
+    )
+    for index in range(FILE_COUNT):
+        (tmp_path / f"MR_BENCHMARK_{index}.TXT").write_text(payment_data)
+
+    with mock.patch(
+        "apartment_application_service.settings.SAP_SFTP_FETCH_CONCURRENCY",
+        concurrency,
+    ):
+        start = time.perf_counter()
+        num_of_payments, num_of_files = fetch_payments_from_sap()
+        elapsed = time.perf_counter() - start
+
+    assert num_of_files == FILE_COUNT
+    assert num_of_payments == Payment.objects.count() == FILE_COUNT * LINES_PER_FILE
+    with capsys.disabled():
+        print(
+            f"\n{FILE_COUNT} payment files of {LINES_PER_FILE} lines fetched with "
+            f"concurrency {concurrency} and {LATENCY} s latency: {elapsed:.2f} s"
+        )
@@ -1,8 +1,12 @@
 from datetime import date
+from decimal import Decimal
 
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from freezegun import freeze_time
 
+from application_form.tests.factories import ApartmentReservationFactory
 from invoicing.enums import PaymentStatus
 from invoicing.models import (
     ApartmentInstallment,
@@ -15,6 +19,7 @@ from invoicing.tests.factories import (
     PaymentFactory,
     ProjectInstallmentTemplateFactory,
 )
+from invoicing.utils import generate_reference_number
 
 
 @pytest.mark.django_db
@@ -31,8 +36,13 @@ def test_apartment_installment_factory_creation():
 
 @pytest.mark.django_db
 def test_apartment_installment_save_invoice_numbers(settings):
-    for i in range(3):
-        expected_invoice_number = ApartmentInstallment.MIN_INVOICE_NUMBER + i
+    # the numbers come from a sequence, which is not reset between the tests
+    first_invoice_number = ApartmentInstallmentFactory.create(
+        invoice_number=None
+    ).invoice_number
+    assert first_invoice_number >= ApartmentInstallment.MIN_INVOICE_NUMBER
+    for i in range(1, 3):
+        expected_invoice_number = first_invoice_number + i
         apartment_installment = ApartmentInstallmentFactory.create(invoice_number=None)
         assert apartment_installment.invoice_number == expected_invoice_number
 
@@ -41,13 +51,80 @@ def test_apartment_installment_save_invoice_numbers(settings):
 def test_apartment_installment_change_year_and_do_not_restart_invoice_numbers(
     settings,
 ):
+    invoice_numbers = []
     for i in range(3):
         with freeze_time(date(2010 + i, 1, 1)):
-            expected_invoice_number = ApartmentInstallment.MIN_INVOICE_NUMBER + i
             apartment_installment = ApartmentInstallmentFactory.create(
                 invoice_number=None
             )
-            assert apartment_installment.invoice_number == expected_invoice_number
+            invoice_numbers.append(apartment_installment.invoice_number)
+    first_invoice_number = invoice_numbers[0]
+    assert invoice_numbers == [first_invoice_number + i for i in range(3)]
+
+
+@pytest.mark.django_db
+def test_apartment_installment_save_reference_number():
+    # the sequence of the ids is looked up once per process
+    ApartmentInstallmentFactory(invoice_number=None, reference_number="")
+    apartment_installment = ApartmentInstallmentFactory.build(
+        apartment_reservation=ApartmentReservationFactory(),
+        invoice_number=None,
+        reference_number="",
+    )
+
+    with CaptureQueriesContext(connection) as context:
+        apartment_installment.save()
+
+    assert apartment_installment.reference_number == generate_reference_number(
+        apartment_installment.id
+    )
+    # drawing the invoice number and the id, and the insert
+    assert len(context.captured_queries) == 2
+    assert context.captured_queries[1]["sql"].startswith("INSERT")
+    apartment_installment.refresh_from_db()
+    assert apartment_installment.reference_number == generate_reference_number(
+        apartment_installment.id
+    )
+
+
+@pytest.mark.django_db
+def test_apartment_installment_bulk_create():
+    reservations = ApartmentReservationFactory.create_batch(3)
+    installments = [
+        ApartmentInstallmentFactory.build(
+            apartment_reservation=reservation,
+            invoice_number=None,
+            reference_number="",
+        )
+        for reservation in reservations
+    ]
+
+    ApartmentInstallmentFactory(invoice_number=None, reference_number="")
+
+    with CaptureQueriesContext(connection) as context:
+        ApartmentInstallment.objects.bulk_create(installments)
+
+    assert len(context.captured_queries) == 2
+    assert context.captured_queries[1]["sql"].startswith("INSERT")
+    invoice_numbers = sorted(installment.invoice_number for installment in installments)
+    assert invoice_numbers == [invoice_numbers[0] + i for i in range(3)]
+    for installment in ApartmentInstallment.objects.all():
+        assert installment.reference_number == generate_reference_number(installment.id)
+
+
+@pytest.mark.django_db
+def test_apartment_installment_sync_invoice_number_sequence():
+    next_invoice_number = (
+        ApartmentInstallmentFactory(invoice_number=None).invoice_number + 1
+    )
+    ApartmentInstallmentFactory(invoice_number=next_invoice_number + 10)
+
+    ApartmentInstallment.objects.sync_invoice_number_sequence()
+
+    assert (
+        ApartmentInstallmentFactory(invoice_number=None).invoice_number
+        == next_invoice_number + 11
+    )
 
 
 @pytest.mark.django_db
@@ -122,3 +199,105 @@ def test_apartment_installment_is_overdue():
         assert paid_in_time.is_overdue is False
         assert paid_no_due_date.is_overdue is False
         assert partially_paid_in_time.is_overdue is True
+
+
+@pytest.mark.django_db
+def test_apartment_installment_payment_totals():
+    installment = ApartmentInstallmentFactory(value=100, due_date=date(2020, 2, 1))
+    PaymentFactory(amount=200)  # just some other payment that should not affect
+
+    first = PaymentFactory(
+        apartment_installment=installment, amount=60, payment_date=date(2020, 1, 31)
+    )
+    PaymentFactory(
+        apartment_installment=installment, amount=30, payment_date=date(2020, 2, 3)
+    )
+    installment.refresh_from_db()
+    assert installment.paid_amount == Decimal(90)
+    assert installment.paid_by_due_date_amount == Decimal(60)
+    assert installment.last_payment_date == date(2020, 2, 3)
+
+    installment.due_date = date(2020, 2, 5)
+    installment.save()
+    installment.refresh_from_db()
+    assert installment.paid_by_due_date_amount == Decimal(90)
+
+    first.delete()
+    installment.refresh_from_db()
+    assert installment.paid_amount == Decimal(30)
+    assert installment.paid_by_due_date_amount == Decimal(30)
+    assert installment.last_payment_date == date(2020, 2, 3)
+
+
+@pytest.mark.django_db
+def test_apartment_installment_save_recalculates_totals_only_on_due_date_change():
+    installment = ApartmentInstallmentFactory(value=100, due_date=date(2020, 2, 1))
+    PaymentFactory(
+        apartment_installment=installment, amount=100, payment_date=date(2020, 2, 3)
+    )
+    installment = ApartmentInstallment.objects.get(pk=installment.pk)
+
+    with CaptureQueriesContext(connection) as context:
+        installment.account_number = "123123123-123"
+        installment.save()
+    assert len(context.captured_queries) == 1
+
+    with CaptureQueriesContext(connection) as context:
+        installment.due_date = date(2020, 2, 3)
+        installment.save()
+    assert len(context.captured_queries) > 1
+    assert installment.paid_by_due_date_amount == Decimal(100)
+
+
+@pytest.mark.django_db
+def test_payment_delete_locks_installment():
+    payment = PaymentFactory()
+
+    with CaptureQueriesContext(connection) as context:
+        payment.delete()
+
+    sqls = [query["sql"] for query in context.captured_queries]
+    lock_index = next(i for i, sql in enumerate(sqls) if "FOR UPDATE" in sql)
+    delete_index = next(i for i, sql in enumerate(sqls) if sql.startswith("DELETE"))
+    assert lock_index < delete_index
+
+
+@pytest.mark.django_db
+def test_apartment_installment_queryset_payment_state():
+    date_in_past = date(2020, 2, 1)
+    current_date = date(2020, 2, 2)
+
+    unpaid_overdue = ApartmentInstallmentFactory(value=100, due_date=date_in_past)
+    paid_in_time = ApartmentInstallmentFactory(value=100, due_date=date_in_past)
+    PaymentFactory(
+        apartment_installment=paid_in_time, amount=100, payment_date=date_in_past
+    )
+    underpaid_not_overdue = ApartmentInstallmentFactory(
+        value=100, due_date=current_date
+    )
+    PaymentFactory(
+        apartment_installment=underpaid_not_overdue,
+        amount=40,
+        payment_date=date_in_past,
+    )
+    overpaid = ApartmentInstallmentFactory(value=100, due_date=None)
+    PaymentFactory(apartment_installment=overpaid, amount=101)
+
+    with freeze_time(current_date):
+        assert set(ApartmentInstallment.objects.overdue()) == {unpaid_overdue}
+        installments = {
+            installment.id: installment
+            for installment in ApartmentInstallment.objects.with_payment_state()
+        }
+
+    assert set(ApartmentInstallment.objects.underpaid()) == {
+        unpaid_overdue,
+        underpaid_not_overdue,
+    }
+    for installment in installments.values():
+        assert installment.payment_state == installment.payment_status.value
+    assert installments[unpaid_overdue.id].is_overdue_now is True
+    assert installments[paid_in_time.id].is_overdue_now is False
+    assert installments[underpaid_not_overdue.id].is_overdue_now is False
+    assert installments[underpaid_not_overdue.id].outstanding_amount == Decimal(60)
+    assert installments[overpaid.id].outstanding_amount == Decimal(-1)
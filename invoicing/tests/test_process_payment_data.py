@@ -1,7 +1,11 @@
 from datetime import date
 from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
 
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from invoicing.models import PaymentBatch
 from invoicing.sap.fetch import (
@@ -80,3 +84,59 @@ def test_read_payments_data_file_already_processed_error():
 
     with pytest.raises(SapPaymentDataAlreadyProcessedError):
         process_payment_data(test_payment_data, filename="test_payments_123.txt")
+
+
+@pytest.mark.django_db
+def test_read_payments_data_from_file_object():
+    installment = ApartmentInstallmentFactory(invoice_number=730000077)
+
+    num_of_payments = process_payment_data(
+        StringIO(VALID_TEST_PAYMENT_DATA), filename="test_payments_123.txt"
+    )
+
+    assert num_of_payments == 2
+    assert [p.amount for p in installment.payments.all()] == [
+        Decimal("66581.00"),
+        Decimal("66581.01"),
+    ]
+
+
+def _get_payment_data(invoice_numbers):
+    header, event_record, *_, footer = VALID_TEST_PAYMENT_DATA.splitlines()
+    return "\n".join(
+        [header]
+        + [
+            event_record[:27] + f"{invoice_number:09d}" + event_record[36:]
+            for invoice_number in invoice_numbers
+        ]
+        + [footer]
+    )
+
+
+@pytest.mark.django_db
+def test_read_payments_data_in_chunks():
+    installments = [
+        ApartmentInstallmentFactory(invoice_number=730000070 + i) for i in range(5)
+    ]
+    payment_data = _get_payment_data(
+        [installment.invoice_number for installment in installments] * 2
+    )
+
+    with patch("invoicing.sap.fetch.process.PAYMENT_CHUNK_SIZE", 3):
+        with CaptureQueriesContext(connection) as context:
+            num_of_payments = process_payment_data(payment_data)
+
+    assert num_of_payments == 10
+    for installment in installments:
+        assert installment.payments.count() == 2
+        installment.refresh_from_db()
+        assert installment.paid_amount == 2 * Decimal("66581.00")
+        assert installment.last_payment_date == date(2018, 12, 22)
+    queries = [query["sql"] for query in context.captured_queries]
+    installment_queries = [q for q in queries if "invoicing_apartmentinstallment" in q]
+    payment_inserts = [
+        q for q in queries if q.startswith('INSERT INTO "invoicing_payment"')
+    ]
+    # one query to lock the installments and one to update their payment totals
+    assert len(installment_queries) == 2
+    assert len(payment_inserts) == 4
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from users.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the search index of the profiles, "
+        "needed after PROFILE_SEARCH_INDEX_KEY has been changed"
+    )
+
+    def handle(self, *args, **options):
+        profile_count = rebuild_search_index()
+        self.stdout.write(f"Search index of {profile_count} profiles rebuilt")
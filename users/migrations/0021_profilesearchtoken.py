@@ -0,0 +1,44 @@
+# Generated by Django 4.2.6 on 2026-10-17 07:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0020_djangouser_drupaluser"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProfileSearchToken",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("token", models.BigIntegerField()),
+                (
+                    "profile",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_tokens",
+                        to="users.profile",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["token", "profile"], name="profile_search_token_idx"
+                    )
+                ],
+            },
+        ),
+    ]
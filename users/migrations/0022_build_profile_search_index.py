@@ -0,0 +1,58 @@
+import hashlib
+import hmac
+
+from django.conf import settings
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+# The tokenization of users.search at the time of this migration
+SEARCH_FIELDS = ["first_name", "last_name", "phone_number", "email"]
+NGRAM_LENGTH = 2
+
+
+def _get_value_tokens(field_name, value):
+    value = value.lower()
+    ngrams = {
+        value[start:end]
+        for start, end in enumerate(range(NGRAM_LENGTH, len(value) + 1))
+    }
+    tokens = set()
+    for ngram in ngrams:
+        digest = hmac.new(
+            settings.PROFILE_SEARCH_INDEX_KEY.encode(),
+            f"{field_name}:{ngram}".encode(),
+            hashlib.sha256,
+        ).digest()
+        tokens.add(int.from_bytes(digest[:8], "big", signed=True))
+    return tokens
+
+
+def build_search_index(apps, schema_editor):
+    Profile = apps.get_model("users", "Profile")
+    ProfileSearchToken = apps.get_model("users", "ProfileSearchToken")
+
+    tokens = []
+    profiles = Profile.objects.only("id", *SEARCH_FIELDS)
+    for profile in profiles.iterator(chunk_size=BATCH_SIZE):
+        for field_name in SEARCH_FIELDS:
+            value = getattr(profile, field_name) or ""
+            tokens.extend(
+                ProfileSearchToken(profile_id=profile.id, token=token)
+                for token in _get_value_tokens(field_name, value)
+            )
+        if len(tokens) >= BATCH_SIZE:
+            ProfileSearchToken.objects.bulk_create(tokens)
+            tokens = []
+    ProfileSearchToken.objects.bulk_create(tokens)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0021_profilesearchtoken"),
+    ]
+
+    operations = [
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
@@ -3,7 +3,7 @@ from uuid import uuid4
 
 from django.conf import settings
 from django.contrib import admin
-from django.db import models
+from django.db import models, transaction
 from django.db.models import UUIDField
 from django.utils.translation import gettext_lazy as _
 from helusers.models import AbstractUser
@@ -14,6 +14,8 @@ from users.enums import Roles
 
 _logger = logging.getLogger(__name__)
 
+_NOT_LOADED = object()
+
 
 class User(AbstractUser):
     class Meta:
@@ -118,8 +120,44 @@ class Profile(TimestampedModel):
         _logger.info(f"Profile {pk} deleted")
         return result
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_search_values = instance._get_search_values()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self._loaded_search_values = self._get_search_values()
+
+    def _get_search_values(self) -> dict:
+        from users.search import SEARCH_FIELDS
+
+        deferred_fields = self.get_deferred_fields()
+        return {
+            field_name: getattr(self, field_name)
+            for field_name in SEARCH_FIELDS
+            if field_name not in deferred_fields
+        }
+
     def save(self, *args, **kwargs):
-        super(Profile, self).save(*args, **kwargs)
+        from users.search import update_search_tokens
+
+        update_fields = kwargs.get("update_fields")
+        search_values = self._get_search_values()
+        loaded_search_values = getattr(self, "_loaded_search_values", {})
+        search_values_changed = self._state.adding or any(
+            loaded_search_values.get(field_name, _NOT_LOADED) != value
+            for field_name, value in search_values.items()
+            if update_fields is None or field_name in update_fields
+        )
+        if not search_values_changed:
+            super(Profile, self).save(*args, **kwargs)
+            return
+        with transaction.atomic():
+            super(Profile, self).save(*args, **kwargs)
+            update_search_tokens([self])
+        self._loaded_search_values = search_values
 
     def is_salesperson(self):
         return self.user.is_drupal_salesperson()
@@ -136,6 +174,20 @@ class Profile(TimestampedModel):
         return f"{self.first_name} {self.last_name}"
 
 
+class ProfileSearchToken(models.Model):
+    """A blind index token of a searchable profile field, see `users.search`."""
+
+    profile = models.ForeignKey(
+        Profile, on_delete=models.CASCADE, related_name="search_tokens"
+    )
+    token = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["token", "profile"], name="profile_search_token_idx")
+        ]
+
+
 """
 Proxy models to be used in Django-admin
 """
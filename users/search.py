@@ -0,0 +1,108 @@
+"""
+Blind index for searching profiles by their encrypted fields.
+
+The searchable fields of a profile are split into lowercased n-grams, and a keyed
+hash of each n-gram is stored as a ProfileSearchToken. A search value is split the
+same way, and the profiles having all the tokens of the value are the candidates
+for a match. The candidates still need to be checked against the actual value, as
+having all the n-grams of a value does not mean that the field contains it.
+
+The tokens are kept up to date when a profile is saved. They can be rebuilt with
+the `rebuild_profile_search_index` management command.
+"""
+import hashlib
+import hmac
+from typing import Iterable, Set
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, QuerySet
+
+from users.models import Profile, ProfileSearchToken
+
+SEARCH_FIELDS = ["first_name", "last_name", "phone_number", "email"]
+NGRAM_LENGTH = 2
+REBUILD_BATCH_SIZE = 1000
+
+
+def _get_ngrams(value: str) -> Set[str]:
+    value = value.lower()
+    return {
+        value[start:end]
+        for start, end in enumerate(range(NGRAM_LENGTH, len(value) + 1))
+    }
+
+
+def _get_token(field_name: str, ngram: str) -> int:
+    digest = hmac.new(
+        settings.PROFILE_SEARCH_INDEX_KEY.encode(),
+        f"{field_name}:{ngram}".encode(),
+        hashlib.sha256,
+    ).digest()
+    # 64 bits are plenty, as the matches are checked against the actual values
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+
+def get_value_tokens(field_name: str, value: str) -> Set[int]:
+    """Return the tokens of the given value of the given field.
+
+    Values shorter than NGRAM_LENGTH have no tokens.
+    """
+    return {_get_token(field_name, ngram) for ngram in _get_ngrams(value)}
+
+
+def get_profile_tokens(profile: Profile) -> Set[int]:
+    tokens = set()
+    for field_name in SEARCH_FIELDS:
+        tokens |= get_value_tokens(field_name, getattr(profile, field_name) or "")
+    return tokens
+
+
+def get_matching_profile_ids(field_name: str, value: str) -> QuerySet:
+    """Return the ids of the profiles which may have `value` in the given field.
+
+    The ids are returned as a queryset to be used as a subquery. The value must be
+    at least NGRAM_LENGTH characters long.
+    """
+    tokens = get_value_tokens(field_name, value)
+    if not tokens:
+        raise ValueError(f"Search value must have at least {NGRAM_LENGTH} characters")
+    return (
+        ProfileSearchToken.objects.filter(token__in=tokens)
+        .values("profile_id")
+        .annotate(token_count=Count("token"))
+        .filter(token_count=len(tokens))
+        .values_list("profile_id", flat=True)
+    )
+
+
+@transaction.atomic
+def update_search_tokens(profiles: Iterable[Profile]) -> None:
+    """Replace the search tokens of the given profiles."""
+    profiles = list(profiles)
+    ProfileSearchToken.objects.filter(profile__in=profiles).delete()
+    ProfileSearchToken.objects.bulk_create(
+        ProfileSearchToken(profile=profile, token=token)
+        for profile in profiles
+        for token in get_profile_tokens(profile)
+    )
+
+
+def rebuild_search_index(batch_size: int = REBUILD_BATCH_SIZE) -> int:
+    """Rebuild the search tokens of all the profiles.
+
+    Returns the number of profiles processed.
+    """
+    profile_count = 0
+    last_id = None
+    while True:
+        profiles = Profile.objects.order_by("id").only("id", *SEARCH_FIELDS)
+        if last_id is not None:
+            profiles = profiles.filter(id__gt=last_id)
+        profiles = list(profiles[:batch_size])
+        if not profiles:
+            break
+        last_id = profiles[-1].id
+        update_search_tokens(profiles)
+        profile_count += len(profiles)
+    return profile_count
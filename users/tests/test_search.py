@@ -0,0 +1,62 @@
+import pytest
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from users.models import Profile, ProfileSearchToken
+from users.search import get_matching_profile_ids, rebuild_search_index
+from users.tests.factories import ProfileFactory
+
+
+@pytest.mark.django_db
+def test_matching_profiles_are_found():
+    profile = ProfileFactory(first_name="Matti", last_name="Meikäläinen")
+    other_profile = ProfileFactory(first_name="Maija", last_name="Virtanen")
+
+    assert list(get_matching_profile_ids("first_name", "ATT")) == [profile.id]
+    assert list(get_matching_profile_ids("last_name", "käl")) == [profile.id]
+    assert set(get_matching_profile_ids("first_name", "ma")) == {
+        profile.id,
+        other_profile.id,
+    }
+    assert list(get_matching_profile_ids("last_name", "Matti")) == []
+
+
+@pytest.mark.django_db
+def test_search_tokens_are_updated_on_save():
+    profile = ProfileFactory(last_name="Virtanen")
+
+    profile.last_name = "Korhonen"
+    profile.save()
+
+    assert list(get_matching_profile_ids("last_name", "virta")) == []
+    assert list(get_matching_profile_ids("last_name", "korho")) == [profile.id]
+
+    profile.delete()
+    assert not ProfileSearchToken.objects.exists()
+
+
+@pytest.mark.django_db
+def test_search_tokens_are_not_rewritten_without_changes():
+    profile = Profile.objects.get(pk=ProfileFactory(last_name="Virtanen").pk)
+
+    with CaptureQueriesContext(connection) as context:
+        profile.city = "Espoo"
+        profile.save()
+    assert len(context.captured_queries) == 1
+
+    profile.last_name = "Korhonen"
+    profile.save(update_fields=["city"])
+    assert list(get_matching_profile_ids("last_name", "virta")) == [profile.id]
+    profile.save()
+    assert list(get_matching_profile_ids("last_name", "korho")) == [profile.id]
+
+
+@pytest.mark.django_db
+def test_rebuild_search_index():
+    profile = ProfileFactory(email="matti@example.com")
+
+    with override_settings(PROFILE_SEARCH_INDEX_KEY="new key"):
+        assert list(get_matching_profile_ids("email", "matti@")) == []
+        assert rebuild_search_index(batch_size=1) == 1
+        assert list(get_matching_profile_ids("email", "matti@")) == [profile.id]